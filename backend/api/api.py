@@ -1,20 +1,33 @@
 from dotenv import load_dotenv
 load_dotenv()
 
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
 from backend.services import talent_router
+from backend.services.container import services, WARM_UP_SERVICES
+from backend.db.session import engine
 import logging
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Build shared services before the first request and release them on shutdown"""
+    if WARM_UP_SERVICES:
+        services.warm_up(WARM_UP_SERVICES)
+    yield
+    services.shutdown()
+    engine.dispose()
+
 app = FastAPI(
     title="KnowThee AI API",
     description="AI-powered talent analytics and employee insights platform",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS with more secure settings
@@ -0,0 +1,72 @@
+"""
+Synthetic embedding corpora for the vector search benchmarks
+Unit-length vectors shaped like a chunk table: N employees x M chunks each.
+'random' vectors are uniform on the sphere (the worst case for ANN indexes);
+'clustered' vectors sit around a few centres, closer to real CV/assessment text.
+"""
+from typing import Tuple
+
+import numpy as np
+
+DISTRIBUTIONS = ('random', 'clustered')
+
+
+def _normalise(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return (vectors / norms).astype(np.float32)
+
+
+def generate_corpus(n_employees: int, chunks_per_employee: int, dimensions: int = 1536,
+                    distribution: str = 'clustered', n_clusters: int = 32,
+                    spread: float = 0.35, seed: int = 42) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Build the benchmark corpus.
+
+    In 'clustered' mode each employee has a home cluster and their chunks are
+    noisy copies of its centre, so one person's chunks are near each other as
+    in real CVs.
+
+    Args:
+        n_employees: Number of synthetic employees
+        chunks_per_employee: Chunks per employee
+        dimensions: Vector length
+        distribution: 'random' or 'clustered'
+        n_clusters: Number of cluster centres ('clustered' only)
+        spread: Noise scale around a centre, relative to unit length
+        seed: RNG seed; the same arguments always produce the same corpus
+
+    Returns:
+        (employee_index per row, float32 unit vectors) with n_employees * chunks_per_employee rows
+    """
+    if distribution not in DISTRIBUTIONS:
+        raise ValueError(f"distribution must be one of {DISTRIBUTIONS}")
+    rng = np.random.default_rng(seed)
+    n_rows = n_employees * chunks_per_employee
+    employee_index = np.repeat(np.arange(n_employees), chunks_per_employee)
+
+    if distribution == 'random':
+        return employee_index, _normalise(rng.standard_normal((n_rows, dimensions)))
+
+    centres = _normalise(rng.standard_normal((n_clusters, dimensions)))
+    home_cluster = rng.integers(0, n_clusters, size=n_employees)[employee_index]
+    # Per-dimension noise of spread / sqrt(d) gives a total offset of about `spread`
+    noise = rng.standard_normal((n_rows, dimensions)) * (spread / np.sqrt(dimensions))
+    return employee_index, _normalise(centres[home_cluster] + noise)
+
+
+def generate_queries(corpus: np.ndarray, n_queries: int, distribution: str = 'clustered',
+                     spread: float = 0.35, seed: int = 7) -> np.ndarray:
+    """
+    Query vectors matching the corpus distribution.
+
+    'clustered' queries are perturbed corpus rows, so they land in populated
+    regions as real questions do; 'random' queries are uniform on the sphere.
+    """
+    rng = np.random.default_rng(seed)
+    dimensions = corpus.shape[1]
+    if distribution == 'random':
+        return _normalise(rng.standard_normal((n_queries, dimensions)))
+    anchors = corpus[rng.integers(0, corpus.shape[0], size=n_queries)]
+    noise = rng.standard_normal((n_queries, dimensions)) * (spread / np.sqrt(dimensions))
+    return _normalise(anchors + noise)
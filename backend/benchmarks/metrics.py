@@ -0,0 +1,47 @@
+"""
+Latency and recall metrics for the vector search benchmarks
+Plain Python so results can be summarised and compared without NumPy.
+"""
+import math
+from typing import List, Dict, Sequence, Hashable
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Percentile with linear interpolation between closest ranks (NumPy's default)."""
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    position = (len(ordered) - 1) * pct / 100.0
+    lower = math.floor(position)
+    upper = math.ceil(position)
+    if lower == upper:
+        return ordered[lower]
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+def latency_summary(latencies_ms: Sequence[float]) -> Dict[str, float]:
+    """p50/p95/p99/mean/max of per-query latencies, in milliseconds."""
+    if not latencies_ms:
+        return {}
+    return {
+        'p50': round(percentile(latencies_ms, 50), 3),
+        'p95': round(percentile(latencies_ms, 95), 3),
+        'p99': round(percentile(latencies_ms, 99), 3),
+        'mean': round(sum(latencies_ms) / len(latencies_ms), 3),
+        'max': round(max(latencies_ms), 3)
+    }
+
+
+def recall_at_k(truth: Sequence[Hashable], retrieved: Sequence[Hashable], k: int) -> float:
+    """Share of the exact top-k that the approximate search returned in its top-k."""
+    expected = set(truth[:k])
+    if not expected:
+        return 1.0
+    return len(expected.intersection(retrieved[:k])) / len(expected)
+
+
+def mean_recall_at_k(truths: List[Sequence[Hashable]], retrieved: List[Sequence[Hashable]], k: int) -> float:
+    """recall_at_k averaged over queries."""
+    if not truths:
+        return float('nan')
+    return round(sum(recall_at_k(t, r, k) for t, r in zip(truths, retrieved)) / len(truths), 4)
@@ -0,0 +1,286 @@
+"""
+Vector search benchmark: latency and recall@k of exact scan vs HNSW vs IVFFlat
+
+Seeds an unlogged scratch table with a synthetic corpus (see corpus.py), takes
+the exact top-k of every query as ground truth, then sweeps hnsw.ef_search and
+ivfflat.probes. Results are written as JSON so runs can be compared between
+commits. Production tables are never touched and no OpenAI key is needed.
+
+    python -m backend.benchmarks.vector_search run --employees 500 --chunks 40
+    python -m backend.benchmarks.vector_search compare before.json after.json
+"""
+import io
+import os
+import json
+import time
+import logging
+import argparse
+import subprocess
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+
+import numpy as np
+
+from backend.db.session import engine
+from backend.benchmarks.corpus import DISTRIBUTIONS, generate_corpus, generate_queries
+from backend.benchmarks.metrics import latency_summary, mean_recall_at_k
+
+logger = logging.getLogger(__name__)
+
+TABLE = 'benchmark_embedding_chunks'
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Same build parameters as the production HNSW index (migration b14e34073649)
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+DEFAULT_EF_SEARCH = (10, 20, 40, 80, 160)
+DEFAULT_PROBES = (1, 2, 5, 10, 20)
+COPY_BATCH_ROWS = 5000
+
+
+def _vector_literal(vector: np.ndarray) -> str:
+    return '[' + ','.join(f'{x:.7g}' for x in vector) + ']'
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)), stderr=subprocess.DEVNULL
+        ).decode().strip()
+    except Exception:
+        return None
+
+
+def seed_table(conn, employee_index: np.ndarray, vectors: np.ndarray) -> None:
+    """(Re)create the scratch table and COPY the corpus into it."""
+    dimensions = vectors.shape[1]
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cur.execute(f"""
+            CREATE UNLOGGED TABLE {TABLE} (
+                id bigint PRIMARY KEY,
+                employee_id integer NOT NULL,
+                embedding vector({dimensions}) NOT NULL
+            )
+        """)
+        for start in range(0, len(vectors), COPY_BATCH_ROWS):
+            buffer = io.StringIO()
+            for row_id in range(start, min(start + COPY_BATCH_ROWS, len(vectors))):
+                buffer.write(f"{row_id}\t{int(employee_index[row_id])}\t{_vector_literal(vectors[row_id])}\n")
+            buffer.seek(0)
+            cur.copy_expert(f"COPY {TABLE} (id, employee_id, embedding) FROM STDIN", buffer)
+        cur.execute(f"ANALYZE {TABLE}")
+    conn.commit()
+
+
+def run_queries(conn, queries: List[str], k: int, settings: Dict[str, Any],
+                warmup: int = 5) -> Dict[str, Any]:
+    """
+    Time each query in its own transaction with the given SET LOCAL settings.
+
+    Returns:
+        Per-query latencies (ms) and retrieved ids
+    """
+    sql = f"SELECT id FROM {TABLE} ORDER BY embedding <=> %s::vector LIMIT %s"
+    latencies, retrieved = [], []
+    with conn.cursor() as cur:
+        for i, query in enumerate(queries[:warmup] + queries):
+            for name, value in settings.items():
+                cur.execute(f"SET LOCAL {name} = {value}")
+            started = time.perf_counter()
+            cur.execute(sql, (query, k))
+            ids = [row[0] for row in cur.fetchall()]
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            conn.rollback()
+            if i >= min(warmup, len(queries)):
+                latencies.append(elapsed_ms)
+                retrieved.append(ids)
+    return {'latencies_ms': latencies, 'ids': retrieved}
+
+
+def _build_index(conn, method: str, lists: int) -> float:
+    """Create the HNSW or IVFFlat index; returns build seconds."""
+    with_clause = (
+        f"m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION}" if method == 'hnsw' else f"lists = {lists}"
+    )
+    started = time.perf_counter()
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            CREATE INDEX {TABLE}_{method} ON {TABLE}
+            USING {method} (embedding vector_cosine_ops) WITH ({with_clause})
+        """)
+    conn.commit()
+    return round(time.perf_counter() - started, 3)
+
+
+def _drop_index(conn, method: str) -> None:
+    with conn.cursor() as cur:
+        cur.execute(f"DROP INDEX IF EXISTS {TABLE}_{method}")
+    conn.commit()
+
+
+def run_benchmark(n_employees: int, chunks_per_employee: int, dimensions: int, n_queries: int,
+                  k: int, distribution: str, n_clusters: int,
+                  ef_search_values=DEFAULT_EF_SEARCH, probes_values=DEFAULT_PROBES,
+                  lists: Optional[int] = None, seed: int = 42, warmup: int = 5,
+                  keep_table: bool = False) -> Dict[str, Any]:
+    """Seed the corpus, run every configuration and return the JSON-ready report."""
+    employee_index, vectors = generate_corpus(
+        n_employees, chunks_per_employee, dimensions,
+        distribution=distribution, n_clusters=n_clusters, seed=seed
+    )
+    queries = [_vector_literal(q) for q in generate_queries(vectors, n_queries, distribution, seed=seed + 1)]
+    n_rows = len(vectors)
+    # pgvector's guidance: rows / 1000 lists up to 1M rows, sqrt(rows) beyond
+    lists = lists or max(1, n_rows // 1000 if n_rows <= 1_000_000 else int(np.sqrt(n_rows)))
+
+    report: Dict[str, Any] = {
+        'created_at': datetime.utcnow().isoformat(timespec='seconds') + 'Z',
+        'git_commit': _git_commit(),
+        'corpus': {
+            'employees': n_employees, 'chunks_per_employee': chunks_per_employee, 'rows': n_rows,
+            'dimensions': dimensions, 'distribution': distribution, 'clusters': n_clusters, 'seed': seed
+        },
+        'queries': n_queries,
+        'k': k,
+        'results': []
+    }
+
+    conn = engine.raw_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT version(), (SELECT extversion FROM pg_extension WHERE extname = 'vector')")
+            report['postgres_version'], report['pgvector_version'] = cur.fetchone()
+        conn.commit()
+
+        logger.info(f"Seeding {n_rows} rows ({n_employees} employees x {chunks_per_employee} chunks, {distribution})")
+        seed_table(conn, employee_index, vectors)
+
+        # Ground truth; there are no vector indexes yet, so this is a sequential scan
+        exact = run_queries(conn, queries, k, {'enable_indexscan': 'off'}, warmup)
+        truth = exact['ids']
+        report['results'].append({
+            'method': 'exact', 'params': {},
+            'latency_ms': latency_summary(exact['latencies_ms']),
+            'recall_at_k': 1.0
+        })
+        logger.info(f"exact: {report['results'][-1]['latency_ms']}")
+
+        sweeps = (
+            ('hnsw', 'hnsw.ef_search', 'ef_search', ef_search_values),
+            ('ivfflat', 'ivfflat.probes', 'probes', probes_values),
+        )
+        for method, setting, param, values in sweeps:
+            build_seconds = _build_index(conn, method, lists)
+            index_params = {'m': HNSW_M, 'ef_construction': HNSW_EF_CONSTRUCTION} if method == 'hnsw' else {'lists': lists}
+            for value in values:
+                # enable_seqscan=off keeps small corpora on the index
+                measured = run_queries(conn, queries, k, {setting: value, 'enable_seqscan': 'off'}, warmup)
+                report['results'].append({
+                    'method': method,
+                    'params': {**index_params, param: value},
+                    'build_seconds': build_seconds,
+                    'latency_ms': latency_summary(measured['latencies_ms']),
+                    'recall_at_k': mean_recall_at_k(truth, measured['ids'], k)
+                })
+                logger.info(f"{method} {param}={value}: {report['results'][-1]['latency_ms']}, "
+                            f"recall@{k}={report['results'][-1]['recall_at_k']}")
+            _drop_index(conn, method)
+    finally:
+        if not keep_table:
+            with conn.cursor() as cur:
+                cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+            conn.commit()
+        conn.close()
+
+    return report
+
+
+def _result_key(result: Dict[str, Any]) -> str:
+    params = ', '.join(f"{name}={value}" for name, value in sorted(result['params'].items()))
+    return f"{result['method']}({params})"
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Pair up configurations present in both reports and compute p50/p95/p99 and recall deltas."""
+    before_results = {_result_key(r): r for r in before.get('results', [])}
+    rows = []
+    for result in after.get('results', []):
+        key = _result_key(result)
+        previous = before_results.get(key)
+        if previous is None:
+            continue
+        row = {'config': key}
+        for stat in ('p50', 'p95', 'p99'):
+            row[f'{stat}_before'] = previous['latency_ms'].get(stat)
+            row[f'{stat}_after'] = result['latency_ms'].get(stat)
+        row['recall_before'] = previous['recall_at_k']
+        row['recall_after'] = result['recall_at_k']
+        rows.append(row)
+    return rows
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Benchmark exact, HNSW and IVFFlat vector search')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Seed a synthetic corpus and measure latency/recall')
+    run_parser.add_argument('--employees', type=int, default=200)
+    run_parser.add_argument('--chunks', type=int, default=25, help='Chunks per employee')
+    run_parser.add_argument('--dimensions', type=int, default=1536)
+    run_parser.add_argument('--queries', type=int, default=200)
+    run_parser.add_argument('--k', type=int, default=10)
+    run_parser.add_argument('--distribution', choices=DISTRIBUTIONS, default='clustered')
+    run_parser.add_argument('--clusters', type=int, default=32)
+    run_parser.add_argument('--ef-search', type=int, nargs='+', default=list(DEFAULT_EF_SEARCH))
+    run_parser.add_argument('--probes', type=int, nargs='+', default=list(DEFAULT_PROBES))
+    run_parser.add_argument('--lists', type=int, help='IVFFlat lists (default: rows / 1000)')
+    run_parser.add_argument('--seed', type=int, default=42)
+    run_parser.add_argument('--warmup', type=int, default=5, help='Untimed queries before each configuration')
+    run_parser.add_argument('--keep-table', action='store_true', help=f'Keep {TABLE} after the run')
+    run_parser.add_argument('--output', help='JSON output path (default: backend/benchmarks/results/<timestamp>.json)')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare two result files')
+    compare_parser.add_argument('before')
+    compare_parser.add_argument('after')
+    args = parser.parse_args()
+
+    if args.command == 'run':
+        report = run_benchmark(
+            args.employees, args.chunks, args.dimensions, args.queries, args.k,
+            args.distribution, args.clusters,
+            ef_search_values=args.ef_search, probes_values=args.probes, lists=args.lists,
+            seed=args.seed, warmup=args.warmup, keep_table=args.keep_table
+        )
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"vector_search_{datetime.utcnow().strftime('%Y%m%dT%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+        print(f"{'config':<45} {'p50':>9} {'p95':>9} {'p99':>9} {'recall':>7}")
+        for result in report['results']:
+            latency = result['latency_ms']
+            print(f"{_result_key(result):<45} {latency['p50']:>9} {latency['p95']:>9} "
+                  f"{latency['p99']:>9} {result['recall_at_k']:>7}")
+        print(f"Results written to {output}")
+
+    elif args.command == 'compare':
+        with open(args.before) as f:
+            before = json.load(f)
+        with open(args.after) as f:
+            after = json.load(f)
+        if before.get('corpus') != after.get('corpus') or before.get('k') != after.get('k'):
+            print("Warning: the two runs used different corpora or k; deltas are not like for like")
+        print(f"{'config':<45} {'p50 ms':>17} {'p95 ms':>17} {'p99 ms':>17} {'recall':>13}")
+        for row in compare_reports(before, after):
+            print(f"{row['config']:<45} "
+                  + ' '.join(f"{row[f'{s}_before']:>8}->{row[f'{s}_after']:<8}" for s in ('p50', 'p95', 'p99'))
+                  + f" {row['recall_before']:>6}->{row['recall_after']:<6}")
+
+
+if __name__ == '__main__':
+    main()
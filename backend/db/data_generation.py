@@ -0,0 +1,48 @@
+"""
+Search data generation counter.
+
+A Postgres sequence (see migration 0e19825a785b) that every write path bumps
+after committing embedding or employee data. Search result caches tag their
+entries with the generation they were computed at and only serve an entry
+while the generation is unchanged, so they never return stale results.
+Sequences are not transactional, which makes the counter cheap to bump and
+read from any process.
+"""
+import logging
+from typing import Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+DATA_GENERATION_SEQUENCE = 'search_data_generation'
+
+
+def get_data_generation(db: Session) -> Optional[int]:
+    """Current generation, or None when the counter is unavailable (callers should then not cache)."""
+    try:
+        # last_value is already 1 before the first nextval(); is_called tells the two apart
+        return db.execute(text(
+            f"SELECT CASE WHEN is_called THEN last_value ELSE 0 END FROM {DATA_GENERATION_SEQUENCE}"
+        )).scalar()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not read search data generation: {e}")
+        return None
+
+
+def bump_data_generation(db: Session) -> Optional[int]:
+    """Invalidate cached search results; call after the data change has been committed.
+
+    Bumping before the commit would let a concurrent search cache pre-commit
+    results under the new generation.
+    """
+    try:
+        generation = db.execute(text(f"SELECT nextval('{DATA_GENERATION_SEQUENCE}')")).scalar()
+        logger.debug(f"Search data generation is now {generation}")
+        return generation
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not bump search data generation: {e}")
+        return None
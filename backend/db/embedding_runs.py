@@ -0,0 +1,119 @@
+"""
+Embedding run lifecycle: per-run partitions, the active run pointer and retirement.
+
+embedding_documents and embedding_chunks are LIST-partitioned by embedding_run_id
+(see migration 840671e5263b). Every run gets its own partition of each table,
+searches only read the active run's partition, and dropping a retired run is a
+DETACH + DROP instead of a large DELETE.
+"""
+import uuid
+import logging
+import argparse
+from typing import Optional, Union, List
+
+from sqlalchemy import text, update
+from sqlalchemy.orm import Session
+
+from backend.db.models import EmbeddingRun
+
+logger = logging.getLogger(__name__)
+
+# Partitioned tables, in the order their partitions must be created
+# (documents are referenced by chunks, so they are dropped last)
+PARTITIONED_TABLES = ('embedding_documents', 'embedding_chunks')
+
+
+def partition_name(table: str, run_id: Union[str, uuid.UUID]) -> str:
+    """Name of a run's partition, e.g. embedding_chunks_3f2c...; fits the 63 char identifier limit"""
+    return f"{table}_{uuid.UUID(str(run_id)).hex}"
+
+
+def create_run_partitions(db: Session, run_id: Union[str, uuid.UUID]) -> None:
+    """Create the partitions a new run writes into (idempotent).
+
+    Indexes defined on the parent tables are created on the new partitions automatically.
+    """
+    run_id = uuid.UUID(str(run_id))
+    for table in PARTITIONED_TABLES:
+        # DDL does not take bind parameters; run_id has been validated as a UUID above
+        db.execute(text(
+            f"CREATE TABLE IF NOT EXISTS {partition_name(table, run_id)} "
+            f"PARTITION OF {table} FOR VALUES IN ('{run_id}')"
+        ))
+    logger.info(f"Created partitions for embedding run {run_id}")
+
+
+def get_active_run(db: Session) -> Optional[EmbeddingRun]:
+    """The run searches should read from.
+
+    Falls back to the most recent run when none has been activated yet.
+    """
+    run = db.query(EmbeddingRun).filter(EmbeddingRun.is_active.is_(True)).first()
+    if run is None:
+        run = db.query(EmbeddingRun).order_by(EmbeddingRun.created_at.desc()).first()
+    return run
+
+
+def activate_run(db: Session, run_id: Union[str, uuid.UUID]) -> None:
+    """Point searches at run_id; all other runs are deactivated in the same statement."""
+    run_id = uuid.UUID(str(run_id))
+    if db.query(EmbeddingRun).get(run_id) is None:
+        raise ValueError(f"Embedding run {run_id} does not exist")
+    db.execute(update(EmbeddingRun).values(is_active=(EmbeddingRun.id == run_id)))
+    logger.info(f"Activated embedding run {run_id}")
+
+
+def drop_run(db: Session, run_id: Union[str, uuid.UUID]) -> None:
+    """Retire a run by detaching and dropping its partitions.
+
+    Raises:
+        ValueError: If the run is the active one
+    """
+    run_id = uuid.UUID(str(run_id))
+    run = db.query(EmbeddingRun).get(run_id)
+    if run is None:
+        raise ValueError(f"Embedding run {run_id} does not exist")
+    if run.is_active:
+        raise ValueError(f"Embedding run {run_id} is active; activate another run first")
+
+    for table in reversed(PARTITIONED_TABLES):
+        partition = partition_name(table, run_id)
+        db.execute(text(f"ALTER TABLE {table} DETACH PARTITION {partition}"))
+        db.execute(text(f"DROP TABLE {partition}"))
+
+    # The run's documents went with the partition; skip the ORM cascade
+    db.execute(text("DELETE FROM embedding_runs WHERE id = :id"), {"id": run_id})
+    logger.info(f"Dropped embedding run {run_id}")
+
+
+def list_runs(db: Session) -> List[EmbeddingRun]:
+    """All runs, newest first."""
+    return db.query(EmbeddingRun).order_by(EmbeddingRun.created_at.desc()).all()
+
+
+def main():
+    from backend.db.session import get_db
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Manage embedding runs')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    subparsers.add_parser('list', help='List embedding runs')
+    activate_parser = subparsers.add_parser('activate', help='Make a run the one searches read from')
+    activate_parser.add_argument('run_id')
+    drop_parser = subparsers.add_parser('drop', help='Drop a retired run and its partitions')
+    drop_parser.add_argument('run_id')
+    args = parser.parse_args()
+
+    with get_db() as db:
+        if args.command == 'list':
+            for run in list_runs(db):
+                marker = '*' if run.is_active else ' '
+                print(f"{marker} {run.id}  {run.name}  {run.embedding_model}  {run.chunking_method}  {run.created_at}")
+        elif args.command == 'activate':
+            activate_run(db, args.run_id)
+        elif args.command == 'drop':
+            drop_run(db, args.run_id)
+
+
+if __name__ == '__main__':
+    main()
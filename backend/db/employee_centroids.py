@@ -0,0 +1,69 @@
+"""
+Per-employee centroid embeddings (see EmployeeCentroid).
+
+Centroids are computed inside Postgres with pgvector's avg(vector) and
+l2_normalize, so no vectors are shipped to Python. Each employee gets one
+centroid over all their chunks ('all') and one per chunk document_type.
+"""
+import uuid
+import logging
+from typing import Optional, Union, Iterable
+
+from sqlalchemy import text, bindparam
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+# EmployeeCentroid.document_type of the centroid over every chunk
+ALL_DOCUMENT_TYPES = 'all'
+
+_REFRESH_SQL = """
+    INSERT INTO employee_centroids
+        (id, employee_id, embedding_run_id, document_type, embedding, chunk_count)
+    SELECT gen_random_uuid(), c.employee_id, c.embedding_run_id,
+           COALESCE(c.document_type, :all_types), l2_normalize(avg(c.embedding)), count(*)
+    FROM embedding_chunks c
+    WHERE c.embedding_run_id = :run_id {employee_filter}
+    GROUP BY GROUPING SETS (
+        (c.employee_id, c.embedding_run_id, c.document_type),
+        (c.employee_id, c.embedding_run_id)
+    )
+    -- Chunks without a document_type only count towards 'all'
+    HAVING GROUPING(c.document_type) = 1 OR c.document_type IS NOT NULL
+"""
+
+
+def refresh_employee_centroids(db: Session, run_id: Union[str, uuid.UUID],
+                               employee_ids: Optional[Iterable[Union[str, uuid.UUID]]] = None) -> int:
+    """Recompute the centroids of a run (or of some of its employees).
+
+    Args:
+        db: Database session; the caller commits
+        run_id: Embedding run
+        employee_ids: Only these employees; all of the run's employees when None
+
+    Returns:
+        Number of centroid rows written
+    """
+    params = {'run_id': uuid.UUID(str(run_id)), 'all_types': ALL_DOCUMENT_TYPES}
+    employee_filter = ""
+    bind_params = []
+    if employee_ids is not None:
+        params['employee_ids'] = [uuid.UUID(str(e)) for e in employee_ids]
+        if not params['employee_ids']:
+            return 0
+        employee_filter = "AND employee_id IN :employee_ids"
+        bind_params.append(bindparam('employee_ids', expanding=True, type_=PG_UUID(as_uuid=True)))
+
+    delete_sql = text(
+        f"DELETE FROM employee_centroids WHERE embedding_run_id = :run_id {employee_filter}"
+    ).bindparams(*bind_params)
+    db.execute(delete_sql, params)
+
+    insert_sql = text(
+        _REFRESH_SQL.format(employee_filter=employee_filter.replace('employee_id', 'c.employee_id'))
+    ).bindparams(*bind_params)
+    written = db.execute(insert_sql, params).rowcount
+    logger.info(f"Refreshed {written} employee centroids for run {run_id}")
+    return written
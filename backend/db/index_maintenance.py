@@ -0,0 +1,446 @@
+"""
+Vector index maintenance after bulk loads.
+
+Every run's embedding_chunks partition carries its own HNSW (and optional
+IVFFlat) indexes, created when the partition is still empty (see
+embedding_runs.create_run_partitions). Bulk loads then leave planner
+statistics stale, IVFFlat lists trained on no data, and deletes leave dead
+entries behind. This module reads the per-partition change counters Postgres
+keeps in pg_stat_user_tables, decides which maintenance is due and runs it:
+
+- ANALYZE when enough rows changed since the last analyze
+- VACUUM (ANALYZE) when dead tuples pile up
+- REINDEX CONCURRENTLY when an index has bloated since it was built or an
+  IVFFlat index has not been (re)trained on the current data
+
+Measured recall below target is reported with a higher hnsw.ef_search to
+try: rebuilding with the same m/ef_construction yields an equally good
+graph, so recall is tuned at query time rather than by reindexing.
+
+Build-time baselines, including the recall measured right after a rebuild,
+are kept in index_maintenance_state (migrations 1e7e3978b3c0, 5c0b7e1f9a42).
+Run it from the CLI, let EmbeddingPipeline call it after a load, or let
+IndexMaintenanceScheduler run it periodically in the API.
+"""
+import os
+import math
+import uuid
+import logging
+import argparse
+import threading
+from typing import Any, Dict, List, Optional, Set, Union
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from backend.db.session import engine
+from backend.db.embedding_runs import partition_name
+
+logger = logging.getLogger(__name__)
+
+# Rows changed since the last analyze, as a share of live rows (and at least)
+ANALYZE_CHANGE_RATIO = 0.1
+ANALYZE_MIN_ROWS = 500
+# Dead tuples as a share of all tuples before a VACUUM
+VACUUM_DEAD_RATIO = 0.2
+# Index size per live row relative to right after its build
+REINDEX_BLOAT_RATIO = 1.5
+# Rows changed since an IVFFlat index was trained, as a share of the rows it was trained on
+IVFFLAT_RETRAIN_RATIO = 0.3
+# Recommend a higher hnsw.ef_search when measured recall@k falls below this
+MIN_RECALL = 0.9
+RECALL_SAMPLES = 20
+RECALL_K = 10
+DEFAULT_EF_SEARCH = 40
+MAX_EF_SEARCH = 1000
+
+VECTOR_INDEX_METHODS = ('hnsw', 'ivfflat')
+
+# pg_try_advisory_lock key so only one process maintains indexes at a time
+_LOCK_KEY = 7_148_053_602
+
+
+def recommended_ivfflat_lists(rows: int) -> int:
+    """pgvector's guidance: rows / 1000 up to 1M rows, sqrt(rows) above"""
+    if rows > 1_000_000:
+        return int(math.sqrt(rows))
+    return max(10, rows // 1000)
+
+
+def bloat_ratio(index: Dict[str, Any], baseline: Optional[Dict[str, Any]], live_rows: int) -> Optional[float]:
+    """Index size per live row relative to its baseline; None without a usable baseline"""
+    if not baseline or not baseline['rows_at_build'] or not baseline['size_at_build'] or not live_rows:
+        return None
+    expected = baseline['size_at_build'] / baseline['rows_at_build'] * live_rows
+    return index['size_bytes'] / expected if expected else None
+
+
+def recommend_ef_search(recall: Optional[float], ef_search: int) -> Optional[int]:
+    """hnsw.ef_search to try when recall measured at ef_search is below MIN_RECALL, else None"""
+    if recall is None or recall >= MIN_RECALL or ef_search >= MAX_EF_SEARCH:
+        return None
+    return min(MAX_EF_SEARCH, max(2 * ef_search, RECALL_K))
+
+
+def plan_maintenance(table_stats: Dict[str, Dict[str, Any]],
+                     indexes: List[Dict[str, Any]],
+                     baselines: Dict[str, Dict[str, Any]]) -> List[Dict[str, str]]:
+    """
+    Decide which maintenance is due.
+
+    Args:
+        table_stats: Table name -> {'live', 'dead', 'mod_since_analyze', 'changes'}
+        indexes: Vector indexes: {'name', 'table', 'method', 'size_bytes', 'partial', 'column'}
+        baselines: Index name -> {'rows_at_build', 'changes_at_build', 'size_at_build'}
+
+    Returns:
+        Actions in execution order: {'action': 'reindex'|'vacuum'|'analyze', 'target', 'reason'}
+    """
+    reindex, vacuum, analyze = [], [], []
+
+    for index in indexes:
+        stats = table_stats.get(index['table'])
+        if not stats or not stats['live']:
+            continue
+        baseline = baselines.get(index['name'])
+        reason = None
+
+        bloat = bloat_ratio(index, baseline, stats['live'])
+        if bloat is not None and bloat >= REINDEX_BLOAT_RATIO:
+            reason = f"bloat {bloat:.1f}x since build"
+
+        if reason is None and index['method'] == 'ivfflat':
+            rows_at_build = baseline['rows_at_build'] if baseline else 0
+            if not rows_at_build:
+                reason = "ivfflat lists never trained on this data"
+            else:
+                changed = stats['changes'] - baseline['changes_at_build']
+                if changed < 0:
+                    # Statistics were reset; all we know is what changed since
+                    changed = stats['changes']
+                if changed >= IVFFLAT_RETRAIN_RATIO * rows_at_build:
+                    reason = f"{changed} rows changed since ivfflat lists were trained on {rows_at_build}"
+
+        if reason:
+            reindex.append({'action': 'reindex', 'target': index['name'], 'reason': reason})
+
+    for table, stats in table_stats.items():
+        total = stats['live'] + stats['dead']
+        if total and stats['dead'] / total >= VACUUM_DEAD_RATIO:
+            vacuum.append({'action': 'vacuum', 'target': table,
+                           'reason': f"{stats['dead']} dead of {total} tuples"})
+        elif stats['mod_since_analyze'] >= max(ANALYZE_MIN_ROWS, ANALYZE_CHANGE_RATIO * stats['live']):
+            analyze.append({'action': 'analyze', 'target': table,
+                            'reason': f"{stats['mod_since_analyze']} rows changed since last analyze"})
+
+    # VACUUM first so rebuilt indexes skip dead tuples, ANALYZE last so statistics include everything
+    return vacuum + reindex + analyze
+
+
+def _maintained_tables(conn: Connection, run_id: Optional[Union[str, uuid.UUID]]) -> List[str]:
+    """The run's chunk partition (the active run's by default) plus employee_centroids"""
+    if run_id is None:
+        run_id = conn.execute(text(
+            "SELECT id FROM embedding_runs ORDER BY is_active DESC, created_at DESC LIMIT 1"
+        )).scalar()
+    tables = ['employee_centroids']
+    if run_id is not None:
+        tables.insert(0, partition_name('embedding_chunks', run_id))
+    return tables
+
+
+def _table_stats(conn: Connection, tables: List[str]) -> Dict[str, Dict[str, Any]]:
+    rows = conn.execute(text("""
+        SELECT relname, n_live_tup, n_dead_tup, n_mod_since_analyze,
+               n_tup_ins + n_tup_upd + n_tup_del AS changes
+        FROM pg_stat_user_tables
+        WHERE relname = ANY(:tables)
+    """), {'tables': tables}).all()
+    return {
+        row.relname: {'live': row.n_live_tup, 'dead': row.n_dead_tup,
+                      'mod_since_analyze': row.n_mod_since_analyze, 'changes': row.changes}
+        for row in rows
+    }
+
+
+def _vector_indexes(conn: Connection, tables: List[str]) -> List[Dict[str, Any]]:
+    rows = conn.execute(text("""
+        SELECT i.relname AS name, t.relname AS table_name, am.amname AS method,
+               pg_relation_size(i.oid) AS size_bytes, x.indpred IS NOT NULL AS partial,
+               a.attname AS column_name
+        FROM pg_index x
+        JOIN pg_class i ON i.oid = x.indexrelid
+        JOIN pg_class t ON t.oid = x.indrelid
+        JOIN pg_am am ON am.oid = i.relam
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+        WHERE t.relname = ANY(:tables) AND am.amname = ANY(:methods)
+    """), {'tables': tables, 'methods': list(VECTOR_INDEX_METHODS)}).all()
+    return [
+        {'name': row.name, 'table': row.table_name, 'method': row.method,
+         'size_bytes': row.size_bytes, 'partial': row.partial, 'column': row.column_name}
+        for row in rows
+    ]
+
+
+def _baselines(conn: Connection, index_names: List[str]) -> Dict[str, Dict[str, Any]]:
+    rows = conn.execute(text("""
+        SELECT index_name, rows_at_build, changes_at_build, size_at_build, recall_at_build
+        FROM index_maintenance_state
+        WHERE index_name = ANY(:names)
+    """), {'names': index_names}).all()
+    return {
+        row.index_name: {'rows_at_build': row.rows_at_build, 'changes_at_build': row.changes_at_build,
+                         'size_at_build': row.size_at_build, 'recall_at_build': row.recall_at_build}
+        for row in rows
+    }
+
+
+def _record_build(conn: Connection, index_name: str, table: str, recall: Optional[float] = None):
+    """Store the baseline of a freshly (re)built index, or of one seen for the first time"""
+    conn.execute(text("""
+        INSERT INTO index_maintenance_state
+            (index_name, rows_at_build, changes_at_build, size_at_build, recall_at_build, rebuilt_at)
+        SELECT :index_name, s.n_live_tup, s.n_tup_ins + s.n_tup_upd + s.n_tup_del,
+               pg_relation_size(CAST(:index_name AS regclass)), :recall, now()
+        FROM pg_stat_user_tables s
+        WHERE s.relname = :table
+        ON CONFLICT (index_name) DO UPDATE SET
+            rows_at_build = EXCLUDED.rows_at_build,
+            changes_at_build = EXCLUDED.changes_at_build,
+            size_at_build = EXCLUDED.size_at_build,
+            recall_at_build = EXCLUDED.recall_at_build,
+            rebuilt_at = EXCLUDED.rebuilt_at
+    """), {'index_name': index_name, 'table': table, 'recall': recall})
+
+
+def _ef_search(conn: Connection) -> int:
+    """hnsw.ef_search of the connection, which measure_recall runs at"""
+    # Unset until pgvector is loaded into the session, which means its default
+    value = conn.execute(text("SELECT current_setting('hnsw.ef_search', true)")).scalar()
+    return int(value) if value else DEFAULT_EF_SEARCH
+
+
+def measure_recall(conn: Connection, table: str, samples: int = RECALL_SAMPLES,
+                   k: int = RECALL_K) -> Optional[float]:
+    """
+    Recall@k of the table's vector index against exact search.
+
+    Uses stored embeddings as queries, so nothing is embedded. Each query runs
+    once as the planner chooses (index scan) and once with index scans disabled.
+    Must be called on an autocommit connection.
+    """
+    queries = conn.execute(text(
+        f"SELECT embedding::text FROM {table} ORDER BY random() LIMIT :samples"
+    ), {'samples': samples}).scalars().all()
+    if not queries:
+        return None
+
+    search_sql = text(f"SELECT id FROM {table} ORDER BY embedding <=> CAST(:vec AS vector) LIMIT :k")
+    approximate = [set(conn.execute(search_sql, {'vec': vec, 'k': k}).scalars()) for vec in queries]
+    # The connection is in autocommit mode, so SET LOCAL would not stick; reset explicitly
+    conn.execute(text("SET enable_indexscan = off"))
+    try:
+        exact = [set(conn.execute(search_sql, {'vec': vec, 'k': k}).scalars()) for vec in queries]
+    finally:
+        conn.execute(text("RESET enable_indexscan"))
+    return sum(len(a & e) / max(len(e), 1) for a, e in zip(approximate, exact)) / len(queries)
+
+
+def run_maintenance(run_id: Optional[Union[str, uuid.UUID]] = None, dry_run: bool = False,
+                    measure: bool = True) -> Dict[str, Any]:
+    """
+    Check a run's vector indexes and run whatever maintenance is due.
+
+    Args:
+        run_id: Embedding run; the active run by default
+        dry_run: Only report what would be done
+        measure: Measure recall@k per table (adds 2 * RECALL_SAMPLES queries per table);
+                 tables whose indexes are rebuilt are measured afterwards either way
+
+    Returns:
+        Report with per-table stats, per-index size/bloat, recall, hnsw.ef_search
+        recommendations and the planned (or executed) actions; {'skipped': ...}
+        when another process holds the lock
+
+    HNSW indexes built outside this module (migrations, create_run_partitions)
+    get their first baseline here, when first seen with data; IVFFlat indexes
+    without one are retrained first, which records it.
+    """
+    # REINDEX CONCURRENTLY and VACUUM cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:key)"), {'key': _LOCK_KEY}).scalar():
+            logger.info("Index maintenance already running elsewhere, skipping")
+            return {'skipped': 'locked'}
+        try:
+            tables = _maintained_tables(conn, run_id)
+            table_stats = _table_stats(conn, tables)
+            indexes = _vector_indexes(conn, tables)
+            baselines = _baselines(conn, [index['name'] for index in indexes])
+            recall = {}
+            if measure:
+                for table in table_stats:
+                    if table_stats[table]['live']:
+                        recall[table] = measure_recall(conn, table)
+            actions = plan_maintenance(table_stats, indexes, baselines)
+
+            ef_search = _ef_search(conn)
+            recommendations = []
+            for table, table_recall in recall.items():
+                suggested = recommend_ef_search(table_recall, ef_search)
+                if suggested:
+                    recommendations.append({'target': table, 'ef_search': suggested,
+                                            'reason': f"recall@{RECALL_K} {table_recall:.2f} below {MIN_RECALL} "
+                                                      f"at hnsw.ef_search {ef_search}"})
+                    logger.warning(f"{table}: recall@{RECALL_K} {table_recall:.2f} at hnsw.ef_search "
+                                   f"{ef_search}, try VECTOR_HNSW_EF_SEARCH={suggested}")
+
+            index_tables = {index['name']: index['table'] for index in indexes}
+            reindexed = {action['target'] for action in actions if action['action'] == 'reindex'}
+            if not dry_run:
+                for index in indexes:
+                    if index['name'] not in baselines and index['name'] not in reindexed \
+                            and table_stats.get(index['table'], {}).get('live'):
+                        _record_build(conn, index['name'], index['table'], recall.get(index['table']))
+                        logger.info(f"Recorded baseline of {index['name']}")
+            rebuilt_recall = {}
+            for action in actions:
+                logger.info(f"{'Would run' if dry_run else 'Running'} {action['action']} on "
+                            f"{action['target']}: {action['reason']}")
+                if dry_run:
+                    continue
+                if action['action'] == 'reindex':
+                    table = index_tables[action['target']]
+                    conn.execute(text(f"REINDEX INDEX CONCURRENTLY {action['target']}"))
+                    if table not in rebuilt_recall:
+                        rebuilt_recall[table] = measure_recall(conn, table)
+                    _record_build(conn, action['target'], table, rebuilt_recall[table])
+                elif action['action'] == 'vacuum':
+                    conn.execute(text(f"VACUUM (ANALYZE) {action['target']}"))
+                else:
+                    conn.execute(text(f"ANALYZE {action['target']}"))
+
+            return {
+                'tables': table_stats,
+                'indexes': [
+                    {**index,
+                     'rows_at_build': baselines.get(index['name'], {}).get('rows_at_build'),
+                     'recall_at_build': baselines.get(index['name'], {}).get('recall_at_build'),
+                     'bloat_ratio': bloat_ratio(index, baselines.get(index['name']),
+                                                table_stats.get(index['table'], {}).get('live', 0)),
+                     'recommended_lists': (recommended_ivfflat_lists(table_stats.get(index['table'], {}).get('live', 0))
+                                           if index['method'] == 'ivfflat' else None)}
+                    for index in indexes
+                ],
+                'recall': recall,
+                'ef_search': ef_search,
+                'recommendations': recommendations,
+                'actions': actions,
+                'dry_run': dry_run
+            }
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:key)"), {'key': _LOCK_KEY})
+
+
+# Runs changed by bulk writes in this process, picked up by a running scheduler
+_pending_runs: Set[Optional[str]] = set()
+_pending_lock = threading.Lock()
+_pending_event = threading.Event()
+
+
+def notify_bulk_change(run_id: Optional[Union[str, uuid.UUID]] = None):
+    """Ask a running IndexMaintenanceScheduler to check a run soon instead of at its next interval."""
+    with _pending_lock:
+        _pending_runs.add(str(run_id) if run_id else None)
+    _pending_event.set()
+
+
+def _take_pending_runs() -> Set[Optional[str]]:
+    """Runs notified since the last call; the active run (None) when there are none"""
+    with _pending_lock:
+        runs = set(_pending_runs)
+        _pending_runs.clear()
+    return runs or {None}
+
+
+class IndexMaintenanceScheduler:
+    """Background thread running run_maintenance every interval seconds and after bulk writes.
+
+    Lifecycle hooks match the service container: warm_up() starts it, close() stops it.
+    Periodic checks skip the recall probes (forced sequential scans); tables are
+    still measured after their indexes are rebuilt.
+    """
+
+    def __init__(self, interval: Optional[float] = None):
+        """
+        Args:
+            interval: Seconds between checks; INDEX_MAINTENANCE_INTERVAL (default 3600), 0 disables
+        """
+        self.interval = interval if interval is not None else float(os.getenv('INDEX_MAINTENANCE_INTERVAL', '3600'))
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.last_report: Optional[Dict[str, Any]] = None
+
+    def warm_up(self):
+        if self.interval <= 0 or (self._thread and self._thread.is_alive()):
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._loop, name='index-maintenance', daemon=True)
+        self._thread.start()
+        logger.info(f"Index maintenance scheduled every {self.interval:.0f}s")
+
+    def close(self):
+        self._stop.set()
+        _pending_event.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+
+    def _loop(self):
+        while not self._stop.is_set():
+            _pending_event.wait(self.interval)
+            _pending_event.clear()
+            if self._stop.is_set():
+                break
+            for run_id in _take_pending_runs():
+                try:
+                    self.last_report = run_maintenance(run_id, measure=False)
+                except Exception as e:
+                    logger.error(f"Index maintenance failed: {e}")
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='Maintain pgvector indexes of an embedding run')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    for command, help_text in (('report', 'Show index stats, bloat, recall and due maintenance'),
+                               ('run', 'Run the maintenance that is due')):
+        command_parser = subparsers.add_parser(command, help=help_text)
+        command_parser.add_argument('--run-id', help='Embedding run (default: the active run)')
+        command_parser.add_argument('--no-recall', action='store_true', help='Skip measuring recall')
+    args = parser.parse_args()
+
+    report = run_maintenance(args.run_id, dry_run=args.command == 'report', measure=not args.no_recall)
+    if 'skipped' in report:
+        print("Another process is maintaining indexes")
+        return
+    for table, stats in report['tables'].items():
+        recall = report['recall'].get(table)
+        print(f"{table}: {stats['live']} live, {stats['dead']} dead, "
+              f"{stats['mod_since_analyze']} changed since analyze"
+              + (f", recall@{RECALL_K} {recall:.3f}" if recall is not None else ""))
+    for index in report['indexes']:
+        print(f"  {index['name']} ({index['method']}): {index['size_bytes'] / 1024 / 1024:.1f} MiB"
+              + (f", bloat {index['bloat_ratio']:.2f}x since build" if index['bloat_ratio'] is not None
+                 else ", no baseline yet")
+              + (f", recall@{RECALL_K} {index['recall_at_build']:.3f} at build"
+                 if index['recall_at_build'] is not None else "")
+              + (f", recommended lists {index['recommended_lists']}" if index['recommended_lists'] else ""))
+    for recommendation in report['recommendations']:
+        print(f"tune: {recommendation['target']} set VECTOR_HNSW_EF_SEARCH={recommendation['ef_search']} "
+              f"({recommendation['reason']})")
+    for action in report['actions']:
+        print(f"{'due' if report['dry_run'] else 'done'}: {action['action']} {action['target']} ({action['reason']})")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,170 @@
+"""
+Ingest catalogue: which version of every source file has been processed.
+
+Each ingest stage records path, size, mtime and the sha256 of the bytes of
+every file it processed (IngestCatalogueEntry, migration 48f024a8a7d6).
+Incremental runs scan the source directory, compare it against the
+catalogue and only process what actually changed:
+
+- new: path not catalogued and no catalogued file with the same content
+- changed: path catalogued with a different hash
+- unchanged: path catalogued with the same hash
+- moved: path not catalogued, but the content of a catalogued path that
+  has disappeared (renames and re-organised directories)
+- removed: catalogued path that is gone and was not moved
+
+Files whose size and mtime match their entry are not re-hashed, so a scan
+of an unchanged corpus only stats the files.
+"""
+import os
+import uuid
+import hashlib
+import logging
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from backend.db.models import IngestCatalogueEntry
+
+logger = logging.getLogger(__name__)
+
+# IngestCatalogueEntry.stage values
+STAGE_INGEST = 'ingest'
+STAGE_EMBEDDING = 'embedding'
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def file_hash(path: Union[str, Path]) -> str:
+    """Hex sha256 of a file's bytes, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def catalogue_path(path: Union[str, Path], root: Union[str, Path]) -> str:
+    """Catalogue key of a file: its path relative to the scanned directory, '/'-separated"""
+    return Path(os.path.relpath(path, root)).as_posix()
+
+
+def scan_files(files: Iterable[Union[str, Path]], root: Union[str, Path],
+               known: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Dict[str, Any]]:
+    """Current state of files.
+
+    Args:
+        files: Files to scan
+        root: Directory the catalogue paths are relative to
+        known: Catalogued states by path; their hash is reused when size and mtime match
+
+    Returns:
+        {path: {'size', 'mtime', 'content_hash'}}
+    """
+    known = known or {}
+    states = {}
+    for file_path in files:
+        path = catalogue_path(file_path, root)
+        stat = os.stat(file_path)
+        previous = known.get(path)
+        if previous and previous['size'] == stat.st_size and previous['mtime'] == stat.st_mtime:
+            content_hash = previous['content_hash']
+        else:
+            content_hash = file_hash(file_path)
+        states[path] = {'size': stat.st_size, 'mtime': stat.st_mtime, 'content_hash': content_hash}
+    return states
+
+
+def diff_catalogue(current: Dict[str, Dict[str, Any]],
+                   known: Dict[str, Dict[str, Any]]) -> Dict[str, List]:
+    """Compare scanned files against the catalogue.
+
+    Args:
+        current: scan_files() result
+        known: Catalogued states by path
+
+    Returns:
+        {'new': [path], 'changed': [path], 'unchanged': [path],
+         'moved': [(old_path, new_path)], 'removed': [path]}
+    """
+    diff = {'new': [], 'changed': [], 'unchanged': [], 'moved': [], 'removed': []}
+
+    # Content of catalogued paths that disappeared, for recognising moves
+    vanished: Dict[str, List[str]] = {}
+    for path in sorted(known):
+        if path not in current:
+            vanished.setdefault(known[path]['content_hash'], []).append(path)
+
+    for path in sorted(current):
+        state = current[path]
+        if path in known:
+            if known[path]['content_hash'] == state['content_hash']:
+                diff['unchanged'].append(path)
+            else:
+                diff['changed'].append(path)
+        elif vanished.get(state['content_hash']):
+            diff['moved'].append((vanished[state['content_hash']].pop(0), path))
+        else:
+            diff['new'].append(path)
+
+    diff['removed'] = sorted(path for paths in vanished.values() for path in paths)
+    return diff
+
+
+def _entries(db: Session, stage: str, run_id: Optional[Union[str, uuid.UUID]]):
+    query = db.query(IngestCatalogueEntry).filter(IngestCatalogueEntry.stage == stage)
+    if run_id is None:
+        return query.filter(IngestCatalogueEntry.embedding_run_id.is_(None))
+    return query.filter(IngestCatalogueEntry.embedding_run_id == uuid.UUID(str(run_id)))
+
+
+def load_catalogue(db: Session, stage: str,
+                   run_id: Optional[Union[str, uuid.UUID]] = None) -> Dict[str, Dict[str, Any]]:
+    """Catalogued states of a stage (and run) by path"""
+    return {
+        entry.path: {'size': entry.size, 'mtime': entry.mtime, 'content_hash': entry.content_hash}
+        for entry in _entries(db, stage, run_id).all()
+    }
+
+
+def record_file(db: Session, stage: str, path: str, state: Dict[str, Any],
+                run_id: Optional[Union[str, uuid.UUID]] = None,
+                previous_path: Optional[str] = None) -> IngestCatalogueEntry:
+    """Insert or update the entry of a processed file; the caller commits.
+
+    Args:
+        db: Database session
+        stage: STAGE_INGEST or STAGE_EMBEDDING
+        path: Catalogue path of the file
+        state: Its scan_files() state
+        run_id: Embedding run, for STAGE_EMBEDDING
+        previous_path: Path the file was catalogued under before it moved
+    """
+    entry = _entries(db, stage, run_id).filter(IngestCatalogueEntry.path == (previous_path or path)).first()
+    if entry is None:
+        entry = IngestCatalogueEntry(
+            stage=stage,
+            embedding_run_id=uuid.UUID(str(run_id)) if run_id is not None else None
+        )
+        db.add(entry)
+    entry.path = path
+    entry.size = state['size']
+    entry.mtime = state['mtime']
+    entry.content_hash = state['content_hash']
+    return entry
+
+
+def forget_files(db: Session, stage: str, paths: Iterable[str],
+                 run_id: Optional[Union[str, uuid.UUID]] = None) -> int:
+    """Delete the entries of removed files; the caller commits.
+
+    Returns:
+        Number of entries deleted
+    """
+    paths = list(paths)
+    if not paths:
+        return 0
+    return _entries(db, stage, run_id).filter(
+        IngestCatalogueEntry.path.in_(paths)
+    ).delete(synchronize_session=False)
@@ -0,0 +1,84 @@
+"""use_cosine_opclass_for_vector_indexes
+
+Revision ID: 0580a12e70eb
+Revises: b14e34073649
+Create Date: 2025-06-24 14:05:37.902118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0580a12e70eb'
+down_revision: Union[str, None] = 'b14e34073649'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def _x_flag(name: str) -> bool:
+    return context.get_x_argument(as_dictionary=True).get(name, 'false').lower() in ('1', 'true', 'yes')
+
+
+def _index_exists(name: str) -> bool:
+    return op.get_bind().execute(
+        sa.text("SELECT 1 FROM pg_indexes WHERE indexname = :name"), {"name": name}
+    ).first() is not None
+
+
+def upgrade() -> None:
+    # VectorStore now defaults to cosine distance (<=>); an index is only used
+    # when its opclass matches the operator in ORDER BY, so rebuild with vector_cosine_ops.
+    rebuild_ivfflat = _index_exists('ix_embedding_chunks_embedding_ivfflat_l2')
+
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_hnsw_cosine
+            ON embedding_chunks USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+        """)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_hnsw_l2")
+
+        # Opt-in index for VECTOR_DISTANCE_METRIC=inner_product: alembic -x inner_product=true upgrade head
+        if _x_flag('inner_product'):
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_hnsw_ip
+                ON embedding_chunks USING hnsw (embedding vector_ip_ops)
+                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+            """)
+
+        if rebuild_ivfflat:
+            lists = max(10, (op.get_bind().execute(sa.text("SELECT count(*) FROM embedding_chunks")).scalar() or 0) // 1000)
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_ivfflat_cosine
+                ON embedding_chunks USING ivfflat (embedding vector_cosine_ops)
+                WITH (lists = {lists})
+            """)
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_ivfflat_l2")
+
+
+def downgrade() -> None:
+    rebuild_ivfflat = _index_exists('ix_embedding_chunks_embedding_ivfflat_cosine')
+
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_hnsw_l2
+            ON embedding_chunks USING hnsw (embedding vector_l2_ops)
+            WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+        """)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_hnsw_ip")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_hnsw_cosine")
+
+        if rebuild_ivfflat:
+            lists = max(10, (op.get_bind().execute(sa.text("SELECT count(*) FROM embedding_chunks")).scalar() or 0) // 1000)
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_ivfflat_l2
+                ON embedding_chunks USING ivfflat (embedding vector_l2_ops)
+                WITH (lists = {lists})
+            """)
+            op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_ivfflat_cosine")
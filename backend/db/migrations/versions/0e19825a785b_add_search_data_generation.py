@@ -0,0 +1,26 @@
+"""add_search_data_generation
+
+Revision ID: 0e19825a785b
+Revises: 4ada065e76ed
+Create Date: 2025-06-27 16:05:12.418307
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0e19825a785b'
+down_revision: Union[str, None] = '4ada065e76ed'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Bumped by ingestion after each commit; see backend/db/data_generation.py
+    op.execute("CREATE SEQUENCE search_data_generation")
+
+
+def downgrade() -> None:
+    op.execute("DROP SEQUENCE search_data_generation")
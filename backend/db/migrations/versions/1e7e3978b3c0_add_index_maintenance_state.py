@@ -0,0 +1,35 @@
+"""add_index_maintenance_state
+
+Revision ID: 1e7e3978b3c0
+Revises: 0e19825a785b
+Create Date: 2025-06-27 17:38:51.207644
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1e7e3978b3c0'
+down_revision: Union[str, None] = '0e19825a785b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Baselines of vector indexes at their last (re)build; see backend/db/index_maintenance.py
+    op.create_table(
+        'index_maintenance_state',
+        sa.Column('index_name', sa.Text(), nullable=False),
+        sa.Column('rows_at_build', sa.BigInteger(), nullable=False),
+        sa.Column('changes_at_build', sa.BigInteger(), nullable=False),
+        sa.Column('size_at_build', sa.BigInteger(), nullable=False),
+        sa.Column('rebuilt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+        sa.PrimaryKeyConstraint('index_name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('index_maintenance_state')
@@ -0,0 +1,97 @@
+"""add_quantized_embedding_copies
+
+Revision ID: 382ce2eaf094
+Revises: 0580a12e70eb
+Create Date: 2025-06-25 10:17:48.530917
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+
+
+# revision identifiers, used by Alembic.
+revision: str = '382ce2eaf094'
+down_revision: Union[str, None] = '0580a12e70eb'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+DIMENSIONS = 1536
+
+
+FLOAT_HNSW_INDEX = 'ix_embedding_chunks_embedding_hnsw_cosine'
+
+
+def _x_flag(name: str) -> bool:
+    return context.get_x_argument(as_dictionary=True).get(name, 'false').lower() in ('1', 'true', 'yes')
+
+
+def _quantization() -> str:
+    """Opt-in storage mode: alembic -x quantization=halfvec (or binary) upgrade head.
+
+    Must match VECTOR_QUANTIZATION, which also decides the EmbeddingChunk columns and indexes.
+    """
+    mode = context.get_x_argument(as_dictionary=True).get('quantization', 'none').lower()
+    if mode not in ('none', 'halfvec', 'binary'):
+        raise ValueError(f"Unsupported quantization '{mode}' (none, halfvec or binary)")
+    return mode
+
+
+def upgrade() -> None:
+    mode = _quantization()
+    if mode == 'none':
+        # Nothing is stored twice unless quantization is enabled
+        return
+
+    if mode == 'halfvec':
+        # Stored generated column: adding it rewrites the table, which backfills
+        # every existing run, and Postgres keeps it in sync on insert/update.
+        op.execute(f"""
+            ALTER TABLE embedding_chunks
+            ADD COLUMN IF NOT EXISTS embedding_half halfvec({DIMENSIONS})
+            GENERATED ALWAYS AS (embedding::halfvec({DIMENSIONS})) STORED
+        """)
+
+    with op.get_context().autocommit_block():
+        if mode == 'halfvec':
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_half_hnsw_cosine
+                ON embedding_chunks USING hnsw (embedding_half halfvec_cosine_ops)
+                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+            """)
+            if _x_flag('inner_product'):
+                op.execute(f"""
+                    CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_half_hnsw_ip
+                    ON embedding_chunks USING hnsw (embedding_half halfvec_ip_ops)
+                    WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+                """)
+        else:
+            # pgvector has no int8 vector type; binary quantisation (1 bit per dimension,
+            # 32x smaller) is its scalar-quantised option and needs no extra column
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_bit_hnsw_hamming
+                ON embedding_chunks USING hnsw ((binary_quantize(embedding)::bit({DIMENSIONS})) bit_hamming_ops)
+                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+            """)
+
+        # The quantized graph replaces the float32 one, which is what frees the memory;
+        # candidates are still re-ranked against the float32 column
+        op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {FLOAT_HNSW_INDEX}")
+
+    op.execute("ANALYZE embedding_chunks")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS {FLOAT_HNSW_INDEX}
+            ON embedding_chunks USING hnsw (embedding vector_cosine_ops)
+            WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+        """)
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_bit_hnsw_hamming")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_half_hnsw_ip")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_half_hnsw_cosine")
+
+    op.execute("ALTER TABLE embedding_chunks DROP COLUMN IF EXISTS embedding_half")
@@ -0,0 +1,35 @@
+"""add_embedding_cache
+
+Revision ID: 3d2808008cfa
+Revises: 1e7e3978b3c0
+Create Date: 2025-06-28 10:12:44.530871
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3d2808008cfa'
+down_revision: Union[str, None] = '1e7e3978b3c0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'embedding_cache',
+        sa.Column('model', sa.Text(), nullable=False),
+        sa.Column('dimensions', sa.Integer(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('embedding', Vector(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('model', 'dimensions', 'content_hash')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('embedding_cache')
@@ -0,0 +1,50 @@
+"""add_ingest_catalogue
+
+Revision ID: 48f024a8a7d6
+Revises: 3d2808008cfa
+Create Date: 2025-06-29 09:41:17.206384
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '48f024a8a7d6'
+down_revision: Union[str, None] = '3d2808008cfa'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'ingest_catalogue',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('stage', sa.Text(), nullable=False),
+        sa.Column('embedding_run_id', postgresql.UUID(as_uuid=True), nullable=True),
+        sa.Column('path', sa.Text(), nullable=False),
+        sa.Column('size', sa.BigInteger(), nullable=False),
+        sa.Column('mtime', sa.Float(), nullable=False),
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['embedding_run_id'], ['embedding_runs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    # One row per path: per stage for run_ingest.py, per run for the embedding stage
+    op.create_index('uix_ingest_catalogue_stage_path', 'ingest_catalogue', ['stage', 'path'],
+                    unique=True, postgresql_where=sa.text('embedding_run_id IS NULL'))
+    op.create_index('uix_ingest_catalogue_run_path', 'ingest_catalogue', ['embedding_run_id', 'path'],
+                    unique=True, postgresql_where=sa.text('embedding_run_id IS NOT NULL'))
+    # Moved files are recognised by their hash
+    op.create_index('ix_ingest_catalogue_content_hash', 'ingest_catalogue', ['content_hash'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_ingest_catalogue_content_hash', table_name='ingest_catalogue')
+    op.drop_index('uix_ingest_catalogue_run_path', table_name='ingest_catalogue')
+    op.drop_index('uix_ingest_catalogue_stage_path', table_name='ingest_catalogue')
+    op.drop_table('ingest_catalogue')
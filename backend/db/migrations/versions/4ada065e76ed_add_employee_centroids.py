@@ -0,0 +1,71 @@
+"""add_employee_centroids
+
+Revision ID: 4ada065e76ed
+Revises: 840671e5263b
+Create Date: 2025-06-27 14:21:37.905126
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4ada065e76ed'
+down_revision: Union[str, None] = '840671e5263b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def upgrade() -> None:
+    op.create_table(
+        'employee_centroids',
+        sa.Column('id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('employee_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('embedding_run_id', postgresql.UUID(as_uuid=True), nullable=False),
+        sa.Column('document_type', sa.Text(), nullable=False),
+        sa.Column('embedding', Vector(1536), nullable=False),
+        sa.Column('chunk_count', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.ForeignKeyConstraint(['employee_id'], ['employees.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['embedding_run_id'], ['embedding_runs.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('employee_id', 'embedding_run_id', 'document_type', name='uix_employee_centroid')
+    )
+    op.create_index('ix_employee_centroids_run_document_type', 'employee_centroids',
+                    ['embedding_run_id', 'document_type'])
+
+    # Backfill every existing run; same statement as backend.db.employee_centroids
+    op.execute("""
+        INSERT INTO employee_centroids
+            (id, employee_id, embedding_run_id, document_type, embedding, chunk_count)
+        SELECT gen_random_uuid(), c.employee_id, c.embedding_run_id,
+               COALESCE(c.document_type, 'all'), l2_normalize(avg(c.embedding)), count(*)
+        FROM embedding_chunks c
+        GROUP BY GROUPING SETS (
+            (c.employee_id, c.embedding_run_id, c.document_type),
+            (c.employee_id, c.embedding_run_id)
+        )
+        HAVING GROUPING(c.document_type) = 1 OR c.document_type IS NOT NULL
+    """)
+
+    # Built after the backfill, which is faster than maintaining it row by row
+    op.execute(f"""
+        CREATE INDEX ix_employee_centroids_embedding_hnsw_cosine
+        ON employee_centroids USING hnsw (embedding vector_cosine_ops)
+        WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+    """)
+    op.execute("ANALYZE employee_centroids")
+
+
+def downgrade() -> None:
+    op.drop_index('ix_employee_centroids_embedding_hnsw_cosine', table_name='employee_centroids')
+    op.drop_index('ix_employee_centroids_run_document_type', table_name='employee_centroids')
+    op.drop_table('employee_centroids')
@@ -0,0 +1,27 @@
+"""add_recall_at_build_to_index_maintenance_state
+
+Revision ID: 5c0b7e1f9a42
+Revises: 48f024a8a7d6
+Create Date: 2025-06-30 11:08:42.517903
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5c0b7e1f9a42'
+down_revision: Union[str, None] = '48f024a8a7d6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # recall@k measured right after an index was (re)built or first seen; see backend/db/index_maintenance.py
+    op.add_column('index_maintenance_state', sa.Column('recall_at_build', sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('index_maintenance_state', 'recall_at_build')
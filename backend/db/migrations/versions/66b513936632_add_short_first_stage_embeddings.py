@@ -0,0 +1,71 @@
+"""add_short_first_stage_embeddings
+
+Revision ID: 66b513936632
+Revises: 382ce2eaf094
+Create Date: 2025-06-25 16:42:09.114873
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+from pgvector.sqlalchemy import Vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = '66b513936632'
+down_revision: Union[str, None] = '382ce2eaf094'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+SHORT_DIMENSIONS = (256, 512)
+
+
+def upgrade() -> None:
+    op.add_column('embedding_runs', sa.Column('short_dimensions', sa.Integer(), nullable=True))
+    op.add_column('embedding_chunks', sa.Column('embedding_short', Vector(), nullable=True))
+
+    # Existing text-embedding-3 runs can be backfilled from their full vectors:
+    # alembic -x short_dimensions=256 upgrade head
+    backfill = context.get_x_argument(as_dictionary=True).get('short_dimensions')
+    if backfill:
+        dims = int(backfill)
+        if dims not in SHORT_DIMENSIONS:
+            raise ValueError(f"short_dimensions must be one of {SHORT_DIMENSIONS}")
+        op.execute(f"""
+            UPDATE embedding_runs SET short_dimensions = {dims}
+            WHERE short_dimensions IS NULL AND embedding_model LIKE 'text-embedding-3%'
+        """)
+        op.execute(f"""
+            UPDATE embedding_chunks c
+            SET embedding_short = l2_normalize(subvector(c.embedding, 1, {dims}))
+            FROM embedding_documents d
+            JOIN embedding_runs r ON r.id = d.embedding_run_id
+            WHERE d.external_document_id = c.external_document_id
+              AND r.short_dimensions = {dims}
+              AND c.embedding_short IS NULL
+        """)
+
+    # The column is untyped so runs can pick their length; HNSW needs a fixed
+    # dimension, hence one partial expression index per supported length.
+    with op.get_context().autocommit_block():
+        for dims in SHORT_DIMENSIONS:
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_short{dims}_hnsw_cosine
+                ON embedding_chunks USING hnsw ((embedding_short::vector({dims})) vector_cosine_ops)
+                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+                WHERE vector_dims(embedding_short) = {dims}
+            """)
+
+    op.execute("ANALYZE embedding_chunks")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for dims in SHORT_DIMENSIONS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_short{dims}_hnsw_cosine")
+
+    op.drop_column('embedding_chunks', 'embedding_short')
+    op.drop_column('embedding_runs', 'short_dimensions')
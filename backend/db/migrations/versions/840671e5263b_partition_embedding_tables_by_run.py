@@ -0,0 +1,156 @@
+"""partition_embedding_tables_by_run
+
+Revision ID: 840671e5263b
+Revises: f36c081f2e8d
+Create Date: 2025-06-27 09:52:14.660381
+
+"""
+from typing import Sequence, Union, Dict, List
+import uuid
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '840671e5263b'
+down_revision: Union[str, None] = 'f36c081f2e8d'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Referenced table first
+TABLES = ('embedding_documents', 'embedding_chunks')
+
+
+def _partition_name(table: str, run_id) -> str:
+    # Must match backend.db.embedding_runs.partition_name
+    return f"{table}_{uuid.UUID(str(run_id)).hex}"
+
+
+def _index_definitions(table: str) -> List[str]:
+    """CREATE INDEX statements for the table's non-constraint indexes, replayed after the swap"""
+    rows = op.get_bind().execute(sa.text("""
+        SELECT indexdef FROM pg_indexes
+        WHERE schemaname = current_schema() AND tablename = :table
+          AND indexname NOT IN (SELECT conname FROM pg_constraint)
+    """), {"table": table}).all()
+    # Partitioned parents report "ON ONLY"; plain CREATE INDEX recurses into partitions
+    return [row.indexdef.replace(" ON ONLY ", " ON ") for row in rows]
+
+
+def _insertable_columns(table: str) -> str:
+    rows = op.get_bind().execute(sa.text("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = :table AND is_generated = 'NEVER'
+        ORDER BY ordinal_position
+    """), {"table": table}).all()
+    return ', '.join(row.column_name for row in rows)
+
+
+def _swap_tables(partitioned: bool) -> Dict[str, List[str]]:
+    """Recreate both tables (partitioned or plain) and copy their rows across.
+
+    Returns the captured index definitions; the caller adds the constraints
+    (they differ between the two layouts) and then replays the indexes.
+    """
+    index_definitions: Dict[str, List[str]] = {table: _index_definitions(table) for table in TABLES}
+
+    for table in TABLES:
+        op.execute(f"ALTER TABLE {table} RENAME TO {table}_old")
+        partition_clause = "PARTITION BY LIST (embedding_run_id)" if partitioned else ""
+        op.execute(f"""
+            CREATE TABLE {table} (LIKE {table}_old INCLUDING DEFAULTS INCLUDING GENERATED)
+            {partition_clause}
+        """)
+
+    if partitioned:
+        run_ids = [row.id for row in op.get_bind().execute(sa.text("SELECT id FROM embedding_runs")).all()]
+        for run_id in run_ids:
+            for table in TABLES:
+                op.execute(
+                    f"CREATE TABLE {_partition_name(table, run_id)} "
+                    f"PARTITION OF {table} FOR VALUES IN ('{run_id}')"
+                )
+
+    for table in TABLES:
+        columns = _insertable_columns(table)
+        op.execute(f"INSERT INTO {table} ({columns}) SELECT {columns} FROM {table}_old")
+
+    op.execute("DROP TABLE embedding_chunks_old, embedding_documents_old CASCADE")
+    return index_definitions
+
+
+def _replay_indexes(index_definitions: Dict[str, List[str]]) -> None:
+    for table in TABLES:
+        for definition in index_definitions.get(table, []):
+            op.execute(definition)
+        op.execute(f"ANALYZE {table}")
+
+
+def upgrade() -> None:
+    # Active run pointer; the most recent run becomes active
+    op.add_column('embedding_runs', sa.Column('is_active', sa.Boolean(), nullable=False, server_default=sa.text('false')))
+    op.execute("""
+        UPDATE embedding_runs SET is_active = true
+        WHERE id = (SELECT id FROM embedding_runs ORDER BY created_at DESC LIMIT 1)
+    """)
+    op.create_index('uix_embedding_runs_active', 'embedding_runs', ['is_active'],
+                    unique=True, postgresql_where=sa.text('is_active'))
+
+    # The partition key has to be on both tables
+    op.add_column('embedding_chunks', sa.Column('embedding_run_id', postgresql.UUID(as_uuid=True), nullable=True))
+    op.execute("""
+        UPDATE embedding_chunks c
+        SET embedding_run_id = d.embedding_run_id
+        FROM embedding_documents d
+        WHERE d.external_document_id = c.external_document_id
+    """)
+    op.execute("ALTER TABLE embedding_chunks ALTER COLUMN embedding_run_id SET NOT NULL")
+
+    index_definitions = _swap_tables(partitioned=True)
+
+    # Primary keys and unique constraints on partitioned tables must include the partition key
+    op.execute("ALTER TABLE embedding_documents ADD PRIMARY KEY (id, embedding_run_id)")
+    op.execute("ALTER TABLE embedding_documents ADD CONSTRAINT uix_source_run UNIQUE (source_filename, embedding_run_id)")
+    op.execute("""
+        ALTER TABLE embedding_documents
+        ADD CONSTRAINT uix_external_document_run UNIQUE (external_document_id, embedding_run_id)
+    """)
+    op.execute("ALTER TABLE embedding_documents ADD FOREIGN KEY (employee_id) REFERENCES employees (id)")
+    op.execute("ALTER TABLE embedding_documents ADD FOREIGN KEY (embedding_run_id) REFERENCES embedding_runs (id)")
+
+    op.execute("ALTER TABLE embedding_chunks ADD PRIMARY KEY (id, embedding_run_id)")
+    op.execute("ALTER TABLE embedding_chunks ADD FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE")
+    op.execute("ALTER TABLE embedding_chunks ADD FOREIGN KEY (embedding_run_id) REFERENCES embedding_runs (id) ON DELETE CASCADE")
+    op.execute("""
+        ALTER TABLE embedding_chunks
+        ADD FOREIGN KEY (external_document_id, embedding_run_id)
+        REFERENCES embedding_documents (external_document_id, embedding_run_id) ON DELETE CASCADE
+    """)
+
+    _replay_indexes(index_definitions)
+
+
+def downgrade() -> None:
+    # The unpartitioned layout allows each source document only once across runs
+    index_definitions = _swap_tables(partitioned=False)
+
+    op.execute("ALTER TABLE embedding_documents ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE embedding_documents ADD CONSTRAINT uix_source_run UNIQUE (source_filename, embedding_run_id)")
+    op.execute("ALTER TABLE embedding_documents ADD UNIQUE (external_document_id)")
+    op.execute("ALTER TABLE embedding_documents ADD FOREIGN KEY (employee_id) REFERENCES employees (id)")
+    op.execute("ALTER TABLE embedding_documents ADD FOREIGN KEY (embedding_run_id) REFERENCES embedding_runs (id)")
+
+    op.execute("ALTER TABLE embedding_chunks ADD PRIMARY KEY (id)")
+    op.execute("ALTER TABLE embedding_chunks ADD FOREIGN KEY (employee_id) REFERENCES employees (id) ON DELETE CASCADE")
+    op.execute("""
+        ALTER TABLE embedding_chunks
+        ADD FOREIGN KEY (external_document_id) REFERENCES embedding_documents (external_document_id) ON DELETE CASCADE
+    """)
+
+    _replay_indexes(index_definitions)
+
+    op.drop_column('embedding_chunks', 'embedding_run_id')
+    op.drop_index('uix_embedding_runs_active', table_name='embedding_runs')
+    op.drop_column('embedding_runs', 'is_active')
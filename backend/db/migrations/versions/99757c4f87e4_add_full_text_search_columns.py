@@ -0,0 +1,62 @@
+"""add_full_text_search_columns
+
+Revision ID: 99757c4f87e4
+Revises: 66b513936632
+Create Date: 2025-06-26 11:08:55.702341
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '99757c4f87e4'
+down_revision: Union[str, None] = '66b513936632'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, column, generated expression, index name)
+TSVECTOR_COLUMNS = [
+    (
+        'embedding_chunks', 'content_tsv',
+        "to_tsvector('english', content)",
+        'ix_embedding_chunks_content_tsv',
+    ),
+    (
+        'employee_experiences', 'search_tsv',
+        "to_tsvector('english', coalesce(company, '') || ' ' || coalesce(title, '') || ' ' || coalesce(description, ''))",
+        'ix_employee_experiences_search_tsv',
+    ),
+    (
+        'employee_skills', 'skill_tsv',
+        "to_tsvector('simple', skill)",
+        'ix_employee_skills_skill_tsv',
+    ),
+]
+
+
+def upgrade() -> None:
+    # Stored generated columns are filled for existing rows when added and kept in sync by Postgres
+    for table, column, expression, _ in TSVECTOR_COLUMNS:
+        op.execute(f"""
+            ALTER TABLE {table}
+            ADD COLUMN IF NOT EXISTS {column} tsvector
+            GENERATED ALWAYS AS ({expression}) STORED
+        """)
+
+    with op.get_context().autocommit_block():
+        for table, column, _, index_name in TSVECTOR_COLUMNS:
+            op.execute(f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {index_name} ON {table} USING gin ({column})")
+
+    for table, _, _, _ in TSVECTOR_COLUMNS:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for _, _, _, index_name in TSVECTOR_COLUMNS:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {index_name}")
+
+    for table, column, _, _ in TSVECTOR_COLUMNS:
+        op.drop_column(table, column)
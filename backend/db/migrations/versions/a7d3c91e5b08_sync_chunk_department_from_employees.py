@@ -0,0 +1,54 @@
+"""sync_chunk_department_from_employees
+
+Revision ID: a7d3c91e5b08
+Revises: 5c0b7e1f9a42
+Create Date: 2025-07-01 09:42:17.306518
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a7d3c91e5b08'
+down_revision: Union[str, None] = '5c0b7e1f9a42'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # embedding_chunks.department is denormalised from employees (migration f36c081f2e8d);
+    # keep it in step with department edits in the same transaction, whoever makes them
+    op.execute("""
+        CREATE OR REPLACE FUNCTION sync_embedding_chunks_department() RETURNS trigger AS $$
+        BEGIN
+            UPDATE embedding_chunks
+            SET department = NEW.department
+            WHERE employee_id = NEW.id
+              AND department IS DISTINCT FROM NEW.department;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+    """)
+    op.execute("""
+        CREATE TRIGGER trg_employees_sync_chunk_department
+        AFTER UPDATE OF department ON employees
+        FOR EACH ROW
+        WHEN (OLD.department IS DISTINCT FROM NEW.department)
+        EXECUTE FUNCTION sync_embedding_chunks_department()
+    """)
+
+    # Repair chunks that drifted before the trigger existed
+    op.execute("""
+        UPDATE embedding_chunks c
+        SET department = e.department
+        FROM employees e
+        WHERE e.id = c.employee_id
+          AND c.department IS DISTINCT FROM e.department
+    """)
+
+
+def downgrade() -> None:
+    op.execute("DROP TRIGGER IF EXISTS trg_employees_sync_chunk_department ON employees")
+    op.execute("DROP FUNCTION IF EXISTS sync_embedding_chunks_department()")
@@ -0,0 +1,63 @@
+"""add_ann_indexes_to_embedding_chunks
+
+Revision ID: b14e34073649
+Revises: 0e9bcbc652b4
+Create Date: 2025-06-23 09:41:12.318204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op, context
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b14e34073649'
+down_revision: Union[str, None] = '0e9bcbc652b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# HNSW build parameters (pgvector defaults, kept explicit so they show up in \d+)
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+
+def _ivfflat_requested() -> bool:
+    """IVFFlat is opt-in: alembic -x ivfflat=true upgrade head"""
+    return context.get_x_argument(as_dictionary=True).get('ivfflat', 'false').lower() in ('1', 'true', 'yes')
+
+
+def _ivfflat_lists() -> int:
+    """Number of IVFFlat lists: -x ivfflat_lists=N, or rows / 1000 (min 10) as recommended by pgvector."""
+    lists = context.get_x_argument(as_dictionary=True).get('ivfflat_lists')
+    if lists:
+        return int(lists)
+    row_count = op.get_bind().execute(sa.text("SELECT count(*) FROM embedding_chunks")).scalar() or 0
+    return max(10, row_count // 1000)
+
+
+def upgrade() -> None:
+    # Vector indexes are built CONCURRENTLY so ingestion can keep writing,
+    # which is not allowed inside the migration transaction.
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_hnsw_l2
+            ON embedding_chunks USING hnsw (embedding vector_l2_ops)
+            WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+        """)
+
+        if _ivfflat_requested():
+            # IVFFlat lists are trained on existing rows, so only build it on a loaded table
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_ivfflat_l2
+                ON embedding_chunks USING ivfflat (embedding vector_l2_ops)
+                WITH (lists = {_ivfflat_lists()})
+            """)
+
+    op.execute("ANALYZE embedding_chunks")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_ivfflat_l2")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_hnsw_l2")
@@ -0,0 +1,82 @@
+"""denormalise_filter_columns_onto_chunks
+
+Revision ID: f36c081f2e8d
+Revises: 99757c4f87e4
+Create Date: 2025-06-26 15:33:20.418657
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f36c081f2e8d'
+down_revision: Union[str, None] = '99757c4f87e4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+HNSW_M = 16
+HNSW_EF_CONSTRUCTION = 64
+
+# Document types that get their own partial HNSW graph
+PARTIAL_HNSW_DOCUMENT_TYPES = ('cv', 'assessment')
+
+
+def upgrade() -> None:
+    op.add_column('embedding_chunks', sa.Column('document_type', sa.Text(), nullable=True))
+    op.add_column('embedding_chunks', sa.Column('department', sa.String(length=100), nullable=True))
+    op.add_column('embedding_chunks', sa.Column('assessment_type', sa.String(length=50), nullable=True))
+
+    # Backfill from the tables the search used to join against
+    op.execute("""
+        UPDATE embedding_chunks c
+        SET document_type = d.document_type
+        FROM embedding_documents d
+        WHERE d.external_document_id = c.external_document_id
+    """)
+    op.execute("""
+        UPDATE embedding_chunks c
+        SET department = e.department
+        FROM employees e
+        WHERE e.id = c.employee_id
+    """)
+    op.execute("""
+        UPDATE embedding_chunks c
+        SET assessment_type = a.assessment_type
+        FROM employee_assessments a
+        WHERE a.id = c.external_document_id
+    """)
+
+    with op.get_context().autocommit_block():
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_employee_id ON embedding_chunks (employee_id)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_document_type ON embedding_chunks (document_type)")
+        op.execute("CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_department ON embedding_chunks (department)")
+        op.execute("""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_assessment_type
+            ON embedding_chunks (assessment_type) WHERE assessment_type IS NOT NULL
+        """)
+        for document_type in PARTIAL_HNSW_DOCUMENT_TYPES:
+            op.execute(f"""
+                CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_embedding_chunks_embedding_hnsw_cosine_{document_type}
+                ON embedding_chunks USING hnsw (embedding vector_cosine_ops)
+                WITH (m = {HNSW_M}, ef_construction = {HNSW_EF_CONSTRUCTION})
+                WHERE document_type = '{document_type}'
+            """)
+
+    op.execute("ANALYZE embedding_chunks")
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for document_type in PARTIAL_HNSW_DOCUMENT_TYPES:
+            op.execute(f"DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_embedding_hnsw_cosine_{document_type}")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_assessment_type")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_department")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_document_type")
+        op.execute("DROP INDEX CONCURRENTLY IF EXISTS ix_embedding_chunks_employee_id")
+
+    op.drop_column('embedding_chunks', 'assessment_type')
+    op.drop_column('embedding_chunks', 'department')
+    op.drop_column('embedding_chunks', 'document_type')
@@ -1,17 +1,50 @@
+import os
 from datetime import datetime
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Text, Enum, UniqueConstraint, Boolean, Date, func
-from sqlalchemy.orm import relationship, declarative_base
+from sqlalchemy import Column, Integer, BigInteger, String, Float, ForeignKey, ForeignKeyConstraint, DateTime, Text, Enum, UniqueConstraint, Boolean, Date, Index, Computed, func, text
+from sqlalchemy.orm import relationship, declarative_base, deferred
 from sqlalchemy.ext.declarative import declared_attr
 import uuid
 from sqlalchemy import (
     Column, String, Integer, Date, Text, JSON, TIMESTAMP, ForeignKey, Float
 )
-from sqlalchemy.dialects.postgresql import UUID as PG_UUID
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID, TSVECTOR
 from sqlalchemy.orm import relationship, declarative_base
-from pgvector.sqlalchemy import Vector
+from pgvector.sqlalchemy import Vector, HALFVEC
 
 Base = declarative_base()
 
+# Opt-in quantized storage of chunk embeddings: 'halfvec' adds a half-precision copy,
+# 'binary' an index over binary_quantize(embedding); either graph replaces the float32
+# HNSW index. Must match the mode migration 382ce2eaf094 was run with (-x quantization=...)
+EMBEDDING_QUANTIZATION = os.getenv('VECTOR_QUANTIZATION', 'none')
+
+
+def _chunk_embedding_index() -> Index:
+    """HNSW graph over embedding_chunks for EMBEDDING_QUANTIZATION"""
+    if EMBEDDING_QUANTIZATION == 'halfvec':
+        return Index(
+            'ix_embedding_chunks_embedding_half_hnsw_cosine',
+            'embedding_half',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding_half': 'halfvec_cosine_ops'}
+        )
+    if EMBEDDING_QUANTIZATION == 'binary':
+        return Index(
+            'ix_embedding_chunks_embedding_bit_hnsw_hamming',
+            text("(binary_quantize(embedding)::bit(1536)) bit_hamming_ops"),
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64}
+        )
+    return Index(
+        'ix_embedding_chunks_embedding_hnsw_cosine',
+        'embedding',
+        postgresql_using='hnsw',
+        postgresql_with={'m': 16, 'ef_construction': 64},
+        postgresql_ops={'embedding': 'vector_cosine_ops'}
+    )
+
+
 class TimestampMixin:
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
@@ -88,6 +121,15 @@ class EmployeeExperience(Base, TimestampMixin):
     start_date = Column(Date)
     end_date = Column(Date)
     description = Column(Text)
+    # Full-text search over company, title and description (see migration 99757c4f87e4)
+    search_tsv = Column(TSVECTOR, Computed(
+        "to_tsvector('english', coalesce(company, '') || ' ' || coalesce(title, '') || ' ' || coalesce(description, ''))",
+        persisted=True
+    ))
+
+    __table_args__ = (
+        Index('ix_employee_experiences_search_tsv', 'search_tsv', postgresql_using='gin'),
+    )
     
     # Relationship
     employee = relationship("Employee", back_populates="experiences")
@@ -100,6 +142,12 @@ class EmployeeSkill(Base, TimestampMixin):
     employee_id = Column(PG_UUID(as_uuid=True), ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
     skill = Column(String(255), nullable=False)
     type = Column(String(50), nullable=False, default='technical')  # technical, soft, language, etc.
+    # 'simple' config: skill names like "Kubernetes" or "SQL" must not be stemmed
+    skill_tsv = Column(TSVECTOR, Computed("to_tsvector('simple', skill)", persisted=True))
+
+    __table_args__ = (
+        Index('ix_employee_skills_skill_tsv', 'skill_tsv', postgresql_using='gin'),
+    )
     
     # Relationship
     employee = relationship("Employee", back_populates="skills")
@@ -154,6 +202,14 @@ class EmbeddingRun(Base, TimestampMixin):
     name = Column(Text, nullable=False)
     chunking_method = Column(Text, nullable=False)
     embedding_model = Column(Text, nullable=False)
+    # Length of the shortened first-stage vectors (256 or 512), None to store full vectors only
+    short_dimensions = Column(Integer, nullable=True)
+    # The run all searches read from; at most one (see backend/db/embedding_runs.py)
+    is_active = Column(Boolean, nullable=False, default=False, server_default=text('false'))
+
+    __table_args__ = (
+        Index('uix_embedding_runs_active', 'is_active', unique=True, postgresql_where=text('is_active')),
+    )
 
     # Relationships
     documents = relationship("EmbeddingDocument", back_populates="embedding_run", cascade="all, delete-orphan")
@@ -162,11 +218,12 @@ class EmbeddingDocument(Base):
     __tablename__ = "embedding_documents"
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     employee_id = Column(PG_UUID(as_uuid=True), ForeignKey("employees.id"), nullable=False)
-    embedding_run_id = Column(PG_UUID(as_uuid=True), ForeignKey("embedding_runs.id"), nullable=False)
+    # Partition key: part of the primary key and of every unique constraint
+    embedding_run_id = Column(PG_UUID(as_uuid=True), ForeignKey("embedding_runs.id"), primary_key=True)
     document_type = Column(Text, nullable=False)
     source_filename = Column(Text, nullable=False)
     title = Column(Text)
-    external_document_id = Column(PG_UUID(as_uuid=True), nullable=False, unique=True)  # Links to employee_cvs.id or employee_assessments.id
+    external_document_id = Column(PG_UUID(as_uuid=True), nullable=False)  # Links to employee_cvs.id or employee_assessments.id
     parsed_source_id = Column(PG_UUID(as_uuid=True))  # For tracking the parsed source
     source_type = Column(Text)  # Type of the source document
     created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -175,6 +232,10 @@ class EmbeddingDocument(Base):
     # Add unique constraint for source_filename and embedding_run_id
     __table_args__ = (
         UniqueConstraint('source_filename', 'embedding_run_id', name='uix_source_run'),
+        # A source document is embedded once per run
+        UniqueConstraint('external_document_id', 'embedding_run_id', name='uix_external_document_run'),
+        # One partition per run, created by create_run_partitions (see migration 840671e5263b)
+        {'postgresql_partition_by': 'LIST (embedding_run_id)'},
     )
 
     # Relationships
@@ -188,14 +249,153 @@ class EmbeddingChunk(Base, TimestampMixin):
 
     id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     employee_id = Column(PG_UUID(as_uuid=True), ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
-    external_document_id = Column(PG_UUID(as_uuid=True), ForeignKey('embedding_documents.external_document_id', ondelete='CASCADE'), nullable=False)
+    # Partition key, copied from the chunk's document
+    embedding_run_id = Column(PG_UUID(as_uuid=True), ForeignKey('embedding_runs.id', ondelete='CASCADE'), primary_key=True)
+    external_document_id = Column(PG_UUID(as_uuid=True), nullable=False)
     chunk_index = Column(Integer, nullable=False)
     content = Column(Text, nullable=False)
-    embedding = Column(Vector(1536), nullable=False)
+    # Vector columns are deferred: loading a chunk entity never pulls them unless
+    # accessed, so lookups that only need content stay small
+    embedding = deferred(Column(Vector(1536), nullable=False))
+    if EMBEDDING_QUANTIZATION == 'halfvec':
+        # Half-precision copy maintained by Postgres, used for the first-stage ANN
+        # scan (see migration 382ce2eaf094)
+        embedding_half = deferred(Column(HALFVEC(1536), Computed("embedding::halfvec(1536)", persisted=True)))
+    # Truncated, re-normalised prefix of embedding (EmbeddingRun.short_dimensions long);
+    # indexed per length with partial expression indexes (see migration 66b513936632)
+    embedding_short = deferred(Column(Vector(), nullable=True))
     token_count = Column(Integer, nullable=True)
     char_count = Column(Integer, nullable=True)
     chunk_label = Column(Text, nullable=True)
+    # Denormalised filter columns so filtered vector searches use indexed predicates
+    # instead of joins (see migration f36c081f2e8d); written by EmbeddingPipeline.
+    # department follows employees.department via a trigger (see migration a7d3c91e5b08)
+    document_type = Column(Text, nullable=True)
+    department = Column(String(100), nullable=True)
+    assessment_type = Column(String(50), nullable=True)
+    # Full-text search vector for lexical retrieval (see migration 99757c4f87e4)
+    content_tsv = deferred(Column(TSVECTOR, Computed("to_tsvector('english', content)", persisted=True)))
+
+    # HNSW index for approximate nearest neighbour search; opclass must match
+    # VectorStore's default cosine metric (see migration 0580a12e70eb). With
+    # quantized storage the graph is built over the compressed copy instead.
+    # Indexes on the partitioned parent are created on every run partition.
+    __table_args__ = (
+        ForeignKeyConstraint(
+            ['external_document_id', 'embedding_run_id'],
+            ['embedding_documents.external_document_id', 'embedding_documents.embedding_run_id'],
+            ondelete='CASCADE'
+        ),
+        _chunk_embedding_index(),
+        Index('ix_embedding_chunks_content_tsv', 'content_tsv', postgresql_using='gin'),
+        Index('ix_embedding_chunks_employee_id', 'employee_id'),
+        Index('ix_embedding_chunks_document_type', 'document_type'),
+        Index('ix_embedding_chunks_department', 'department'),
+        Index('ix_embedding_chunks_assessment_type', 'assessment_type',
+              postgresql_where=text("assessment_type IS NOT NULL")),
+        # Per document type HNSW graphs, used when a search is scoped to one type
+        Index(
+            'ix_embedding_chunks_embedding_hnsw_cosine_cv',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_where=text("document_type = 'cv'")
+        ),
+        Index(
+            'ix_embedding_chunks_embedding_hnsw_cosine_assessment',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+            postgresql_where=text("document_type = 'assessment'")
+        ),
+        {'postgresql_partition_by': 'LIST (embedding_run_id)'},
+    )
     
     # Relationships
     employee = relationship("Employee")
-    document = relationship("EmbeddingDocument", back_populates="chunks", foreign_keys=[external_document_id])
\ No newline at end of file
+    document = relationship("EmbeddingDocument", back_populates="chunks",
+                            foreign_keys=[external_document_id, embedding_run_id])
+
+
+class EmployeeCentroid(Base, TimestampMixin):
+    """Mean chunk embedding per employee and run, overall and per document type.
+
+    Shortlists employees for two-stage employee search (a few hundred rows
+    instead of every chunk); maintained by EmbeddingPipeline, see
+    backend/db/employee_centroids.py and migration 4ada065e76ed.
+    """
+    __tablename__ = 'employee_centroids'
+
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    employee_id = Column(PG_UUID(as_uuid=True), ForeignKey('employees.id', ondelete='CASCADE'), nullable=False)
+    embedding_run_id = Column(PG_UUID(as_uuid=True), ForeignKey('embedding_runs.id', ondelete='CASCADE'), nullable=False)
+    # A chunk document_type, or 'all' for the centroid over every chunk
+    document_type = Column(Text, nullable=False)
+    # L2-normalised mean of the chunk embeddings
+    embedding = deferred(Column(Vector(1536), nullable=False))
+    chunk_count = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint('employee_id', 'embedding_run_id', 'document_type', name='uix_employee_centroid'),
+        Index('ix_employee_centroids_run_document_type', 'embedding_run_id', 'document_type'),
+        Index(
+            'ix_employee_centroids_embedding_hnsw_cosine',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'}
+        ),
+    )
+
+    # Relationships
+    employee = relationship("Employee")
+
+class EmbeddingCacheEntry(Base):
+    """Content-addressed embedding cache shared by all runs.
+
+    Keyed by (model, dimensions, sha256 of the text), so re-embedding the
+    same text with the same model (new runs, chunking experiments,
+    re-ingests) reuses the stored vector instead of calling the provider;
+    see backend/ingestion/embedding/cached_embedder.py and migration 3d2808008cfa.
+    """
+    __tablename__ = 'embedding_cache'
+
+    model = Column(Text, primary_key=True)
+    dimensions = Column(Integer, primary_key=True)
+    # Hex sha256 of the UTF-8 text
+    content_hash = Column(String(64), primary_key=True)
+    # Untyped: vector length depends on the model
+    embedding = Column(Vector(), nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+class IngestCatalogueEntry(Base, TimestampMixin):
+    """Size, mtime and content hash of every source file an ingest stage has processed.
+
+    stage 'ingest' rows belong to run_ingest.py (embedding_run_id is NULL);
+    stage 'embedding' rows record which file versions a run's documents were
+    embedded from. Incremental runs compare source directories against these
+    rows to only process new or changed files; see backend/db/ingest_catalogue.py
+    and migration 48f024a8a7d6.
+    """
+    __tablename__ = 'ingest_catalogue'
+
+    id = Column(PG_UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    stage = Column(Text, nullable=False)
+    embedding_run_id = Column(PG_UUID(as_uuid=True), ForeignKey('embedding_runs.id', ondelete='CASCADE'), nullable=True)
+    # Relative to the scanned directory, '/'-separated
+    path = Column(Text, nullable=False)
+    size = Column(BigInteger, nullable=False)
+    # st_mtime in seconds since the epoch
+    mtime = Column(Float, nullable=False)
+    # Hex sha256 of the file bytes
+    content_hash = Column(String(64), nullable=False)
+
+    __table_args__ = (
+        Index('uix_ingest_catalogue_stage_path', 'stage', 'path', unique=True,
+              postgresql_where=text('embedding_run_id IS NULL')),
+        Index('uix_ingest_catalogue_run_path', 'embedding_run_id', 'path', unique=True,
+              postgresql_where=text('embedding_run_id IS NOT NULL')),
+        Index('ix_ingest_catalogue_content_hash', 'content_hash'),
+    )
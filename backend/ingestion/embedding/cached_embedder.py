@@ -0,0 +1,136 @@
+"""
+Content-addressed embedding cache (the embedding_cache table, EmbeddingCacheEntry).
+
+CachedEmbedder wraps any Embedder: texts whose (model, dimensions, sha256)
+is already stored are served from the table, and only new texts reach the
+provider. Lookups and inserts are bulk per embed() call, so a batch of
+2,000 chunks costs a handful of queries.
+"""
+import hashlib
+import logging
+from typing import Callable, Dict, List, Optional, Set, Union
+
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from backend.db.models import EmbeddingCacheEntry
+from .embedder import Embedder, HashingEmbedder
+
+logger = logging.getLogger(__name__)
+
+
+def content_hash(text: str) -> str:
+    """Cache key of a text: hex sha256 of its exact UTF-8 bytes"""
+    return hashlib.sha256(text.encode('utf-8')).hexdigest()
+
+
+class CachedEmbedder:
+    """Embedder that consults the embedding_cache table before calling the wrapped provider."""
+
+    # Hashes per SELECT and rows per INSERT
+    LOOKUP_BATCH_SIZE = 1000
+
+    def __init__(self, embedder: Embedder, session_factory: Optional[Callable[[], Session]] = None):
+        """
+        Args:
+            embedder: Provider that embeds cache misses
+            session_factory: Sessions for cache reads and writes; defaults to SessionLocal.
+                             The cache commits on its own session, so vectors that were paid
+                             for are kept even if the caller's transaction rolls back.
+        """
+        if session_factory is None:
+            from backend.db.session import SessionLocal
+            session_factory = SessionLocal
+        self.embedder = embedder
+        self.session_factory = session_factory
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self) -> str:
+        return self.embedder.model
+
+    @property
+    def dimensions(self) -> int:
+        return self.embedder.dimensions
+
+    def embed(
+        self,
+        texts: Union[str, List[str]],
+        batch_size: Optional[int] = None
+    ) -> Union[List[float], List[List[float]]]:
+        """Embed text(s), serving byte-identical texts from the cache.
+
+        Cache failures are logged and fall through to the provider.
+
+        Args:
+            texts: Single text string or list of text strings to embed
+            batch_size: Passed on to the provider; its own default when None
+        """
+        single = isinstance(texts, str)
+        if single:
+            texts = [texts]
+
+        hashes = [content_hash(text) for text in texts]
+        found = self._lookup(set(hashes))
+
+        # Identical new texts are embedded once
+        missing: Dict[str, str] = {}
+        for key, text in zip(hashes, texts):
+            if key not in found:
+                missing.setdefault(key, text)
+
+        if missing:
+            options = {'batch_size': batch_size} if batch_size else {}
+            vectors = self.embedder.embed(list(missing.values()), **options)
+            new_entries = dict(zip(missing.keys(), vectors))
+            self._store(new_entries)
+            found.update(new_entries)
+
+        self.hits += len(texts) - len(missing)
+        self.misses += len(missing)
+        if len(texts) > 1:
+            logger.info(f"Embedding cache: {len(texts) - len(missing)} of {len(texts)} texts cached, "
+                        f"{len(missing)} embedded")
+
+        embeddings = [found[key] for key in hashes]
+        return embeddings[0] if single else embeddings
+
+    def _lookup(self, hashes: Set[str]) -> Dict[str, List[float]]:
+        found = {}
+        keys = list(hashes)
+        try:
+            with self.session_factory() as session:
+                for i in range(0, len(keys), self.LOOKUP_BATCH_SIZE):
+                    rows = session.query(EmbeddingCacheEntry.content_hash, EmbeddingCacheEntry.embedding).filter(
+                        EmbeddingCacheEntry.model == self.model,
+                        EmbeddingCacheEntry.dimensions == self.dimensions,
+                        EmbeddingCacheEntry.content_hash.in_(keys[i:i + self.LOOKUP_BATCH_SIZE])
+                    ).all()
+                    found.update({row.content_hash: [float(x) for x in row.embedding] for row in rows})
+        except Exception as e:
+            logger.warning(f"Embedding cache lookup failed: {e}")
+        return found
+
+    def _store(self, entries: Dict[str, List[float]]):
+        rows = [
+            {'model': self.model, 'dimensions': self.dimensions, 'content_hash': key, 'embedding': vector}
+            for key, vector in entries.items()
+        ]
+        try:
+            with self.session_factory() as session:
+                for i in range(0, len(rows), self.LOOKUP_BATCH_SIZE):
+                    # Concurrent ingests may store the same text first
+                    session.execute(
+                        insert(EmbeddingCacheEntry).values(rows[i:i + self.LOOKUP_BATCH_SIZE]).on_conflict_do_nothing()
+                    )
+                session.commit()
+        except Exception as e:
+            logger.warning(f"Embedding cache write failed: {e}")
+
+
+def with_embedding_cache(embedder: Embedder) -> Embedder:
+    """Wrap a paid or slow provider in CachedEmbedder; HashingEmbedder is cheaper than a lookup."""
+    if isinstance(embedder, (HashingEmbedder, CachedEmbedder)):
+        return embedder
+    return CachedEmbedder(embedder)
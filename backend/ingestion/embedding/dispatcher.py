@@ -0,0 +1,211 @@
+"""
+Concurrent, rate-limit-aware dispatch of embedding requests.
+
+EmbeddingDispatcher sends request batches concurrently on an asyncio loop,
+bounded by a semaphore and by token buckets for requests/min and tokens/min,
+retries rate-limit (429), server (5xx) and connection errors with jittered
+exponential backoff, and returns results in batch order. A full re-embed is
+then limited by the provider's rate limits rather than by round-trip latency.
+"""
+import asyncio
+import random
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = (408, 409, 429)
+
+
+class TokenBucket:
+    """Token bucket refilled continuously at rate_per_minute.
+
+    Callers reserve capacity up front and then sleep off any deficit, so
+    concurrent callers queue fairly. Thread-safe and not tied to an event loop.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: Sustained rate
+            capacity: Burst size; defaults to one minute's worth
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Take amount from the bucket and return how many seconds to wait before using it."""
+        # A single reservation larger than the bucket could never be served otherwise
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return -self._tokens / self.rate if self._tokens < 0 else 0.0
+
+    async def acquire(self, amount: float = 1):
+        wait = self.reserve(amount)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+def backoff_delay(attempt: int, base_delay: float, max_delay: float) -> float:
+    """Full-jitter exponential backoff: uniform in [0, min(max_delay, base_delay * 2**attempt)]"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+def is_retryable(error: Exception) -> bool:
+    """Rate limits, timeouts, conflicts, server errors and connection failures are worth retrying."""
+    status_code = getattr(error, 'status_code', None)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    # openai.APIConnectionError / APITimeoutError and plain network errors carry no status
+    return type(error).__name__ in ('APIConnectionError', 'APITimeoutError') or \
+        isinstance(error, (ConnectionError, TimeoutError, asyncio.TimeoutError))
+
+
+def _retry_after(error: Exception) -> Optional[float]:
+    """Seconds from a Retry-After header on the error's response, if any"""
+    response = getattr(error, 'response', None)
+    headers = getattr(response, 'headers', None)
+    if not headers:
+        return None
+    try:
+        return float(headers.get('retry-after'))
+    except (TypeError, ValueError):
+        return None
+
+
+class EmbeddingDispatcher:
+    """Runs embedding request batches concurrently within rate limits."""
+
+    def __init__(self, max_concurrency: int = 4, requests_per_minute: float = 3000,
+                 tokens_per_minute: float = 1_000_000, max_retries: int = 6,
+                 base_delay: float = 1.0, max_delay: float = 60.0):
+        """
+        Args:
+            max_concurrency: Requests in flight at once
+            requests_per_minute: Request rate limit of the provider account
+            tokens_per_minute: Token rate limit of the provider account
+            max_retries: Retries per batch before its error is raised
+            base_delay: First backoff step in seconds
+            max_delay: Backoff cap in seconds
+        """
+        self.max_concurrency = max_concurrency
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+
+    async def _send_with_retry(self, send: Callable[[Any], Awaitable[Any]], payload: Any,
+                               token_count: int, semaphore: asyncio.Semaphore, number: int) -> Any:
+        for attempt in range(self.max_retries + 1):
+            await self.requests.acquire(1)
+            await self.tokens.acquire(token_count)
+            async with semaphore:
+                try:
+                    return await send(payload)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        logger.error(f"Embedding batch {number} failed after {attempt + 1} attempts: {e}")
+                        raise
+                    delay = _retry_after(e) or backoff_delay(attempt, self.base_delay, self.max_delay)
+                    logger.warning(f"Embedding batch {number} failed ({e}), retrying in {delay:.1f}s")
+            # Back off outside the semaphore so other batches keep the slots busy
+            await asyncio.sleep(delay)
+
+    def send_sync(self, send: Callable[[Any], Any], payload: Any, token_count: int) -> Any:
+        """Send one request from synchronous code, under the same rate limits and retry policy.
+
+        A single request gains nothing from an event loop, so this skips it.
+        """
+        for attempt in range(self.max_retries + 1):
+            wait = max(self.requests.reserve(1), self.tokens.reserve(token_count))
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return send(payload)
+            except Exception as e:
+                if attempt >= self.max_retries or not is_retryable(e):
+                    logger.error(f"Embedding request failed after {attempt + 1} attempts: {e}")
+                    raise
+                delay = _retry_after(e) or backoff_delay(attempt, self.base_delay, self.max_delay)
+                logger.warning(f"Embedding request failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+    async def dispatch(self, batches: Sequence[Tuple[Any, int]],
+                       send: Callable[[Any], Awaitable[Any]]) -> List[Any]:
+        """
+        Send every batch and collect the results.
+
+        Args:
+            batches: (payload, token_count) per request
+            send: Coroutine function sending one payload
+
+        Returns:
+            send()'s result per batch, in batch order
+
+        Raises:
+            The first non-retryable (or retry-exhausted) error; the remaining
+            requests are cancelled
+        """
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+        tasks = [
+            asyncio.ensure_future(self._send_with_retry(send, payload, token_count, semaphore, number))
+            for number, (payload, token_count) in enumerate(batches, 1)
+        ]
+        try:
+            return await asyncio.gather(*tasks)
+        except Exception:
+            for task in tasks:
+                task.cancel()
+            raise
+
+    @staticmethod
+    def run(coroutine: Awaitable[Any]) -> Any:
+        """Run a coroutine to completion from synchronous code.
+
+        Inside a running event loop (e.g. a FastAPI handler calling a sync
+        service) the coroutine runs on a fresh loop in a helper thread.
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(coroutine)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            return executor.submit(asyncio.run, coroutine).result()
+
+
+class BackgroundLoop:
+    """Event loop on a daemon thread that lives as long as its owner.
+
+    Async clients keep their connection pools on the loop they first ran on,
+    so a client shared between calls needs one long-lived loop. Synchronous
+    callers, including code running inside another event loop, submit
+    coroutines to it with run().
+    """
+
+    def __init__(self, name: str = 'embedding-dispatch'):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._lock = threading.Lock()
+
+    def _get_loop(self) -> asyncio.AbstractEventLoop:
+        with self._lock:
+            if self._loop is None:
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name=self.name, daemon=True).start()
+                self._loop = loop
+            return self._loop
+
+    def run(self, coroutine: Awaitable[Any]) -> Any:
+        """Run a coroutine on the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._get_loop()).result()
@@ -1,76 +1,341 @@
-from typing import List, Optional, Union
+from typing import List, Optional, Union, Protocol, Tuple, runtime_checkable
 import os
+import re
+import math
+import hashlib
 import logging
 from pathlib import Path
-from openai import OpenAI
+import tiktoken
+from openai import AsyncOpenAI, OpenAI
 from dotenv import load_dotenv
 
+from .dispatcher import BackgroundLoop, EmbeddingDispatcher
+
 logger = logging.getLogger(__name__)
 
+# Short dimensions supported for first-stage (Matryoshka) vectors
+SHORT_DIMENSIONS = (256, 512)
+
+# Width of embedding_chunks.embedding; providers with smaller models are zero-padded to it
+EMBEDDING_DIMENSIONS = 1536
+
+# EmbeddingRun.embedding_model identifiers for the offline providers
+HASHING_MODEL = "hashing-v1"
+LOCAL_MODEL_PREFIX = "local:"
+ONNX_MODEL_PREFIX = "onnx:"
+
+
+def shorten_embedding(embedding: List[float], dimensions: int) -> List[float]:
+    """Truncate an embedding to its first `dimensions` values and re-normalise.
+    
+    text-embedding-3 models are trained so that prefixes remain meaningful;
+    this is what the API returns for the `dimensions` parameter, so short
+    vectors can be derived from the full one without a second request.
+    
+    Args:
+        embedding: Full-length embedding
+        dimensions: Number of leading dimensions to keep
+        
+    Returns:
+        L2-normalised prefix of the embedding
+    """
+    prefix = list(embedding[:dimensions])
+    norm = math.sqrt(sum(x * x for x in prefix))
+    return [x / norm for x in prefix] if norm else prefix
+
+
+def token_batches(token_counts: List[int], max_inputs: int, max_tokens: int) -> List[Tuple[int, int]]:
+    """Split consecutive inputs into request-sized (start, end) ranges.
+    
+    Each range holds at most max_inputs inputs and max_tokens tokens (an
+    input larger than max_tokens gets a range of its own), and the ranges
+    cover the inputs in order, so responses can be concatenated.
+    
+    Args:
+        token_counts: Token count of every input
+        max_inputs: Inputs allowed per request
+        max_tokens: Tokens allowed per request
+        
+    Returns:
+        List of half-open index ranges
+    """
+    batches = []
+    start, tokens = 0, 0
+    for i, count in enumerate(token_counts):
+        if i > start and (i - start >= max_inputs or tokens + count > max_tokens):
+            batches.append((start, i))
+            start, tokens = i, 0
+        tokens += count
+    if start < len(token_counts):
+        batches.append((start, len(token_counts)))
+    return batches
+
+
+@runtime_checkable
+class Embedder(Protocol):
+    """What EmbeddingPipeline and VectorStore need from an embedding provider.
+    
+    `model` is the identifier stored on EmbeddingRun.embedding_model; embed()
+    returns one vector for a string and a list of vectors for a list.
+    """
+    model: str
+    dimensions: int
+    
+    def embed(
+        self,
+        texts: Union[str, List[str]],
+        batch_size: int = 100
+    ) -> Union[List[float], List[List[float]]]:
+        ...
+
+
 class OpenAIEmbedder:
     """OpenAI embedding model implementation."""
     
+    # Limits of the embeddings endpoint: inputs and tokens per request, tokens per input
+    MAX_BATCH_INPUTS = 2048
+    MAX_BATCH_TOKENS = 300_000
+    MAX_INPUT_TOKENS = 8191
+    
     def __init__(
         self,
         model: str = "text-embedding-3-small",
-        api_key: Optional[str] = None
+        api_key: Optional[str] = None,
+        dimensions: Optional[int] = None
     ):
         """Initialize the OpenAI embedder.
         
         Args:
             model: OpenAI embedding model to use
             api_key: OpenAI API key. If not provided, will try to get from environment.
+            dimensions: Output dimensions for text-embedding-3 models (defaults to the full 1536)
         """
-        # Load environment variables from root .env file
+        # Load environment variables from root .env file when there is one;
+        # the key may also come from the process environment
         root_dir = Path(__file__).resolve().parents[3]
         env_path = root_dir / ".env"
-        if not env_path.exists():
-            raise ValueError(f"Could not find .env file at {env_path}")
-        load_dotenv(dotenv_path=env_path)
+        if env_path.exists():
+            load_dotenv(dotenv_path=env_path)
         
         self.model = model
         self.api_key = api_key or os.getenv("OPENAI_API_KEY")
         if not self.api_key:
             raise ValueError("OpenAI API key not found in environment. Please set OPENAI_API_KEY in .env file")
             
-        self.client = OpenAI(api_key=self.api_key)
-        self.dimensions = 1536  # text-embedding-3-small dimension
+        if dimensions and not model.startswith("text-embedding-3"):
+            raise ValueError(f"Model {model} does not support reduced dimensions")
+            
+        self.dimensions = dimensions or 1536  # text-embedding-3-small dimension
+        # Tokenizer of the embedding models, for batching within the token limits
+        self.encoding = tiktoken.get_encoding("cl100k_base")
+        # Requests run concurrently within the account's rate limits (see dispatcher.py)
+        self.dispatcher = EmbeddingDispatcher(
+            max_concurrency=int(os.getenv("OPENAI_EMBEDDING_CONCURRENCY", "4")),
+            requests_per_minute=float(os.getenv("OPENAI_EMBEDDING_RPM", "3000")),
+            tokens_per_minute=float(os.getenv("OPENAI_EMBEDDING_TPM", "1000000"))
+        )
+        # Clients are built once per embedder; retries are the dispatcher's job, so the SDK's are disabled.
+        # Single requests (e.g. search queries) use the synchronous client; multi-request
+        # embeds run on one long-lived loop that owns the async client's connections.
+        self.client = OpenAI(api_key=self.api_key, max_retries=0)
+        self.async_client = AsyncOpenAI(api_key=self.api_key, max_retries=0)
+        self._loop = BackgroundLoop()
         
     def embed(
         self,
         texts: Union[str, List[str]],
-        batch_size: int = 100
+        batch_size: int = MAX_BATCH_INPUTS
     ) -> Union[List[float], List[List[float]]]:
         """Generate embeddings for input text(s).
         
+        Inputs are grouped into as few requests as the endpoint's input and
+        token limits allow (inputs over MAX_INPUT_TOKENS are truncated), and
+        the requests are sent concurrently by the dispatcher, which retries
+        rate-limit and server errors. A single request is sent synchronously.
+        
         Args:
             texts: Single text string or list of text strings to embed
-            batch_size: Number of texts to process in each API call
+            batch_size: Maximum number of texts per API call (at most MAX_BATCH_INPUTS)
             
         Returns:
             For single text: List of floats representing the embedding
             For multiple texts: List of lists of floats, one embedding per text
         """
-        if isinstance(texts, str):
+        single = isinstance(texts, str)
+        if single:
             texts = [texts]
-            
-        all_embeddings = []
         
-        # Process in batches to avoid API limits
-        for i in range(0, len(texts), batch_size):
-            batch = texts[i:i + batch_size]
+        token_counts = []
+        inputs = []
+        for text in texts:
+            tokens = self.encoding.encode(text)
+            if len(tokens) > self.MAX_INPUT_TOKENS:
+                logger.warning(f"Truncating embedding input from {len(tokens)} to {self.MAX_INPUT_TOKENS} tokens")
+                tokens = tokens[:self.MAX_INPUT_TOKENS]
+                text = self.encoding.decode(tokens)
+            token_counts.append(len(tokens))
+            inputs.append(text)
             
-            try:
-                response = self.client.embeddings.create(
-                    model=self.model,
-                    input=batch
-                )
-                
-                batch_embeddings = [data.embedding for data in response.data]
-                all_embeddings.extend(batch_embeddings)
-                
-            except Exception as e:
-                logger.error(f"Error generating embeddings for batch {i//batch_size + 1}: {str(e)}")
-                raise
-                
-        return all_embeddings[0] if len(texts) == 1 else all_embeddings 
\ No newline at end of file
+        batches = token_batches(token_counts, min(batch_size, self.MAX_BATCH_INPUTS), self.MAX_BATCH_TOKENS)
+        requests = [(inputs[start:end], sum(token_counts[start:end])) for start, end in batches]
+        if len(requests) == 1:
+            results = [self.dispatcher.send_sync(self._send, *requests[0])]
+        else:
+            results = self._loop.run(self._embed_batches(requests))
+        all_embeddings = [embedding for batch_embeddings in results for embedding in batch_embeddings]
+        
+        if len(batches) > 1:
+            logger.info(f"Embedded {len(texts)} texts in {len(batches)} requests")
+        return all_embeddings[0] if single else all_embeddings
+    
+    def _request(self, batch_inputs: List[str]) -> dict:
+        request = {"model": self.model, "input": batch_inputs}
+        if self.dimensions != 1536:
+            request["dimensions"] = self.dimensions
+        return request
+    
+    @staticmethod
+    def _vectors(response) -> List[List[float]]:
+        # Keep input order regardless of the order the data comes back in
+        return [data.embedding for data in sorted(response.data, key=lambda d: d.index)]
+    
+    def _send(self, batch_inputs: List[str]) -> List[List[float]]:
+        return self._vectors(self.client.embeddings.create(**self._request(batch_inputs)))
+    
+    async def _embed_batches(self, batches: List[Tuple[List[str], int]]) -> List[List[List[float]]]:
+        """Send (inputs, token_count) batches through the dispatcher; one list of embeddings per batch"""
+        async def send(batch_inputs: List[str]) -> List[List[float]]:
+            return self._vectors(await self.async_client.embeddings.create(**self._request(batch_inputs)))
+        
+        return await self.dispatcher.dispatch(batches, send)
+
+
+class HashingEmbedder:
+    """Deterministic feature-hashing embedder for development and load tests.
+    
+    Word unigrams and bigrams are hashed (blake2b) into signed buckets and the
+    result is L2-normalised. No network or model files, and the same text
+    always gives the same vector, so lexical overlap drives similarity.
+    """
+    
+    def __init__(self, model: str = HASHING_MODEL, dimensions: int = EMBEDDING_DIMENSIONS):
+        """Initialize the hashing embedder.
+        
+        Args:
+            model: Identifier stored on the embedding run
+            dimensions: Number of hash buckets (output length)
+        """
+        self.model = model
+        self.dimensions = dimensions
+    
+    def _embed_one(self, text: str) -> List[float]:
+        tokens = re.findall(r'\w+', text.lower())
+        features = tokens + [f"{a} {b}" for a, b in zip(tokens, tokens[1:])]
+        
+        vector = [0.0] * self.dimensions
+        for feature in features:
+            value = int.from_bytes(hashlib.blake2b(feature.encode('utf-8'), digest_size=8).digest(), 'little')
+            # Low bits pick the bucket, the top bit the sign, so collisions cancel out on average
+            vector[value % self.dimensions] += 1.0 if value >> 63 else -1.0
+        
+        norm = math.sqrt(sum(x * x for x in vector))
+        return [x / norm for x in vector] if norm else vector
+    
+    def embed(
+        self,
+        texts: Union[str, List[str]],
+        batch_size: int = 100
+    ) -> Union[List[float], List[List[float]]]:
+        """Generate embeddings for input text(s); batch_size is accepted for interface compatibility."""
+        if isinstance(texts, str):
+            return self._embed_one(texts)
+        return [self._embed_one(text) for text in texts]
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model, on PyTorch or ONNX Runtime.
+    
+    Vectors are L2-normalised and zero-padded to EMBEDDING_DIMENSIONS so they
+    fit the existing vector(1536) column; padding does not change cosine
+    similarity. Requires `sentence-transformers` (and `optimum[onnxruntime]`
+    for the ONNX backend).
+    """
+    
+    def __init__(
+        self,
+        model: str,
+        backend: str = "torch",
+        output_dimensions: int = EMBEDDING_DIMENSIONS,
+        device: Optional[str] = None
+    ):
+        """Initialize the local embedder.
+        
+        Args:
+            model: Identifier stored on the embedding run, e.g. "local:all-MiniLM-L6-v2"
+            backend: "torch" or "onnx"
+            output_dimensions: Length vectors are padded to
+            device: Optional torch device ("cpu", "cuda")
+        """
+        try:
+            from sentence_transformers import SentenceTransformer
+        except ImportError as e:
+            raise ImportError(
+                "Local embedding models need sentence-transformers: pip install sentence-transformers"
+                + (" optimum[onnxruntime]" if backend == "onnx" else "")
+            ) from e
+        
+        self.model = model
+        model_name = model.split(":", 1)[1] if ":" in model else model
+        self._model = SentenceTransformer(model_name, backend=backend, device=device)
+        
+        native_dimensions = self._model.get_sentence_embedding_dimension()
+        if native_dimensions > output_dimensions:
+            raise ValueError(f"Model {model_name} has {native_dimensions} dimensions, more than {output_dimensions}")
+        self.dimensions = output_dimensions
+        self._padding = [0.0] * (output_dimensions - native_dimensions)
+        logger.info(f"Loaded local embedding model {model_name} ({native_dimensions} dimensions, {backend})")
+    
+    def embed(
+        self,
+        texts: Union[str, List[str]],
+        batch_size: int = 100
+    ) -> Union[List[float], List[List[float]]]:
+        """Generate embeddings for input text(s)."""
+        single = isinstance(texts, str)
+        encoded = self._model.encode(
+            [texts] if single else texts,
+            batch_size=batch_size,
+            normalize_embeddings=True,
+            convert_to_numpy=True
+        )
+        vectors = [row.tolist() + self._padding for row in encoded]
+        return vectors[0] if single else vectors
+
+
+def get_embedder(model: str, dimensions: Optional[int] = None) -> Embedder:
+    """Build the embedder for an EmbeddingRun.embedding_model identifier.
+    
+        text-embedding-*   OpenAI API (needs OPENAI_API_KEY)
+        hashing-v1         HashingEmbedder
+        local:<name>       sentence-transformers model on PyTorch
+        onnx:<name>        sentence-transformers model on ONNX Runtime
+    
+    Args:
+        model: Embedding model identifier
+        dimensions: Output dimensions (OpenAI text-embedding-3 models only)
+        
+    Raises:
+        ValueError: If the identifier is not recognised
+    """
+    if model.startswith(LOCAL_MODEL_PREFIX):
+        return SentenceTransformerEmbedder(model, backend="torch")
+    if model.startswith(ONNX_MODEL_PREFIX):
+        return SentenceTransformerEmbedder(model, backend="onnx")
+    if model.startswith("hashing"):
+        return HashingEmbedder(model=model)
+    if model.startswith("text-embedding-"):
+        return OpenAIEmbedder(model=model, dimensions=dimensions)
+    raise ValueError(
+        f"Unknown embedding model {model}; expected text-embedding-*, {HASHING_MODEL}, "
+        f"{LOCAL_MODEL_PREFIX}<name> or {ONNX_MODEL_PREFIX}<name>"
+    ) 
\ No newline at end of file
@@ -20,8 +20,16 @@ from backend.db.models import (
     EmployeeAssessment
 )
 from backend.db.session import get_db
+from backend.db.embedding_runs import create_run_partitions, activate_run
+from backend.db.employee_centroids import refresh_employee_centroids
+from backend.db.data_generation import bump_data_generation
+from backend.db.index_maintenance import run_maintenance
+from backend.db.ingest_catalogue import (
+    STAGE_EMBEDDING, catalogue_path, scan_files, diff_catalogue, load_catalogue, record_file, forget_files
+)
 from .chunker import TextChunker
-from .embedder import OpenAIEmbedder
+from .embedder import get_embedder, SHORT_DIMENSIONS, shorten_embedding
+from .cached_embedder import with_embedding_cache
 from .chunking_registry import registry
 
 logger = logging.getLogger(__name__)
@@ -29,33 +37,51 @@ logger = logging.getLogger(__name__)
 class EmbeddingPipeline:
     """Orchestrates the document processing pipeline: chunk → embed → store."""
     
-    def __init__(self, db: Session, embedding_model: str = "text-embedding-3-small"):
+    # Chunks buffered across documents before they are embedded in one embed()
+    # call; the embedder splits them into requests within the provider's limits
+    EMBED_BUFFER_CHUNKS = 2000
+    
+    def __init__(self, db: Session, embedding_model: str = "text-embedding-3-small",
+                 short_dimensions: Optional[int] = None):
         """Initialize the embedding pipeline.
         
         Args:
             db: Database session
-            embedding_model: OpenAI embedding model to use
+            embedding_model: Embedding model identifier (see embedder.get_embedder)
+            short_dimensions: Also store a shortened first-stage vector of this
+                length (256 or 512) per chunk; text-embedding-3 models only
         """
+        if short_dimensions and short_dimensions not in SHORT_DIMENSIONS:
+            raise ValueError(f"short_dimensions must be one of {SHORT_DIMENSIONS}")
+        if short_dimensions and not embedding_model.startswith("text-embedding-3"):
+            raise ValueError(f"Model {embedding_model} does not support shortened embeddings")
+        self.short_dimensions = short_dimensions
         self.db = db
         self.chunker = TextChunker()
-        self.embedder = OpenAIEmbedder(model=embedding_model)
+        # Byte-identical chunks embedded by earlier runs are served from embedding_cache
+        self.embedder = with_embedding_cache(get_embedder(embedding_model))
+        # Chunk records waiting for their embeddings, and the files they came from
+        self._pending_chunks: List[EmbeddingChunk] = []
+        self._pending_documents: List[str] = []
         # Register bound methods
         registry._methods["cv"] = self.chunker._chunk_cv
         registry._methods["assessment"] = self.chunker._chunk_assessment
         registry._methods["generic"] = self.chunker._chunk_generic
         logger.info(f"Initialized pipeline with model: {embedding_model}")
         
-    def _check_document_exists(self, filename: str, employee_id: str) -> bool:
-        """Check if document has already been processed.
+    def _check_document_exists(self, filename: str, employee_id: str, embedding_run_id: str) -> bool:
+        """Check if document has already been processed in this run.
         
         Args:
             filename: Name of the file
             employee_id: UUID of the employee
+            embedding_run_id: UUID of the embedding run
             
         Returns:
             True if document exists, False otherwise
         """
         existing = self.db.query(EmbeddingDocument).filter(
+            EmbeddingDocument.embedding_run_id == embedding_run_id,
             EmbeddingDocument.source_filename == filename,
             EmbeddingDocument.employee_id == employee_id
         ).first()
@@ -152,17 +178,34 @@ class EmbeddingPipeline:
             
         return employee
         
-    def process_directory(self, input_dir: str) -> None:
+    def process_directory(self, input_dir: str, run_id: Optional[str] = None,
+                          activate: Optional[bool] = None, incremental: bool = False) -> None:
         """Process all documents in a directory.
         
+        Every embedded file is recorded in the ingest catalogue of the run.
+        
         Args:
             input_dir: Path to directory containing documents to process
+            run_id: Add to this existing run instead of creating a new one
+            activate: Make the run the one searches read from once processing
+                      finishes; by default only when no run is active yet
+            incremental: Sync the run (run_id, else the active run) with the
+                         directory: re-embed only new and changed files and
+                         delete the documents of removed ones
         """
         input_path = Path(input_dir)
         if not input_path.exists():
             raise ValueError(f"Input directory does not exist: {input_dir}")
             
         logger.info(f"Processing directory: {input_dir}")
+        
+        if incremental and not run_id:
+            active = self.db.query(EmbeddingRun).filter(EmbeddingRun.is_active.is_(True)).first()
+            if active:
+                run_id = active.id
+            else:
+                logger.warning("No active embedding run to update incrementally, embedding everything into a new run")
+                incremental = False
             
         # Create embedding run with registered chunking method
         chunking_method = "generic"  # Default method
@@ -172,58 +215,174 @@ class EmbeddingPipeline:
         except ValueError as e:
             logger.warning(f"Using default chunking method: {str(e)}")
             
-        run = EmbeddingRun(
-            name=f"Run_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-            chunking_method=chunking_method,
-            embedding_model=self.embedder.model,
-            created_at=datetime.utcnow(),
-            updated_at=datetime.utcnow()
-        )
-        self.db.add(run)
-        self.db.flush()
-        self.db.commit()
-        logger.info(f"Created embedding run: {run.id}")
+        if run_id:
+            run = self.db.query(EmbeddingRun).get(run_id)
+            if not run:
+                raise ValueError(f"Embedding run does not exist: {run_id}")
+            if run.embedding_model != self.embedder.model:
+                raise ValueError(f"Run {run_id} uses {run.embedding_model}, pipeline uses {self.embedder.model}")
+            logger.info(f"Adding to embedding run: {run.id}")
+        else:
+            run = EmbeddingRun(
+                name=f"Run_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
+                chunking_method=chunking_method,
+                embedding_model=self.embedder.model,
+                short_dimensions=self.short_dimensions,
+                created_at=datetime.utcnow(),
+                updated_at=datetime.utcnow()
+            )
+            self.db.add(run)
+            self.db.flush()
+            # Documents and chunks are partitioned per run
+            create_run_partitions(self.db, run.id)
+            self.db.commit()
+            logger.info(f"Created embedding run: {run.id}")
         
         # Process each file
         processed_count = 0
         skipped_count = 0
         error_count = 0
+        touched_employee_ids = set()
+        
+        files = [f for f in input_path.glob('*') if f.is_file() and not f.name.endswith('.done')]
+        known = load_catalogue(self.db, STAGE_EMBEDDING, run.id)
+        states = scan_files(files, input_path, known)
+        to_process = set(states)
+        removed_count = 0
+        if incremental:
+            to_process, removed_count = self._apply_catalogue_diff(
+                run.id, states, diff_catalogue(states, known), touched_employee_ids
+            )
+            skipped_count += len(states) - len(to_process)
         
-        for file_path in input_path.glob('*'):
-            if file_path.is_file() and not file_path.name.endswith('.done'):
+        for file_path in files:
+            path = catalogue_path(file_path, input_path)
+            if path in to_process:
                 try:
                     logger.info(f"Processing file: {file_path.name}")
                     
-                    metadata = self._extract_metadata_from_filename(file_path.name)
-                    if not metadata or not metadata["employee_name"]:
-                        logger.warning(f"Skipping file {file_path.name}: could not extract employee name")
-                        skipped_count += 1
-                        continue
+                    # A failing file only rolls back its own savepoint, not the buffered documents
+                    with self.db.begin_nested():
+                        if incremental:
+                            # Changed files replace their previous version in the run
+                            touched_employee_ids.update(self._delete_documents(run.id, [file_path.name]))
+                        metadata = self._extract_metadata_from_filename(file_path.name)
+                        if not metadata or not metadata["employee_name"]:
+                            logger.warning(f"Skipping file {file_path.name}: could not extract employee name")
+                            skipped_count += 1
+                            continue
+                            
+                        employee = self._get_or_create_employee(metadata["employee_name"])
                         
-                    employee = self._get_or_create_employee(metadata["employee_name"])
-                    
-                    # Check if already processed
-                    if self._check_document_exists(file_path.name, employee.id):
-                        logger.info(f"Skipping already processed file: {file_path.name}")
-                        skipped_count += 1
-                        continue
-                        
-                    self.process_document(
-                        file_path=file_path,
-                        employee_id=employee.id,
-                        doc_type=metadata["doc_type"],
-                        embedding_run_id=run.id
-                    )
-                    processed_count += 1
+                        # Check if already processed
+                        if self._check_document_exists(file_path.name, employee.id, run.id):
+                            logger.info(f"Skipping already processed file: {file_path.name}")
+                            skipped_count += 1
+                            continue
+                            
+                        queued = self._queue_document(
+                            file_path=file_path,
+                            employee_id=employee.id,
+                            doc_type=metadata["doc_type"],
+                            embedding_run_id=run.id
+                        )
+                        if queued:
+                            # Committed together with the document's chunks
+                            record_file(self.db, STAGE_EMBEDDING, path, states[path], run.id)
+                    if queued:
+                        processed_count += 1
+                        touched_employee_ids.add(employee.id)
                     
                 except Exception as e:
                     logger.error(f"Error processing file {file_path}: {str(e)}")
-                    self.db.rollback()
                     error_count += 1
                     continue
+                
+                if len(self._pending_chunks) >= self.EMBED_BUFFER_CHUNKS:
+                    lost = self._flush_buffer()
+                    processed_count -= lost
+                    error_count += lost
+        
+        lost = self._flush_buffer()
+        processed_count -= lost
+        error_count += lost
                     
+        # Employee centroids for two-stage employee search
+        if touched_employee_ids:
+            refresh_employee_centroids(self.db, run.id, touched_employee_ids)
+            
+        if activate is None:
+            active = self.db.query(EmbeddingRun).filter(EmbeddingRun.is_active.is_(True)).first()
+            activate = active is None
+        if activate:
+            activate_run(self.db, run.id)
+            
+        self.db.commit()
+        # Centroids and the active run changed
+        bump_data_generation(self.db)
+        
+        # Bulk loads leave fresh partitions with stale statistics and untrained IVFFlat lists
+        if processed_count or removed_count:
+            try:
+                run_maintenance(run.id, measure=False)
+            except Exception as e:
+                logger.warning(f"Index maintenance after load failed: {e}")
+        logger.info(f"Pipeline completed. Processed: {processed_count}, Skipped: {skipped_count}, "
+                    f"Removed: {removed_count}, Errors: {error_count}")
+        
+    def _apply_catalogue_diff(self, run_id, states: Dict[str, Dict], diff: Dict[str, List],
+                              touched_employee_ids: set):
+        """Apply the parts of an incremental sync that need no embedding.
+
+        Documents of removed files are deleted; moved and unchanged files are
+        re-catalogued (moved documents keep their chunks under the new filename).
+
+        Returns:
+            (paths to embed, number of removed files)
+        """
+        logger.info(f"Incremental sync: {len(diff['new'])} new, {len(diff['changed'])} changed, "
+                    f"{len(diff['moved'])} moved, {len(diff['unchanged'])} unchanged, "
+                    f"{len(diff['removed'])} removed")
+        if diff['removed']:
+            touched_employee_ids.update(
+                self._delete_documents(run_id, [Path(path).name for path in diff['removed']])
+            )
+            forget_files(self.db, STAGE_EMBEDDING, diff['removed'], run_id)
+        for old_path, new_path in diff['moved']:
+            self.db.query(EmbeddingDocument).filter(
+                EmbeddingDocument.embedding_run_id == run_id,
+                EmbeddingDocument.source_filename == Path(old_path).name
+            ).update({EmbeddingDocument.source_filename: Path(new_path).name}, synchronize_session=False)
+            record_file(self.db, STAGE_EMBEDDING, new_path, states[new_path], run_id, previous_path=old_path)
+        for path in diff['unchanged']:
+            # Refresh mtimes so the next scan does not hash the file again
+            record_file(self.db, STAGE_EMBEDDING, path, states[path], run_id)
         self.db.commit()
-        logger.info(f"Pipeline completed. Processed: {processed_count}, Skipped: {skipped_count}, Errors: {error_count}")
+        return set(diff['new']) | set(diff['changed']), len(diff['removed'])
+
+    def _delete_documents(self, run_id, filenames: List[str]) -> set:
+        """Delete a run's documents (and their chunks) by source filename; the caller commits.
+
+        Returns:
+            IDs of the employees the documents belonged to
+        """
+        documents = self.db.query(EmbeddingDocument.external_document_id, EmbeddingDocument.employee_id).filter(
+            EmbeddingDocument.embedding_run_id == run_id,
+            EmbeddingDocument.source_filename.in_(filenames)
+        ).all()
+        if not documents:
+            return set()
+        document_ids = [doc.external_document_id for doc in documents]
+        self.db.query(EmbeddingChunk).filter(
+            EmbeddingChunk.embedding_run_id == run_id,
+            EmbeddingChunk.external_document_id.in_(document_ids)
+        ).delete(synchronize_session=False)
+        self.db.query(EmbeddingDocument).filter(
+            EmbeddingDocument.embedding_run_id == run_id,
+            EmbeddingDocument.external_document_id.in_(document_ids)
+        ).delete(synchronize_session=False)
+        logger.info(f"Deleted {len(documents)} documents of run {run_id}: {', '.join(filenames)}")
+        return {doc.employee_id for doc in documents}
         
     def _generate_assessment_summary(self, file_path: Path, doc_type: str, employee_name: str) -> Optional[Path]:
         """Generate a summary for an assessment file if it doesn't exist.
@@ -379,6 +538,9 @@ class EmbeddingPipeline:
     def process_document(self, file_path: Path, employee_id: str, doc_type: str, embedding_run_id: str) -> None:
         """Process a single document: chunk → embed → store.
         
+        process_directory batches chunks across documents instead; this
+        embeds and commits the one document right away.
+        
         Args:
             file_path: Path to the document
             employee_id: UUID of the employee
@@ -386,81 +548,134 @@ class EmbeddingPipeline:
             embedding_run_id: UUID of the embedding run
         """
         try:
-            # Get external document ID
-            external_document_id = self._get_external_document_id(file_path.name, employee_id, doc_type)
-            if not external_document_id:
-                logger.error(f"Could not find external document ID for {file_path.name}")
-                return
+            self._queue_document(file_path, employee_id, doc_type, embedding_run_id)
+        except Exception as e:
+            self.db.rollback()
+            self._pending_chunks, self._pending_documents = [], []
+            logger.error(f"Error processing document {file_path}: {str(e)}")
+            raise
+        self.flush_embeddings()
 
-            # Map document type to allowed DB value
-            mapped_doc_type = self._map_document_type(doc_type)
-            logger.info(f"Processing document {file_path.name} as type {mapped_doc_type}")
+    def _queue_document(self, file_path: Path, employee_id: str, doc_type: str, embedding_run_id: str) -> bool:
+        """Chunk a document and buffer its chunks for embedding.
 
-            # Create embedding document
-            doc = EmbeddingDocument(
-                employee_id=employee_id,
-                embedding_run_id=embedding_run_id,
-                document_type=mapped_doc_type,
-                source_filename=file_path.name,
-                external_document_id=external_document_id,
-                source_type=mapped_doc_type,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            self.db.add(doc)
-            self.db.flush()
-            logger.info(f"Created embedding document with ID: {doc.id}")
+        The EmbeddingDocument row is flushed (not committed); its chunks are
+        written by flush_embeddings.
 
-            # Read and chunk content
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            logger.info(f"Read {len(content)} characters from {file_path.name}")
+        Returns:
+            Whether the document was queued
+        """
+        # Get external document ID
+        external_document_id = self._get_external_document_id(file_path.name, employee_id, doc_type)
+        if not external_document_id:
+            logger.error(f"Could not find external document ID for {file_path.name}")
+            return False
 
-            # Get appropriate chunking method
-            chunking_method = registry.get_method(mapped_doc_type)
-            if not chunking_method:
-                chunking_method = registry.get_method("generic")
-                logger.warning(f"No specific chunking method found for {mapped_doc_type}, using generic")
+        # Map document type to allowed DB value
+        mapped_doc_type = self._map_document_type(doc_type)
+        logger.info(f"Processing document {file_path.name} as type {mapped_doc_type}")
 
-            # For CVs, chunker may require 'text' argument
-            import inspect
-            if mapped_doc_type == "cv" and 'text' in inspect.signature(chunking_method).parameters:
-                chunks = chunking_method(text=content)
-            else:
-                chunks = chunking_method(content)
-            # Wrap string chunks as dicts if needed
-            if chunks and isinstance(chunks[0], str):
-                chunks = [{"content": c} for c in chunks]
-            logger.info(f"Generated {len(chunks)} chunks for {file_path.name}")
+        # Create embedding document
+        doc = EmbeddingDocument(
+            employee_id=employee_id,
+            embedding_run_id=embedding_run_id,
+            document_type=mapped_doc_type,
+            source_filename=file_path.name,
+            external_document_id=external_document_id,
+            source_type=mapped_doc_type,
+            created_at=datetime.utcnow(),
+            updated_at=datetime.utcnow()
+        )
+        self.db.add(doc)
+        self.db.flush()
+        logger.info(f"Created embedding document with ID: {doc.id}")
 
-            # Process each chunk
-            chunk_count = 0
-            for i, chunk in enumerate(chunks):
-                try:
-                    # Generate embedding
-                    embedding = self.embedder.embed(chunk["content"])
-                    
-                    # Create chunk record
-                    chunk_record = EmbeddingChunk(
-                        employee_id=employee_id,
-                        external_document_id=external_document_id,
-                        chunk_index=i,
-                        content=chunk["content"],
-                        embedding=embedding,
-                        token_count=chunk.get("token_count"),
-                        char_count=chunk.get("char_count"),
-                        chunk_label=chunk.get("label")
-                    )
-                    self.db.add(chunk_record)
-                    chunk_count += 1
-                except Exception as e:
-                    logger.error(f"Error processing chunk {i} for {file_path.name}: {str(e)}")
-                    continue
+        # Filter columns denormalised onto every chunk for indexed search filters
+        employee = self.db.query(Employee).get(employee_id)
+        department = employee.department if employee else None
+        assessment = self.db.query(EmployeeAssessment).get(external_document_id)
+        assessment_type = assessment.assessment_type if assessment else None
+
+        # Read and chunk content
+        with open(file_path, 'r', encoding='utf-8') as f:
+            content = f.read()
+        logger.info(f"Read {len(content)} characters from {file_path.name}")
+
+        # Get appropriate chunking method
+        chunking_method = registry.get_method(mapped_doc_type)
+        if not chunking_method:
+            chunking_method = registry.get_method("generic")
+            logger.warning(f"No specific chunking method found for {mapped_doc_type}, using generic")
+
+        # For CVs, chunker may require 'text' argument
+        import inspect
+        if mapped_doc_type == "cv" and 'text' in inspect.signature(chunking_method).parameters:
+            chunks = chunking_method(text=content)
+        else:
+            chunks = chunking_method(content)
+        # Wrap string chunks as dicts if needed
+        if chunks and isinstance(chunks[0], str):
+            chunks = [{"content": c} for c in chunks]
+        logger.info(f"Generated {len(chunks)} chunks for {file_path.name}")
+
+        # Chunk records get their embeddings in flush_embeddings
+        for i, chunk in enumerate(chunks):
+            try:
+                self._pending_chunks.append(EmbeddingChunk(
+                    employee_id=employee_id,
+                    embedding_run_id=embedding_run_id,
+                    external_document_id=external_document_id,
+                    chunk_index=i,
+                    content=chunk["content"],
+                    token_count=chunk.get("token_count"),
+                    char_count=chunk.get("char_count"),
+                    chunk_label=chunk.get("label"),
+                    document_type=mapped_doc_type,
+                    department=department,
+                    assessment_type=assessment_type
+                ))
+            except Exception as e:
+                logger.error(f"Error processing chunk {i} for {file_path.name}: {str(e)}")
+                continue
+        self._pending_documents.append(file_path.name)
+        return True
 
+    def flush_embeddings(self) -> int:
+        """Embed all buffered chunks in one embed() call, store them and commit.
+
+        The embedder groups the texts into as few provider requests as its
+        limits allow. On failure the transaction is rolled back, dropping the
+        buffered documents as well, and the error is re-raised.
+
+        Returns:
+            Number of chunks stored
+        """
+        if not self._pending_documents:
+            return 0
+        chunks, documents = self._pending_chunks, self._pending_documents
+        self._pending_chunks, self._pending_documents = [], []
+        try:
+            if chunks:
+                embeddings = self.embedder.embed([chunk.content for chunk in chunks])
+                for chunk, embedding in zip(chunks, embeddings):
+                    chunk.embedding = embedding
+                    if self.short_dimensions:
+                        chunk.embedding_short = shorten_embedding(embedding, self.short_dimensions)
+                self.db.add_all(chunks)
             self.db.commit()
-            logger.info(f"Successfully processed {file_path.name}: created {chunk_count} chunks")
+        except Exception:
+            self.db.rollback()
+            raise
+        bump_data_generation(self.db)
+        logger.info(f"Stored {len(chunks)} chunks from {len(documents)} documents")
+        return len(chunks)
 
+    def _flush_buffer(self) -> int:
+        """flush_embeddings for process_directory; returns the number of documents lost to a failed batch"""
+        documents = list(self._pending_documents)
+        try:
+            self.flush_embeddings()
+            return 0
         except Exception as e:
-            self.db.rollback()
-            logger.error(f"Error processing document {file_path}: {str(e)}")
-            raise 
\ No newline at end of file
+            logger.error(f"Error embedding batch of {len(documents)} documents ({', '.join(documents)}): {str(e)}")
+            return len(documents)
@@ -1,6 +1,22 @@
 # Package initializer for parsers
 
+from pathlib import Path
+
 from .cv_parser import parse_cv
 from .assessment_parser import parse_assessment
 
-__all__ = ['parse_cv', 'parse_assessment']
+
+def parse_file(file_path):
+    """Parse a source file with the parser its name prefix selects; None for other files.
+
+    Module level (and free of database access) so it can run in a process pool.
+    """
+    file_path = Path(file_path)
+    if file_path.stem.startswith("CV_"):
+        return parse_cv(file_path)
+    if file_path.stem.startswith(("IDI_", "Hogan_")):
+        return parse_assessment(file_path)
+    return None
+
+
+__all__ = ['parse_cv', 'parse_assessment', 'parse_file']
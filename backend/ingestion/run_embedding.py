@@ -19,7 +19,16 @@ def main():
     parser.add_argument('--input-dir', type=str, required=True,
                       help='Directory containing documents to process')
     parser.add_argument('--model', type=str, default='text-embedding-3-small',
-                      help='OpenAI embedding model to use')
+                      help='Embedding model: text-embedding-* (OpenAI), hashing-v1, local:<name> or onnx:<name>')
+    parser.add_argument('--short-dimensions', type=int, choices=[256, 512], default=None,
+                      help='Also store shortened first-stage vectors of this length (text-embedding-3 models)')
+    parser.add_argument('--run-id', type=str, default=None,
+                      help='Add documents to an existing embedding run instead of creating one')
+    parser.add_argument('--activate', action='store_true', default=None,
+                      help='Make the run active for search (default: only if no run is active)')
+    parser.add_argument('--incremental', action='store_true',
+                      help='Only embed new and changed files into --run-id (default: the active run) '
+                           'and delete the documents of removed files')
     args = parser.parse_args()
     
     # Validate input directory
@@ -31,8 +40,10 @@ def main():
     # Process documents
     with get_db() as db:
         try:
-            pipeline = EmbeddingPipeline(db, embedding_model=args.model)
-            pipeline.process_directory(str(input_dir))
+            pipeline = EmbeddingPipeline(db, embedding_model=args.model,
+                                         short_dimensions=args.short_dimensions)
+            pipeline.process_directory(str(input_dir), run_id=args.run_id, activate=args.activate,
+                                       incremental=args.incremental)
             logger.info("Pipeline completed successfully")
         except Exception as e:
             logger.error(f"Pipeline failed: {str(e)}")
@@ -1,17 +1,23 @@
 import os
 import re
+import zlib
 import shutil
 import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
 from pathlib import Path
 from datetime import datetime, timezone
 from sqlalchemy import or_, and_, func
 import argparse
 from uuid import uuid4
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 from backend.db.session import init_db, SessionLocal
-from backend.ingestion.parsers.cv_parser import parse_cv
-from backend.ingestion.parsers.assessment_parser import parse_assessment
+from backend.db.data_generation import bump_data_generation
+from backend.db.ingest_catalogue import (
+    STAGE_INGEST, catalogue_path, scan_files, diff_catalogue, load_catalogue, record_file
+)
+from backend.ingestion.parsers import parse_file
 from backend.utils.validators import validate_file
 from backend.utils.common import slugify
 
@@ -33,64 +39,198 @@ from backend.db.models import (
 logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
 logger = logging.getLogger(__name__)
 
+def writer_index(parsed_data: Optional[Dict[str, Any]], file_path: Path, writers: int) -> int:
+    """Writer for a parsed file: stable per employee name, so one employee's files share a writer"""
+    name = parsed_data["name"] if parsed_data else file_path.name
+    key = name.strip().replace("_", " ").lower()
+    return zlib.crc32(key.encode("utf-8")) % writers
+
 class IngestService:
-    def __init__(self, source_dir: Path, processed_dir: Path):
+    def __init__(self, source_dir: Path, processed_dir: Path, incremental: bool = False,
+                 parse_workers: int = 0, db_workers: int = 2):
+        """
+        Args:
+            source_dir: Drop directory of files to ingest
+            processed_dir: Ingested files are moved here
+            incremental: Skip files whose content was ingested before (also under
+                         another name) and rebuild the records of edited files
+            parse_workers: Parse files in this many processes while db_workers
+                           threads store the results; 0 parses and stores one
+                           file at a time
+            db_workers: Writer threads (and database connections) of the parallel mode
+        """
         self.source_dir = Path(source_dir)
         self.processed_dir = Path(processed_dir)
         self.processed_dir.mkdir(parents=True, exist_ok=True)
+        self.incremental = incremental
+        self.parse_workers = parse_workers
+        self.db_workers = max(1, db_workers)
         self.db = SessionLocal()
 
     def process_all(self):
         logger.info(f"Processing files from {self.source_dir}")
         
-        # First, process all CV files
         cv_files = sorted([f for f in self.source_dir.iterdir() if f.is_file() and f.stem.startswith("CV_")])
-        for file_path in cv_files:
-            try:
-                self.process_single_file(file_path)
-            except Exception as e:
-                logger.error(f"Error processing {file_path.name}: {e}")
-        
-        # Then, process all assessment files
         assessment_files = sorted([f for f in self.source_dir.iterdir() 
                                  if f.is_file() and (f.stem.startswith("IDI_") or f.stem.startswith("Hogan_"))])
-        for file_path in assessment_files:
+        
+        # Every ingested version is recorded in the ingest catalogue
+        known = load_catalogue(self.db, STAGE_INGEST)
+        states = scan_files(cv_files + assessment_files, self.source_dir, known)
+        to_process, replace = set(states), set()
+        if self.incremental:
+            to_process, replace = self._apply_catalogue_diff(states, diff_catalogue(states, known))
+        
+        # First, process all CV files, then all assessment files
+        phases = []
+        for files in (cv_files, assessment_files):
+            jobs = []
+            for file_path in files:
+                path = catalogue_path(file_path, self.source_dir)
+                if path in to_process:
+                    jobs.append((file_path, states[path], path in replace))
+            phases.append(jobs)
+
+        if self.parse_workers:
+            self._process_parallel(phases)
+            return
+        for file_path, state, replace_file in phases[0] + phases[1]:
             try:
-                self.process_single_file(file_path)
+                self.process_single_file(file_path, state, replace=replace_file)
             except Exception as e:
                 logger.error(f"Error processing {file_path.name}: {e}")
 
-    def process_single_file(self, file_path: Path):
+    def _parse_executor(self):
+        """Process pool for parse_file"""
+        # Fresh interpreters: forked children would inherit pooled database connections
+        return ProcessPoolExecutor(max_workers=self.parse_workers,
+                                   mp_context=multiprocessing.get_context("spawn"))
+
+    def _process_parallel(self, phases: List[List[Tuple[Path, Dict[str, Any], bool]]]):
+        """Parse files in a process pool while writer threads store the results.
+
+        Every phase (CVs, then assessments) is stored completely before any
+        result of the next phase is, so assessments always find their
+        employee; parsing the next phase overlaps with storing the current one.
+        Results are handed to the writers in file order and routed by employee
+        name, so one employee's files are stored by one writer, in the same
+        order as the sequential mode, and never race to create the employee.
+
+        Args:
+            phases: (file, catalogue state, replace) per file, per phase
+        """
+        writers = [ThreadPoolExecutor(max_workers=1) for _ in range(self.db_workers)]
+        parsers = self._parse_executor()
+        try:
+            # Submit every parse up front, CVs first
+            parsing = []
+            for jobs in phases:
+                futures = {}
+                for file_path, state, replace in jobs:
+                    logger.info(f"Processing file: {file_path.name}")
+                    if not validate_file(file_path):
+                        logger.error(f"Error processing {file_path.name}: Failed validation: {file_path.name}")
+                        continue
+                    futures[parsers.submit(parse_file, file_path)] = (file_path, state, replace)
+                parsing.append(futures)
+
+            for futures in parsing:
+                stores = {}
+                # In submission order: later files are usually parsed by the time earlier ones are stored
+                for future, (file_path, state, replace) in futures.items():
+                    try:
+                        parsed_data = future.result()
+                    except Exception as e:
+                        logger.error(f"Error processing {file_path.name}: {e}")
+                        continue
+                    writer = writers[writer_index(parsed_data, file_path, len(writers))]
+                    stores[writer.submit(self._store_parsed, file_path, parsed_data, state, replace)] = file_path
+                wait(stores)
+                for store, file_path in stores.items():
+                    if store.exception():
+                        logger.error(f"Error processing {file_path.name}: {store.exception()}")
+        finally:
+            parsers.shutdown(cancel_futures=True)
+            for writer in writers:
+                writer.shutdown()
+
+    def _apply_catalogue_diff(self, states: Dict[str, Dict], diff: Dict[str, list]):
+        """Archive files that were ingested before and re-catalogue them.
+
+        The source directory is a drop box, so catalogued files missing from it
+        are not treated as removed.
+
+        Returns:
+            (paths to ingest, paths whose previous records are replaced)
+        """
+        logger.info(f"Incremental ingest: {len(diff['new'])} new, {len(diff['changed'])} changed, "
+                    f"{len(diff['moved'])} moved, {len(diff['unchanged'])} unchanged")
+        skipped = [(path, path) for path in diff['unchanged']] + diff['moved']
+        for old_path, path in skipped:
+            record_file(self.db, STAGE_INGEST, path, states[path], previous_path=old_path)
+        self.db.commit()
+        for _, path in skipped:
+            logger.info(f"Skipping {path}: content already ingested")
+            self._archive(self.source_dir / path)
+        return set(diff['new']) | set(diff['changed']), set(diff['changed'])
+
+    def _archive(self, file_path: Path):
+        dst_path = self.processed_dir / file_path.name
+        try:
+            shutil.move(str(file_path), str(dst_path))
+            logger.info(f"Successfully processed {file_path.name}")
+        except FileExistsError:
+            # If file already exists in processed directory, just delete the source file
+            file_path.unlink()
+            logger.info(f"File {file_path.name} was already processed, removed source file")
+
+    def process_single_file(self, file_path: Path, state: Optional[Dict[str, Any]] = None, replace: bool = False):
+        """Parse one file into the database and move it to the processed directory.
+
+        Args:
+            file_path: File to ingest
+            state: Its ingest catalogue state (scan_files), recorded once the file is ingested
+            replace: Rebuild the records parsed from a previous version of the file
+        """
         logger.info(f"Processing file: {file_path.name}")
 
         if not validate_file(file_path):
             raise ValueError(f"Failed validation: {file_path.name}")
 
+        try:
+            parsed_data = parse_file(file_path)
+        except Exception as e:
+            logger.error(f"Error processing {file_path.name}: {e}")
+            return
+        self._store_parsed(file_path, parsed_data, state, replace)
+
+    def _store_parsed(self, file_path: Path, parsed_data: Optional[Dict[str, Any]],
+                      state: Optional[Dict[str, Any]] = None, replace: bool = False):
+        """Write parse_file()'s result for a file in its own session, then archive the file."""
         with SessionLocal() as db:
             try:
-                if file_path.stem.startswith("CV_"):
-                    parsed_data = parse_cv(file_path)
-                    self._handle_cv_data(parsed_data, db, file_path)
-
-                elif file_path.stem.startswith(("IDI_", "Hogan_")):
-                    parsed_data = parse_assessment(file_path)
-                    self._handle_assessment_data(parsed_data, db, file_path)
+                result = None
+                if parsed_data is not None and file_path.stem.startswith("CV_"):
+                    result = self._handle_cv_data(parsed_data, db, file_path, replace=replace)
+                elif parsed_data is not None:
+                    result = self._handle_assessment_data(parsed_data, db, file_path, replace=replace)
 
+                # Failed files stay uncatalogued so the next incremental run retries them
+                if state is not None and result is not None:
+                    record_file(db, STAGE_INGEST, catalogue_path(file_path, self.source_dir), state)
                 db.commit()
-                dst_path = self.processed_dir / file_path.name
-                try:
-                    shutil.move(str(file_path), str(dst_path))
-                    logger.info(f"Successfully processed {file_path.name}")
-                except FileExistsError:
-                    # If file already exists in processed directory, just delete the source file
-                    file_path.unlink()
-                    logger.info(f"File {file_path.name} was already processed, removed source file")
+                bump_data_generation(db)
+                self._archive(file_path)
             except Exception as e:
                 db.rollback()
                 logger.error(f"Error processing {file_path.name}: {e}")
 
-    def _handle_cv_data(self, parsed_data, db, file_path):
-        """Handle parsed CV data and create/update database records."""
+    def _handle_cv_data(self, parsed_data, db, file_path, replace=False):
+        """Handle parsed CV data and create/update database records.
+
+        With replace, the employee's contacts, education, experiences and
+        skills are rebuilt from this CV instead of merged into.
+        """
         try:
             # Create or update employee record
             employee = db.query(Employee).filter_by(full_name=parsed_data["name"]).first()
@@ -104,14 +244,28 @@ class IngestService:
                 )
                 db.add(employee)
                 db.flush()
+            elif replace:
+                employee.email = parsed_data.get("email") or employee.email
+                employee.location = parsed_data.get("location") or employee.location
+                employee.current_position = parsed_data.get("position") or employee.current_position
+                employee.department = parsed_data.get("department") or employee.department
 
-            # Create CV record
-            cv = EmployeeCV(
-                employee_id=employee.id,
-                filename=file_path.name,
-                source="manual_upload"
-            )
-            db.add(cv)
+            if replace:
+                for model in (EmployeeContact, EmployeeEducation, EmployeeExperience, EmployeeSkill):
+                    db.query(model).filter(model.employee_id == employee.id).delete(synchronize_session=False)
+
+            # Re-ingested CVs keep their record, so embedded documents still point at it
+            cv = db.query(EmployeeCV).filter_by(employee_id=employee.id, filename=file_path.name).first()
+            if cv:
+                cv.upload_date = func.now()
+            else:
+                # Create CV record
+                cv = EmployeeCV(
+                    employee_id=employee.id,
+                    filename=file_path.name,
+                    source="manual_upload"
+                )
+                db.add(cv)
             db.flush()
 
             # Handle contacts
@@ -236,8 +390,12 @@ class IngestService:
             logger.error(f"Error handling CV data: {str(e)}")
             return None
 
-    def _handle_assessment_data(self, parsed_data, db, file_path):
-        """Handle parsed assessment data and create/update database records."""
+    def _handle_assessment_data(self, parsed_data, db, file_path, replace=False):
+        """Handle parsed assessment data and create/update database records.
+
+        With replace, the assessments (and scores) previously parsed from this
+        file are deleted and rebuilt.
+        """
         try:
             employee_name = parsed_data["name"].strip().replace("_", " ")
             employee = db.query(Employee).filter(
@@ -247,6 +405,13 @@ class IngestService:
                 logger.warning(f"Employee not found for assessment: {employee_name}")
                 return None
 
+            if replace:
+                # Scores are deleted with their assessment (ON DELETE CASCADE)
+                db.query(EmployeeAssessment).filter_by(
+                    employee_id=employee.id,
+                    source_filename=file_path.name
+                ).delete(synchronize_session=False)
+
             for assessment_data in parsed_data.get("assessments", []):
                 assessment = db.query(EmployeeAssessment).filter_by(
                     employee_id=employee.id,
@@ -314,6 +479,9 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Ingest data files")
     parser.add_argument('--input-dir', type=str, default='backend/data/imports', help='Directory containing files to ingest')
     parser.add_argument('--processed-dir', type=str, default='backend/data/processed', help='Directory to move processed files')
+    parser.add_argument('--incremental', action='store_true', help='Skip files ingested before and rebuild the records of edited files')
+    parser.add_argument('--parse-workers', type=int, default=0, help='Parse files in this many processes while --db-workers threads store them (0: one file at a time)')
+    parser.add_argument('--db-workers', type=int, default=2, help='Database writer threads when --parse-workers is set')
     args = parser.parse_args()
     
     # Initialize database
@@ -324,5 +492,6 @@ if __name__ == "__main__":
     processed_dir = Path(args.processed_dir)
     
     # Create and run ingest service
-    ingest_service = IngestService(source_dir=source_dir, processed_dir=processed_dir)
+    ingest_service = IngestService(source_dir=source_dir, processed_dir=processed_dir, incremental=args.incremental,
+                                   parse_workers=args.parse_workers, db_workers=args.db_workers)
     ingest_service.process_all()
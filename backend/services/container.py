@@ -0,0 +1,161 @@
+"""
+Process-wide service container
+Builds VectorStore, EmployeeDatabase, HybridQueryService and RAGQuerySystem
+once per process and shares them between requests. Services are built lazily
+on first use (or eagerly by warm_up() at API startup) under a lock, so
+concurrent requests never construct a second copy. The index maintenance
+scheduler (backend/db/index_maintenance.py) is started the same way.
+"""
+import os
+import logging
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ServiceContainer:
+    """Thread-safe registry of lazily built, process-wide services.
+
+    Lifecycle hooks are duck-typed: warm_up() calls a service's `warm_up`
+    method when it has one, shutdown() calls `close` in reverse build order.
+    """
+
+    def __init__(self):
+        self._factories: Dict[str, Callable[['ServiceContainer'], Any]] = {}
+        self._instances: Dict[str, Any] = {}
+        self._build_order: List[str] = []
+        # Re-entrant so factories can get() their dependencies
+        self._lock = threading.RLock()
+
+    def register(self, name: str, factory: Callable[['ServiceContainer'], Any]):
+        """Register (or replace) the factory for a service; an already built instance is dropped."""
+        with self._lock:
+            self._factories[name] = factory
+            self._discard(name)
+
+    def get(self, name: str) -> Any:
+        """Return the shared instance, building it on first use.
+
+        Raises:
+            KeyError: If no factory is registered under name
+        """
+        instance = self._instances.get(name)
+        if instance is not None:
+            return instance
+        with self._lock:
+            # Another thread may have built it while we waited for the lock
+            instance = self._instances.get(name)
+            if instance is None:
+                if name not in self._factories:
+                    raise KeyError(f"No service registered as '{name}'")
+                logger.info(f"Building service '{name}'")
+                instance = self._factories[name](self)
+                self._instances[name] = instance
+                self._build_order.append(name)
+            return instance
+
+    def is_built(self, name: str) -> bool:
+        return name in self._instances
+
+    def warm_up(self, names: Optional[List[str]] = None) -> Dict[str, bool]:
+        """Build services ahead of the first request and run their warm_up hooks.
+
+        Failures are logged and left for lazy construction to retry.
+
+        Returns:
+            Service name -> whether it is ready
+        """
+        status = {}
+        for name in names or list(self._factories):
+            try:
+                service = self.get(name)
+                if hasattr(service, 'warm_up'):
+                    service.warm_up()
+                status[name] = True
+            except Exception as e:
+                logger.error(f"Warm-up of service '{name}' failed: {e}")
+                status[name] = False
+        logger.info(f"Service warm-up: {status}")
+        return status
+
+    def reset(self, name: Optional[str] = None):
+        """Drop one built instance (or all) so the next get() rebuilds it."""
+        with self._lock:
+            for service_name in ([name] if name else list(reversed(self._build_order))):
+                self._discard(service_name)
+
+    def shutdown(self):
+        """Run close hooks in reverse build order and drop all instances."""
+        self.reset()
+
+    def _discard(self, name: str):
+        instance = self._instances.pop(name, None)
+        if name in self._build_order:
+            self._build_order.remove(name)
+        if instance is not None and hasattr(instance, 'close'):
+            try:
+                instance.close()
+            except Exception as e:
+                logger.error(f"Closing service '{name}' failed: {e}")
+
+
+def _build_employee_db(container: ServiceContainer):
+    from backend.services.data_access.employee_database import EmployeeDatabase
+    return EmployeeDatabase()
+
+
+def _build_vector_store(container: ServiceContainer):
+    from backend.services.rag.vector_store import VectorStore
+    return VectorStore()
+
+
+def _build_hybrid_query(container: ServiceContainer):
+    from backend.services.rag.hybrid_query import HybridQueryService
+    return HybridQueryService(
+        employee_db=container.get('employee_db'),
+        vector_store=container.get('vector_store')
+    )
+
+
+def _build_rag_system(container: ServiceContainer):
+    from backend.services.rag.query_service import RAGQuerySystem
+    return RAGQuerySystem(
+        vector_store=container.get('vector_store'),
+        employee_db=container.get('employee_db')
+    )
+
+
+def _build_index_maintenance(container: ServiceContainer):
+    from backend.db.index_maintenance import IndexMaintenanceScheduler
+    return IndexMaintenanceScheduler()
+
+
+services = ServiceContainer()
+services.register('employee_db', _build_employee_db)
+services.register('vector_store', _build_vector_store)
+services.register('hybrid_query', _build_hybrid_query)
+services.register('rag_system', _build_rag_system)
+services.register('index_maintenance', _build_index_maintenance)
+
+# Services built at API startup; comma separated, empty to build everything lazily
+WARM_UP_SERVICES = [
+    name.strip() for name in os.getenv('SERVICE_WARM_UP', 'employee_db,vector_store,hybrid_query,rag_system,index_maintenance').split(',')
+    if name.strip()
+]
+
+
+def get_employee_db():
+    return services.get('employee_db')
+
+
+def get_vector_store():
+    return services.get('vector_store')
+
+
+def get_hybrid_query_service():
+    return services.get('hybrid_query')
+
+
+def get_rag_system():
+    return services.get('rag_system')
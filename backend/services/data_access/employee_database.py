@@ -37,6 +37,11 @@ class EmployeeDatabase:
             logger.error(f"Failed to initialize employee name index: {e}")
             self._employee_name_index = {}
 
+    def warm_up(self):
+        """Build the name index up front (called by the service container at startup)."""
+        if not self._index_initialized:
+            self._initialize_name_index()
+
     def get_all_employees(self) -> List[Dict[str, Any]]:
         """Return list of all employees with id, name, position, etc."""
         try:
@@ -0,0 +1,205 @@
+"""
+Result diversification for RAG context building
+Maximal Marginal Relevance (MMR) over retrieved chunk vectors, with optional
+per-employee caps and a token budget, so prompts do not fill up with
+near-duplicate paragraphs from the same document or person.
+"""
+import logging
+from typing import List, Dict, Any, Optional, Sequence, Callable, Hashable
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LAMBDA = 0.5
+
+
+def _word_count(text: str) -> int:
+    # Same rough estimate QueryService logs with when no tokenizer is at hand
+    return len(text.split())
+
+
+def _normalise_rows(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def mmr_select(query_embedding: Sequence[float], candidate_embeddings: Sequence[Sequence[float]],
+               k: int, lambda_mult: float = DEFAULT_LAMBDA,
+               token_counts: Optional[Sequence[int]] = None,
+               token_budget: Optional[int] = None,
+               group_ids: Optional[Sequence[Hashable]] = None,
+               max_per_group: Optional[int] = None) -> List[int]:
+    """
+    Pick up to k candidates by Maximal Marginal Relevance.
+
+    Query and pairwise cosine similarities are computed once as matrix products;
+    each greedy step is then a vectorised update of the running redundancy
+    (max similarity to anything already picked).
+
+    Args:
+        query_embedding: Query vector
+        candidate_embeddings: One vector per candidate (n x d)
+        k: Maximum number of candidates to return
+        lambda_mult: 1.0 = pure relevance, 0.0 = pure diversity
+        token_counts: Token cost per candidate (required for token_budget)
+        token_budget: Total tokens the selection may use; candidates that no longer fit are skipped
+        group_ids: Group per candidate, e.g. employee id
+        max_per_group: Maximum picks per group
+
+    Returns:
+        Indices into candidate_embeddings, in selection order
+    """
+    candidates = np.asarray(candidate_embeddings, dtype=np.float32)
+    if k <= 0 or candidates.size == 0:
+        return []
+    if candidates.ndim != 2:
+        raise ValueError("candidate_embeddings must be a 2-D array")
+    n = candidates.shape[0]
+
+    candidates = _normalise_rows(candidates)
+    query = _normalise_rows(np.asarray(query_embedding, dtype=np.float32).reshape(1, -1))[0]
+    relevance = candidates @ query
+    similarity = candidates @ candidates.T
+
+    if token_budget is not None and token_counts is None:
+        raise ValueError("token_budget requires token_counts")
+    tokens = np.zeros(n) if token_counts is None else np.asarray(token_counts, dtype=np.float64)
+    remaining = np.inf if token_budget is None else float(token_budget)
+
+    groups = None
+    if max_per_group is not None and group_ids is not None:
+        groups = np.empty(n, dtype=object)
+        groups[:] = list(group_ids)
+    group_counts: Dict[Hashable, int] = {}
+
+    available = np.ones(n, dtype=bool)
+    redundancy = np.zeros(n, dtype=np.float32)
+    selected: List[int] = []
+
+    while len(selected) < k:
+        eligible = available & (tokens <= remaining)
+        if not eligible.any():
+            break
+
+        scores = lambda_mult * relevance - (1.0 - lambda_mult) * redundancy
+        scores[~eligible] = -np.inf
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        available[best] = False
+        remaining -= tokens[best]
+        # The first pick sets redundancy outright (similarities can be negative)
+        redundancy = similarity[best].copy() if len(selected) == 1 else np.maximum(redundancy, similarity[best])
+
+        if groups is not None:
+            group = groups[best]
+            group_counts[group] = group_counts.get(group, 0) + 1
+            if group_counts[group] >= max_per_group:
+                available &= groups != group
+
+    return selected
+
+
+def diversify_results(query_embedding: Sequence[float], results: List[Dict[str, Any]],
+                      k: int, lambda_mult: float = DEFAULT_LAMBDA,
+                      token_budget: Optional[int] = None,
+                      max_per_employee: Optional[int] = None,
+                      count_tokens: Optional[Callable[[str], int]] = None) -> List[Dict[str, Any]]:
+    """
+    Diversify search results that carry their chunk vectors.
+
+    Expects the shape returned by VectorStore.search_many(include_vectors=True):
+    dicts with 'content', 'embedding', optional 'token_count' and
+    metadata['employee_id']. The 'embedding' key is dropped from the output.
+
+    Args:
+        query_embedding: Query vector the results were retrieved with
+        results: Candidate results, best first
+        k: Maximum number of results to return
+        lambda_mult: 1.0 = pure relevance, 0.0 = pure diversity
+        token_budget: Total tokens of content the selection may use
+        max_per_employee: Maximum results per employee
+        count_tokens: Token counter for results without a stored token_count
+
+    Returns:
+        Selected results, in selection order
+    """
+    if not results:
+        return []
+    count_tokens = count_tokens or _word_count
+
+    token_counts = [
+        result.get('token_count') or count_tokens(result.get('content') or '')
+        for result in results
+    ]
+    employee_ids = [result.get('metadata', {}).get('employee_id') for result in results]
+
+    if any(result.get('embedding') is None for result in results):
+        # No vectors to compare: keep rank order under the same caps
+        logger.warning("diversify_results: results without embeddings, falling back to rank order")
+        selected = []
+        remaining = token_budget
+        per_employee: Dict[Any, int] = {}
+        for i, result in enumerate(results):
+            if len(selected) >= k:
+                break
+            if remaining is not None and token_counts[i] > remaining:
+                continue
+            if max_per_employee is not None and per_employee.get(employee_ids[i], 0) >= max_per_employee:
+                continue
+            selected.append(i)
+            per_employee[employee_ids[i]] = per_employee.get(employee_ids[i], 0) + 1
+            if remaining is not None:
+                remaining -= token_counts[i]
+    else:
+        selected = mmr_select(
+            query_embedding,
+            [result['embedding'] for result in results],
+            k,
+            lambda_mult=lambda_mult,
+            token_counts=token_counts,
+            token_budget=token_budget,
+            group_ids=employee_ids,
+            max_per_group=max_per_employee
+        )
+
+    diversified = []
+    for i in selected:
+        result = {key: value for key, value in results[i].items() if key != 'embedding'}
+        result['token_count'] = token_counts[i]
+        diversified.append(result)
+
+    logger.info(f"diversify_results: kept {len(diversified)} of {len(results)} results, "
+                f"~{sum(token_counts[i] for i in selected)} tokens")
+    return diversified
+
+
+def fit_token_budget(texts: List[str], token_budget: int,
+                     count_tokens: Optional[Callable[[str], int]] = None,
+                     drop_duplicates: bool = False) -> List[str]:
+    """
+    Texts that fit the token budget, filled in order.
+
+    For context without vectors (e.g. formatted employee profile sections, whose
+    order matters). A text that does not fit is skipped and later, shorter ones
+    still fill the remaining budget. With drop_duplicates, exact repeats are
+    skipped first.
+    """
+    count_tokens = count_tokens or _word_count
+    kept = []
+    seen = set()
+    remaining = token_budget
+    for text in texts:
+        if drop_duplicates:
+            key = ' '.join(text.split())
+            if key in seen:
+                continue
+            seen.add(key)
+        tokens = count_tokens(text)
+        if tokens > remaining:
+            continue
+        kept.append(text)
+        remaining -= tokens
+    return kept
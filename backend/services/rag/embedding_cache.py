@@ -0,0 +1,205 @@
+"""
+Two-tier cache for query embeddings
+In-process LRU in front of a persistent SQLite file shared by all workers
+"""
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from contextlib import closing
+from pathlib import Path
+from typing import List, Optional, Dict, Any
+
+logger = logging.getLogger(__name__)
+
+# Default on-disk location; override with QUERY_EMBEDDING_CACHE_PATH (empty string disables the disk tier)
+DEFAULT_CACHE_PATH = Path(__file__).resolve().parents[2] / "data" / "cache" / "query_embeddings.sqlite3"
+# Rows kept on disk; the oldest are pruned beyond this (QUERY_EMBEDDING_CACHE_DISK_ROWS)
+DEFAULT_DISK_MAX_ROWS = 100_000
+
+
+class QueryEmbeddingCache:
+    """LRU + SQLite cache of query embeddings keyed by (model, normalised text hash).
+
+    Both tiers hold float32 vectors (array('f')), 6 KB per 1536-dimension
+    embedding instead of ~49 KB as a list of Python floats.
+    """
+
+    # Disk writes between prunes of the SQLite tier
+    PRUNE_EVERY = 100
+
+    def __init__(self, max_size: int = 2048, disk_path: Optional[str] = None,
+                 disk_max_rows: Optional[int] = None):
+        """
+        Args:
+            max_size: Maximum number of embeddings kept in memory
+            disk_path: SQLite file for the persistent tier. Defaults to
+                       QUERY_EMBEDDING_CACHE_PATH or backend/data/cache/; pass "" to disable.
+            disk_max_rows: Maximum number of embeddings kept on disk, oldest pruned first.
+                           Defaults to QUERY_EMBEDDING_CACHE_DISK_ROWS or DEFAULT_DISK_MAX_ROWS.
+        """
+        self.max_size = max_size
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.disk_max_rows = disk_max_rows or int(
+            os.getenv("QUERY_EMBEDDING_CACHE_DISK_ROWS", str(DEFAULT_DISK_MAX_ROWS))
+        )
+        self._disk_writes = 0
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        if disk_path is None:
+            disk_path = os.getenv("QUERY_EMBEDDING_CACHE_PATH", str(DEFAULT_CACHE_PATH))
+        self.disk_path = disk_path or None
+        if self.disk_path:
+            self._init_disk()
+
+    @staticmethod
+    def normalize(text: str) -> str:
+        """Normalise a query so trivially different phrasings share an entry.
+
+        Lower-cases, collapses whitespace and drops trailing punctuation,
+        e.g. "Who is  Lisa Wu?" and "who is lisa wu" map to the same key.
+        """
+        text = " ".join(text.lower().split())
+        return re.sub(r"[\s?!.]+$", "", text)
+
+    @classmethod
+    def make_key(cls, model: str, text: str) -> str:
+        """Cache key for a (model, text) pair"""
+        digest = hashlib.sha256(cls.normalize(text).encode("utf-8")).hexdigest()
+        return f"{model}:{digest}"
+
+    def get(self, model: str, text: str) -> Optional[List[float]]:
+        """Return the cached embedding or None, checking memory then disk."""
+        key = self.make_key(model, text)
+
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.memory_hits += 1
+                return vector.tolist()
+
+        vector = self._disk_get(key)
+        if vector is not None:
+            self._memory_set(key, vector)
+            with self._lock:
+                self.disk_hits += 1
+            return vector.tolist()
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def set(self, model: str, text: str, embedding: List[float]):
+        """Store an embedding in both tiers."""
+        key = self.make_key(model, text)
+        vector = array("f", embedding)
+        self._memory_set(key, vector)
+        self._disk_set(key, model, vector)
+
+    def clear(self):
+        """Clear the in-memory tier and reset counters (the disk tier is kept)."""
+        with self._lock:
+            self._memory.clear()
+            self.memory_hits = self.disk_hits = self.misses = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0,
+                "memory_size": len(self._memory),
+                "max_size": self.max_size,
+                "disk_path": self.disk_path,
+                "disk_max_rows": self.disk_max_rows
+            }
+
+    # -------------------------------------------------------------------------
+    # Tier internals
+    # -------------------------------------------------------------------------
+
+    def _memory_set(self, key: str, vector: array):
+        with self._lock:
+            self._memory[key] = vector
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_size:
+                self._memory.popitem(last=False)
+
+    def _connect(self):
+        # One short-lived connection per call keeps this safe across threads and processes;
+        # closing() closes it, the inner "with conn" only commits
+        return closing(sqlite3.connect(self.disk_path, timeout=5))
+
+    def _init_disk(self):
+        try:
+            Path(self.disk_path).parent.mkdir(parents=True, exist_ok=True)
+            with self._connect() as conn, conn:
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS query_embeddings (
+                        key TEXT PRIMARY KEY,
+                        model TEXT NOT NULL,
+                        embedding BLOB NOT NULL,
+                        created_at REAL NOT NULL
+                    )
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS ix_query_embeddings_created_at ON query_embeddings (created_at)"
+                )
+                self._prune(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Disabling on-disk query embedding cache at {self.disk_path}: {e}")
+            self.disk_path = None
+
+    def _prune(self, conn: sqlite3.Connection):
+        """Delete the oldest rows beyond disk_max_rows"""
+        conn.execute("""
+            DELETE FROM query_embeddings WHERE key IN (
+                SELECT key FROM query_embeddings ORDER BY created_at DESC LIMIT -1 OFFSET ?
+            )
+        """, (self.disk_max_rows,))
+
+    def _disk_get(self, key: str) -> Optional[array]:
+        if not self.disk_path:
+            return None
+        try:
+            with self._connect() as conn:
+                row = conn.execute(
+                    "SELECT embedding FROM query_embeddings WHERE key = ?", (key,)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.warning(f"Query embedding cache read failed: {e}")
+            return None
+        if row is None:
+            return None
+        return array("f", row[0])
+
+    def _disk_set(self, key: str, model: str, vector: array):
+        if not self.disk_path:
+            return
+        with self._lock:
+            self._disk_writes += 1
+            prune = self._disk_writes % self.PRUNE_EVERY == 0
+        try:
+            with self._connect() as conn, conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO query_embeddings (key, model, embedding, created_at) VALUES (?, ?, ?, ?)",
+                    (key, model, vector.tobytes(), time.time())
+                )
+                if prune:
+                    self._prune(conn)
+        except sqlite3.Error as e:
+            logger.warning(f"Query embedding cache write failed: {e}")
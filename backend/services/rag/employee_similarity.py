@@ -0,0 +1,53 @@
+"""
+"More like this employee" scoring helpers
+Assessment trait vectors (Hogan HPI/HDS/MVPI and IDI scores) and their
+similarity, blended with the embedding similarity of employee centroids by
+VectorStore.find_similar_employees.
+"""
+from typing import Dict, Optional, Iterable, Tuple, Any
+
+# Hogan and IDI scores are percentiles
+TRAIT_SCORE_RANGE = 100.0
+# Fewer shared traits than this and the trait similarity is too noisy to use
+MIN_SHARED_TRAITS = 3
+DEFAULT_TRAIT_WEIGHT = 0.3
+
+
+def build_trait_vectors(rows: Iterable[Tuple[Any, str, str, float]]) -> Dict[str, Dict[str, float]]:
+    """
+    Group (employee_id, assessment_type, trait, score) rows into one trait vector per employee.
+
+    Keys are '<assessment_type>:<trait>' (lower case) so HPI, HDS, MVPI and IDI
+    traits of the same name stay apart; repeated assessments are averaged.
+    """
+    sums: Dict[str, Dict[str, list]] = {}
+    for employee_id, assessment_type, trait, score in rows:
+        if score is None:
+            continue
+        key = f"{assessment_type}:{trait}".lower()
+        sums.setdefault(str(employee_id), {}).setdefault(key, []).append(float(score))
+    return {
+        employee_id: {key: sum(scores) / len(scores) for key, scores in traits.items()}
+        for employee_id, traits in sums.items()
+    }
+
+
+def trait_similarity(a: Dict[str, float], b: Dict[str, float]) -> Optional[float]:
+    """
+    1 - mean absolute score difference over shared traits, scaled to 0..1.
+
+    Returns None when the two employees share fewer than MIN_SHARED_TRAITS traits.
+    """
+    shared = a.keys() & b.keys()
+    if len(shared) < MIN_SHARED_TRAITS:
+        return None
+    mean_difference = sum(abs(a[key] - b[key]) for key in shared) / len(shared)
+    return max(0.0, 1.0 - mean_difference / TRAIT_SCORE_RANGE)
+
+
+def blend_scores(embedding_score: float, trait_score: Optional[float],
+                 trait_weight: float = DEFAULT_TRAIT_WEIGHT) -> float:
+    """Weighted mix of embedding and trait similarity; embedding only when there is no trait score."""
+    if trait_score is None:
+        return embedding_score
+    return (1.0 - trait_weight) * embedding_score + trait_weight * trait_score
@@ -3,8 +3,9 @@
 Hybrid Query Service - Combines database filtering with vector search for optimal results
 """
 
+import os
 import logging
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from sqlalchemy.orm import Session
 from backend.db.session import SessionLocal
 from backend.db.models import Employee, EmployeeAssessment, HoganScore, IDIScore
@@ -16,9 +17,16 @@ logger = logging.getLogger(__name__)
 class HybridQueryService:
     """Service that combines database queries with vector search for better results."""
     
-    def __init__(self):
-        self.emp_db = EmployeeDatabase()
-        self.vector_store = VectorStore()
+    def __init__(self, min_score: Optional[float] = None,
+                 employee_db: Optional[EmployeeDatabase] = None,
+                 vector_store: Optional[VectorStore] = None):
+        # Pass shared instances (see backend.services.container) to avoid rebuilding them per query
+        self.emp_db = employee_db or EmployeeDatabase()
+        self.vector_store = vector_store or VectorStore()
+        # Default similarity floor for vector hits (VECTOR_MIN_SCORE, unset = keep everything)
+        self.min_score = min_score if min_score is not None else (
+            float(os.getenv('VECTOR_MIN_SCORE')) if os.getenv('VECTOR_MIN_SCORE') else None
+        )
     
     def find_employees_by_numerical_criteria(self, field: str, criteria: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -93,7 +101,8 @@ class HybridQueryService:
             logger.error(f"Error in find_employees_by_numerical_criteria: {e}")
             return []
     
-    def search_employees(self, query: str, filters: Dict[str, Any] = None, n_results: int = 10) -> Dict[str, Any]:
+    def search_employees(self, query: str, filters: Dict[str, Any] = None, n_results: int = 10,
+                         min_score: Optional[float] = None) -> Dict[str, Any]:
         """
         Enhanced employee search that combines filtering with vector search.
         
@@ -101,14 +110,25 @@ class HybridQueryService:
             query: Search query
             filters: Optional filters to apply
             n_results: Maximum number of results
+            min_score: Minimum similarity for vector hits; full-text hits are
+                       kept regardless, so exact keyword matches still surface
             
         Returns:
             Dictionary with search results and metadata
         """
-        # For now, use basic vector search
-        # This can be enhanced later with more sophisticated filtering
+        if min_score is None:
+            min_score = self.min_score
+        
         try:
-            vector_results = self.vector_store.search_employees(query, n_results=n_results)
+            # Vector and full-text hits fused with reciprocal-rank fusion in one SQL statement
+            # Only structured filters (department, document_type, ...) can be pushed down
+            structured_filters = {
+                key: value for key, value in (filters or {}).items()
+                if key in self.vector_store.STRUCTURED_FILTERS
+            }
+            vector_results = self.vector_store.search_employees_hybrid(
+                query, n_results=n_results, filters=structured_filters, min_score=min_score
+            )
             
             results = []
             for result in vector_results:
@@ -117,12 +137,14 @@ class HybridQueryService:
                     results.append({
                         'employee_id': result['employee_id'],
                         'name': emp_data['name'],
-                        'score': result.get('score', 0.0)
+                        'score': result.get('score', 0.0),
+                        'vector_rank': result.get('vector_rank'),
+                        'text_rank': result.get('text_rank')
                     })
             
             return {
                 'results': results,
-                'strategy_used': 'vector_search',
+                'strategy_used': 'hybrid_rrf',
                 'total_found': len(results)
             }
             
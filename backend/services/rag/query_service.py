@@ -19,8 +19,8 @@ import streamlit as st
 import logging
 from functools import lru_cache
 
-from backend.services.rag.vector_store import VectorStore
-from backend.services.data_access.employee_database import EmployeeDatabase
+from backend.services.rag.diversification import fit_token_budget
+from backend.services.container import get_vector_store, get_employee_db, get_hybrid_query_service
 
 logger = logging.getLogger(__name__)
 
@@ -93,16 +93,16 @@ class RAGQuerySystem:
             self.client = None
             print("Warning: OPENAI_API_KEY not set. Some features may be limited.")
         
-        # Use provided instances or create new ones (for backward compatibility)
+        # Use provided instances or the process-wide shared ones
         if vector_store is not None:
             self.vector_store = vector_store
         else:
-            self.vector_store = VectorStore()
+            self.vector_store = get_vector_store()
         
         if employee_db is not None:
             self.employee_db = employee_db
         else:
-            self.employee_db = EmployeeDatabase()
+            self.employee_db = get_employee_db()
         
         # Add caching
         self.query_cache = QueryCache(max_size=500, ttl_seconds=300)
@@ -1547,8 +1547,7 @@ Return as JSON:
             
             # Try hybrid service first if available
             try:
-                from backend.services.rag.hybrid_query import HybridQueryService
-                hybrid_service = HybridQueryService()
+                hybrid_service = get_hybrid_query_service()
                 context_chunks = self._gather_context_with_hybrid_service(
                     query, analysis, context_employees, employee_limits, hybrid_service
                 )
@@ -1566,6 +1565,9 @@ Return as JSON:
                 context_chunks = self._emergency_employee_fallback(query, analysis, employee_limits["max"])
                 logger.info(f"Emergency fallback returned {len(context_chunks)} chunks")
             
+            # Sections are ordered by priority; ones that do not fit are skipped and shorter ones fill the rest
+            context_chunks = fit_token_budget(context_chunks, self.max_context_tokens, self._count_tokens)
+            
             # Log final context summary
             total_tokens = sum(len(chunk.split()) for chunk in context_chunks)
             logger.info(f"Final context: {len(context_chunks)} chunks, ~{total_tokens} tokens")
@@ -1608,7 +1610,7 @@ Return as JSON:
             
             # Strategy 1: Try vector search one more time with broader parameters
             try:
-                search_results = self.vector_store.search_employees(query, n_results=max_employees * 2)
+                search_results = self.vector_store.search_employees(query, n_results=max_employees, mode='aggregate')
                 if search_results:
                     print(f"DEBUG: Emergency vector search found {len(search_results)} results")
                     for result in search_results[:max_employees]:
@@ -1650,10 +1652,8 @@ Return as JSON:
     def _get_hybrid_query_service(self):
         """Get hybrid query service if available"""
         try:
-            # Try to import and initialize the hybrid service directly
-            from backend.services.rag.hybrid_query import HybridQueryService
-            hybrid_service = HybridQueryService()
-            return hybrid_service
+            # Shared instance, built once per process
+            return get_hybrid_query_service()
         except ImportError:
             print("DEBUG: HybridQueryService not available")
             return None
@@ -1811,7 +1811,10 @@ Return as JSON:
                 if employees_added < max_employees:
                     print(f"DEBUG: Doing semantic search for single employee query")
                     try:
-                        search_results = self.vector_store.search_employees(query, n_results=remaining_slots + 5)
+                        # Already-added employees may come back, so ask for that many extra
+                        search_results = self.vector_store.search_employees(
+                            query, n_results=remaining_slots + employees_added, mode='aggregate'
+                        )
                         for result in search_results:
                             if employees_added >= max_employees:
                                 break
@@ -1842,7 +1845,10 @@ Return as JSON:
                 # Get broader context - search for relevant employees
                 print(f"DEBUG: Doing semantic search for multiple employees query")
                 try:
-                    search_results = self.vector_store.search_employees(query, n_results=remaining_slots + 10)
+                    # Already-added employees may come back, so ask for that many extra
+                    search_results = self.vector_store.search_employees(
+                        query, n_results=remaining_slots + employees_added, mode='aggregate'
+                    )
                     added_employees = set()
                     
                     for result in search_results:
@@ -1904,7 +1910,11 @@ Return as JSON:
             if not any("Profile Summary" in chunk or " - " in chunk for chunk in context_chunks):
                 print("DEBUG: Still no employee data, using general chunks as last resort")
                 try:
-                    general_chunks = self.vector_store.get_relevant_chunks(query, n_results=8)
+                    used_tokens = sum(self._count_tokens(chunk) for chunk in context_chunks)
+                    general_chunks = self._retrieve_chunks(
+                        query, analysis, n_results=8,
+                        token_budget=max(self.max_context_tokens - used_tokens, 0)
+                    )
                     context_chunks.extend(general_chunks)
                 except Exception as e:
                     print(f"DEBUG: General chunk search failed: {e}")
@@ -1912,6 +1922,29 @@ Return as JSON:
         print(f"DEBUG: Final context - {len(context_chunks)} chunks total")
         return context_chunks
     
+    def _retrieve_chunks(self, query: str, analysis: Dict[str, Any], n_results: int = 8,
+                         token_budget: Optional[int] = None) -> List[str]:
+        """Diverse chunks for the query and each of its key entities.
+        
+        All retrieval angles go through one VectorStore.search_diverse call (one
+        embeddings request, one SQL statement), and MMR with a per-employee cap
+        keeps near-duplicate paragraphs of one person out of the prompt.
+        """
+        entities = [
+            entity for entity in analysis.get("key_entities", [])
+            if isinstance(entity, str) and entity and entity.lower() != query.lower()
+        ]
+        results = self.vector_store.search_diverse(
+            query,
+            n_results=n_results,
+            fetch_k=n_results * 3,
+            extra_queries=entities,
+            token_budget=token_budget,
+            max_per_employee=2,
+            count_tokens=self._count_tokens
+        )
+        return [result['content'] for result in results]
+    
     def _extract_filters_from_analysis(self, query: str, analysis: Dict[str, Any]) -> Dict[str, Any]:
         """Extract filters that can be used by the hybrid query service"""
         filters = {}
@@ -2838,13 +2871,9 @@ Ensure your response is concise and focused, providing value that justifies the
         print(f"DEBUG: Ranking info: {ranking_info}")
         
         try:
-            # Import the hybrid service from the proper module
-            from backend.services.rag.hybrid_query import HybridQueryService
-            print(f"DEBUG: Successfully imported HybridQueryService")
-            
-            # Initialize hybrid service
-            hybrid_service = HybridQueryService()
-            print(f"DEBUG: Successfully initialized HybridQueryService")
+            # Shared hybrid service, built once per process
+            hybrid_service = get_hybrid_query_service()
+            print(f"DEBUG: Got shared HybridQueryService")
             
             ranking_type = ranking_info.get('ranking_type')
             
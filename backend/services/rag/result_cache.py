@@ -0,0 +1,101 @@
+"""
+Versioned cache of vector search results
+In-process LRU keyed by (search method, query vector hash, parameters, active run);
+every entry is tagged with the data generation it was computed at
+(backend/db/data_generation.py) and only served while that generation is current.
+"""
+import copy
+import json
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SearchResultCache:
+    """LRU of search results that can only return results of the current data generation."""
+
+    def __init__(self, max_size: int = 1024):
+        """
+        Args:
+            max_size: Maximum number of result sets kept; 0 disables the cache
+        """
+        self.max_size = max_size
+        self._entries: "OrderedDict[str, Tuple[int, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.stale = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_size > 0
+
+    @staticmethod
+    def make_key(method: str, query_vectors: Sequence[Optional[List[float]]],
+                 params: Dict[str, Any], run_id: Any) -> str:
+        """Cache key for a search call.
+
+        Query vectors are hashed as float32, the other arguments as sorted JSON,
+        so equal filters given in a different order share an entry.
+        """
+        digest = hashlib.sha256()
+        digest.update(f"{method}:{run_id}:".encode("utf-8"))
+        for vector in query_vectors:
+            digest.update(array("f", vector).tobytes() if vector is not None else b"-")
+            digest.update(b"|")
+        digest.update(json.dumps(params, sort_keys=True, default=str).encode("utf-8"))
+        return digest.hexdigest()
+
+    def get(self, key: str, generation: int) -> Optional[Any]:
+        """Return a copy of the cached results, or None when missing or from an older generation."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] != generation:
+                del self._entries[key]
+                self.stale += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            results = entry[1]
+        # Callers annotate and re-sort result dicts, so never hand out the cached objects
+        return copy.deepcopy(results)
+
+    def set(self, key: str, generation: int, results: Any):
+        """Store results computed at generation."""
+        if not self.enabled:
+            return
+        results = copy.deepcopy(results)
+        with self._lock:
+            self._entries[key] = (generation, results)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all entries and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = self.misses = self.stale = 0
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for monitoring."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "size": len(self._entries),
+                "max_size": self.max_size
+            }
@@ -0,0 +1,441 @@
+"""
+Memory-mapped NumPy mirror of embedding_chunks
+Exact in-process top-k search over the active embedding run
+"""
+import os
+import json
+import time
+import uuid
+import fcntl
+import shutil
+import logging
+import argparse
+import threading
+from pathlib import Path
+from typing import List, Dict, Any, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+
+from backend.db.session import SessionLocal
+from backend.db.models import EmbeddingDocument, EmbeddingChunk
+from backend.db.embedding_runs import get_active_run
+
+logger = logging.getLogger(__name__)
+
+# Default mirror location; override with VECTOR_MIRROR_DIR
+DEFAULT_MIRROR_DIR = Path(__file__).resolve().parents[2] / "data" / "vector_mirror"
+
+
+def plan_sync(exported: Optional[Dict[str, Optional[str]]],
+              current: Dict[str, Optional[str]]) -> Tuple[str, List[str]]:
+    """
+    Decide how to bring a mirror up to date.
+
+    Documents are compared by id and created_at: the pipeline re-creates a
+    re-embedded document (with new chunks) under the same external id, so
+    an id that is still present may carry different vectors.
+
+    Args:
+        exported: created_at (ISO string) by document id in the mirror, None without a mirror
+        current: created_at by document id in the run
+
+    Returns:
+        ('up_to_date' | 'append' | 'rebuild', document ids to export)
+    """
+    if exported is None:
+        return "rebuild", sorted(current)
+    for document_id, created_at in exported.items():
+        # Removed or re-embedded documents leave rows behind that cannot be patched out
+        if document_id not in current or current[document_id] != created_at:
+            return "rebuild", sorted(current)
+    new_ids = sorted(set(current) - set(exported))
+    return ("append", new_ids) if new_ids else ("up_to_date", [])
+
+
+class NumpyVectorMirror:
+    """
+    Exports the chunk vectors of the active EmbeddingRun to .npy files and
+    answers top-k queries with a float32 matrix-vector product.
+
+    Every sync writes a complete generation directory per run (all files row-aligned):
+        embeddings.npy    float32 (N, D), L2-normalised so dot product = cosine similarity
+        chunk_ids.npy     S16 (N,), raw UUID bytes of embedding_chunks.id
+        employee_ids.npy  S16 (N,), raw UUID bytes of embedding_chunks.employee_id
+        meta.json         run id, row count, created_at per exported document
+
+    and publishes it by replacing the run's CURRENT pointer file, so readers
+    always open the files of one generation. Files are opened with
+    mmap_mode='r', so every uvicorn worker shares the same pages through the
+    OS page cache. Syncs run on a background thread, never on a search.
+    """
+
+    EXPORT_BATCH_SIZE = 2000
+    # Generations kept per run besides the current one, for readers still opening the previous one
+    KEEP_PREVIOUS_GENERATIONS = 1
+
+    def __init__(self, mirror_dir: Optional[str] = None, refresh_interval: float = 60.0):
+        """
+        Args:
+            mirror_dir: Directory holding the mirror files
+            refresh_interval: Seconds between background checks for new documents; 0 disables them
+        """
+        self.mirror_dir = Path(mirror_dir or os.getenv("VECTOR_MIRROR_DIR", str(DEFAULT_MIRROR_DIR)))
+        self.refresh_interval = refresh_interval
+
+        self._run_id: Optional[str] = None
+        self._generation: Optional[str] = None
+        self._embeddings: Optional[np.ndarray] = None
+        self._chunk_ids: Optional[np.ndarray] = None
+        self._employee_ids: Optional[np.ndarray] = None
+
+        self._stop = threading.Event()
+        self._refresher: Optional[threading.Thread] = None
+        self._refresher_lock = threading.Lock()
+
+    # -------------------------------------------------------------------------
+    # Paths
+    # -------------------------------------------------------------------------
+
+    def _run_dir(self, run_id: str) -> Path:
+        return self.mirror_dir / str(run_id)
+
+    def _pointer_path(self, run_id: str) -> Path:
+        return self._run_dir(run_id) / "CURRENT"
+
+    def _read_generation(self, run_id: str) -> Optional[str]:
+        """Name of the published generation of a run"""
+        try:
+            return self._pointer_path(run_id).read_text(encoding="utf-8").strip() or None
+        except FileNotFoundError:
+            return None
+
+    def _read_meta(self, run_id: str) -> Optional[Dict[str, Any]]:
+        generation = self._read_generation(run_id)
+        if generation is None:
+            return None
+        with open(self._run_dir(run_id) / generation / "meta.json", "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    # -------------------------------------------------------------------------
+    # Sync with Postgres
+    # -------------------------------------------------------------------------
+
+    @staticmethod
+    def get_active_run_id(session) -> Optional[str]:
+        """The run searches read from (see backend/db/embedding_runs.py)"""
+        run = get_active_run(session)
+        return str(run.id) if run else None
+
+    def sync(self, force_full: bool = False) -> Dict[str, Any]:
+        """
+        Bring the mirror up to date with the active run.
+
+        New EmbeddingDocument rows are appended; if documents were removed or
+        re-embedded (or force_full is set) the mirror is rebuilt from scratch.
+        Either way a new generation is written and published atomically.
+
+        Returns:
+            Dict describing what was done
+        """
+        with SessionLocal() as session:
+            run_id = self.get_active_run_id(session)
+            if not run_id:
+                return {"status": "no_run"}
+            self._run_id = run_id
+
+            run_dir = self._run_dir(run_id)
+            run_dir.mkdir(parents=True, exist_ok=True)
+
+            # Only one process rebuilds at a time; others keep serving the old files
+            with open(run_dir / ".lock", "w") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    previous = self._read_generation(run_id)
+                    meta = None if force_full else self._read_meta(run_id)
+                    documents = session.query(
+                        EmbeddingDocument.external_document_id,
+                        EmbeddingDocument.created_at
+                    ).filter(EmbeddingDocument.embedding_run_id == run_id).all()
+                    current = {
+                        str(d.external_document_id): d.created_at.isoformat() if d.created_at else None
+                        for d in documents
+                    }
+
+                    # Mirrors written before per-document timestamps were kept are rebuilt
+                    action, document_ids = plan_sync(meta.get("documents") if meta else None, current)
+                    if action == "up_to_date":
+                        return {"status": "up_to_date", "run_id": run_id, "rows": meta["row_count"]}
+
+                    generation = str(time.time_ns())
+                    generation_dir = run_dir / generation
+                    generation_dir.mkdir()
+                    append_to = (run_dir / previous, meta) if action == "append" else None
+                    rows, dimensions = self._export(session, run_id, generation_dir, document_ids, append_to=append_to)
+
+                    last_created = max((d.created_at for d in documents if d.created_at), default=None)
+                    new_meta = {
+                        "run_id": run_id,
+                        "generation": generation,
+                        "row_count": rows,
+                        "dimensions": dimensions,
+                        "documents": current,
+                        "last_document_created_at": last_created.isoformat() if last_created else None,
+                        "updated_at": time.time()
+                    }
+                    with open(generation_dir / "meta.json", "w", encoding="utf-8") as f:
+                        json.dump(new_meta, f)
+
+                    # Publish: a single rename switches readers to the complete new generation
+                    tmp_pointer = self._pointer_path(run_id).with_suffix(".tmp")
+                    tmp_pointer.write_text(generation, encoding="utf-8")
+                    os.replace(tmp_pointer, self._pointer_path(run_id))
+                    self._prune_generations(run_dir, generation)
+
+                    status = "appended" if action == "append" else "rebuilt"
+                    logger.info(f"Vector mirror {status} for run {run_id}: {rows} rows (generation {generation})")
+                    return {"status": status, "run_id": run_id, "rows": rows}
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _prune_generations(self, run_dir: Path, current: str):
+        """Delete all but the newest generations; open memory maps stay valid after unlink"""
+        generations = sorted(
+            (path for path in run_dir.iterdir() if path.is_dir() and path.name.isdigit()),
+            key=lambda path: int(path.name)
+        )
+        for path in generations[:-(self.KEEP_PREVIOUS_GENERATIONS + 1)]:
+            if path.name != current:
+                shutil.rmtree(path, ignore_errors=True)
+        # Files of the single-directory layout mirrors used before generations
+        for name in ("embeddings.npy", "chunk_ids.npy", "employee_ids.npy", "meta.json"):
+            (run_dir / name).unlink(missing_ok=True)
+
+    def _chunk_count(self, session, run_id: str, document_ids: List[str]) -> int:
+        if not document_ids:
+            return 0
+        return session.query(func.count(EmbeddingChunk.id)).filter(
+            EmbeddingChunk.embedding_run_id == run_id,
+            EmbeddingChunk.external_document_id.in_(document_ids)
+        ).scalar() or 0
+
+    def _export(self, session, run_id: str, generation_dir: Path, document_ids: List[str],
+                append_to: Optional[Tuple[Path, Dict[str, Any]]] = None) -> Tuple[int, int]:
+        """
+        Write the mirror files of a new generation: the rows of append_to's
+        (directory, meta) generation, if given, plus the given documents.
+
+        Returns:
+            (row count, dimensions)
+        """
+        previous_dir, previous_meta = append_to if append_to else (None, None)
+        new_rows = self._chunk_count(session, run_id, document_ids)
+        old_rows = previous_meta["row_count"] if previous_meta else 0
+        total_rows = old_rows + new_rows
+
+        # Dimension comes from the existing mirror, or from the first new vector
+        if previous_meta and old_rows:
+            dims = previous_meta["dimensions"]
+        else:
+            first = session.query(EmbeddingChunk.embedding).filter(
+                EmbeddingChunk.embedding_run_id == run_id,
+                EmbeddingChunk.external_document_id.in_(document_ids)
+            ).limit(1).scalar() if document_ids else None
+            dims = len(first) if first is not None else 0
+
+        paths = {name: generation_dir / f"{name}.npy" for name in ("embeddings", "chunk_ids", "employee_ids")}
+        embeddings = np.lib.format.open_memmap(paths["embeddings"], mode="w+", dtype=np.float32, shape=(total_rows, dims))
+        chunk_ids = np.lib.format.open_memmap(paths["chunk_ids"], mode="w+", dtype="S16", shape=(total_rows,))
+        employee_ids = np.lib.format.open_memmap(paths["employee_ids"], mode="w+", dtype="S16", shape=(total_rows,))
+
+        # Copy the previous generation block by block
+        if previous_meta and old_rows:
+            old_embeddings = np.load(previous_dir / "embeddings.npy", mmap_mode="r")
+            old_chunk_ids = np.load(previous_dir / "chunk_ids.npy", mmap_mode="r")
+            old_employee_ids = np.load(previous_dir / "employee_ids.npy", mmap_mode="r")
+            for start in range(0, old_rows, self.EXPORT_BATCH_SIZE):
+                end = min(start + self.EXPORT_BATCH_SIZE, old_rows)
+                embeddings[start:end] = old_embeddings[start:end]
+                chunk_ids[start:end] = old_chunk_ids[start:end]
+                employee_ids[start:end] = old_employee_ids[start:end]
+
+        # Stream new rows with a server-side cursor so the export runs in bounded memory
+        row = old_rows
+        if document_ids:
+            stream = session.query(
+                EmbeddingChunk.id, EmbeddingChunk.employee_id, EmbeddingChunk.embedding
+            ).filter(
+                EmbeddingChunk.embedding_run_id == run_id,
+                EmbeddingChunk.external_document_id.in_(document_ids)
+            ).order_by(EmbeddingChunk.id).execution_options(
+                stream_results=True, yield_per=self.EXPORT_BATCH_SIZE
+            )
+            for chunk_id, employee_id, vector in stream:
+                if row >= total_rows:
+                    break  # rows inserted after the count; picked up by the next sync
+                vector = np.asarray(vector, dtype=np.float32)
+                norm = np.linalg.norm(vector)
+                embeddings[row] = vector / norm if norm else vector
+                chunk_ids[row] = chunk_id.bytes
+                employee_ids[row] = employee_id.bytes
+                row += 1
+
+        for array in (embeddings, chunk_ids, employee_ids):
+            array.flush()
+        del embeddings, chunk_ids, employee_ids
+
+        # Chunks deleted after the count leave unwritten rows at the end; readers map
+        # the whole file, so cut it down to the rows actually written
+        if row < total_rows:
+            for path in paths.values():
+                self._truncate(path, row)
+        return row, int(dims)
+
+    def _truncate(self, path: Path, rows: int):
+        """Rewrite a .npy file with only its first rows"""
+        source = np.load(path, mmap_mode="r")
+        tmp_path = path.with_name(f"{path.stem}.tmp.npy")
+        target = np.lib.format.open_memmap(tmp_path, mode="w+", dtype=source.dtype, shape=(rows,) + source.shape[1:])
+        for start in range(0, rows, self.EXPORT_BATCH_SIZE):
+            end = min(start + self.EXPORT_BATCH_SIZE, rows)
+            target[start:end] = source[start:end]
+        target.flush()
+        del source, target
+        os.replace(tmp_path, path)
+
+    # -------------------------------------------------------------------------
+    # Background refresh
+    # -------------------------------------------------------------------------
+
+    def warm_up(self):
+        """Start the background refresher and open the published mirror (called via VectorStore.warm_up)."""
+        self._start_refresher()
+        self._ensure_loaded()
+
+    def close(self):
+        """Stop the background refresher."""
+        self._stop.set()
+        if self._refresher:
+            self._refresher.join(timeout=5)
+            self._refresher = None
+
+    def _start_refresher(self):
+        if self.refresh_interval <= 0:
+            return
+        with self._refresher_lock:
+            if self._refresher and self._refresher.is_alive():
+                return
+            self._stop.clear()
+            self._refresher = threading.Thread(target=self._refresh_loop, name="vector-mirror-refresh", daemon=True)
+            self._refresher.start()
+
+    def _refresh_loop(self):
+        # First sync right away, so a missing mirror is built before the first interval passes
+        while True:
+            try:
+                self.sync()
+            except Exception as e:
+                logger.error(f"Vector mirror sync failed, serving previous mirror: {e}")
+            if self._stop.wait(self.refresh_interval):
+                break
+
+    # -------------------------------------------------------------------------
+    # Search
+    # -------------------------------------------------------------------------
+
+    def _ensure_loaded(self) -> bool:
+        """(Re-)open the memory maps if a new generation was published"""
+        self._start_refresher()
+
+        if self._run_id is None:
+            with SessionLocal() as session:
+                self._run_id = self.get_active_run_id(session)
+            if self._run_id is None:
+                return False
+
+        generation = self._read_generation(self._run_id)
+        if generation is None:
+            return False
+
+        if generation != self._generation:
+            generation_dir = self._run_dir(self._run_id) / generation
+            try:
+                embeddings = np.load(generation_dir / "embeddings.npy", mmap_mode="r")
+                chunk_ids = np.load(generation_dir / "chunk_ids.npy", mmap_mode="r")
+                employee_ids = np.load(generation_dir / "employee_ids.npy", mmap_mode="r")
+            except FileNotFoundError:
+                # Pruned by a concurrent sync; the next call sees the newer pointer
+                logger.warning(f"Vector mirror generation {generation} disappeared, keeping the loaded one")
+            else:
+                self._embeddings, self._chunk_ids, self._employee_ids = embeddings, chunk_ids, employee_ids
+                self._generation = generation
+        return self._embeddings is not None and len(self._embeddings) > 0
+
+    def is_ready(self) -> bool:
+        """Whether a mirror is published and loaded; searches use pgvector until it is"""
+        return self._ensure_loaded()
+
+    def search(self, query_embedding: List[float], k: int,
+               employee_id: Optional[str] = None) -> List[Tuple[str, str, float]]:
+        """
+        Exact top-k by cosine similarity.
+
+        Args:
+            query_embedding: Query vector
+            k: Number of results
+            employee_id: Optional employee to restrict the search to
+
+        Returns:
+            List of (chunk_id, employee_id, similarity) tuples, best first
+        """
+        if not self._ensure_loaded():
+            return []
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if not norm:
+            return []
+        query = query / norm
+
+        if employee_id:
+            rows = np.flatnonzero(self._employee_ids == uuid.UUID(str(employee_id)).bytes)
+            if rows.size == 0:
+                return []
+            scores = self._embeddings[rows] @ query
+        else:
+            rows = None
+            scores = self._embeddings @ query
+
+        k = min(k, scores.shape[0])
+        if k <= 0:
+            return []
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        positions = rows[top] if rows is not None else top
+
+        return [
+            (str(uuid.UUID(bytes=bytes(self._chunk_ids[p]))),
+             str(uuid.UUID(bytes=bytes(self._employee_ids[p]))),
+             float(scores[t]))
+            for p, t in zip(positions, top)
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Describe the currently loaded mirror"""
+        loaded = self._embeddings is not None
+        return {
+            "run_id": self._run_id,
+            "rows": int(self._embeddings.shape[0]) if loaded else 0,
+            "dimensions": int(self._embeddings.shape[1]) if loaded else 0,
+            "generation": self._generation,
+            "mirror_dir": str(self.mirror_dir)
+        }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    parser = argparse.ArgumentParser(description="Export embedding_chunks to a memory-mapped NumPy mirror")
+    parser.add_argument('--mirror-dir', type=str, default=None, help='Directory for the mirror files')
+    parser.add_argument('--full', action='store_true', help='Rebuild from scratch instead of appending')
+    args = parser.parse_args()
+    print(NumpyVectorMirror(mirror_dir=args.mirror_dir).sync(force_full=args.full))
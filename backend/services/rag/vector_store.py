@@ -3,29 +3,116 @@ PostgreSQL pgvector-based vector store
 Production-ready vector storage and retrieval using PostgreSQL + pgvector
 """
 import os
-import traceback
 from dotenv import load_dotenv
 
 # Load environment variables at the very top
 load_dotenv()
 
-import json
+import re
+import time
+import inspect
 import logging
-from typing import List, Dict, Any, Optional
+from functools import wraps
+from collections import namedtuple
+from typing import List, Dict, Any, Optional, Tuple, Union, Iterator, Callable
 from sqlalchemy.orm import sessionmaker
-from sqlalchemy import func, text, and_, or_
-from pgvector.sqlalchemy import Vector
-import openai
+from sqlalchemy import func, text, and_, or_, null, true, bindparam, select, cast
+from sqlalchemy.dialects.postgresql import aggregate_order_by
+from pgvector.sqlalchemy import Vector, HALFVEC, BIT
 
 from backend.db.session import engine, SessionLocal
+from backend.db.embedding_runs import get_active_run
+from backend.db.data_generation import get_data_generation, bump_data_generation
+from backend.services.rag.embedding_cache import QueryEmbeddingCache
+from backend.services.rag.result_cache import SearchResultCache
+from backend.services.rag.diversification import diversify_results, DEFAULT_LAMBDA
+from backend.ingestion.embedding.embedder import (
+    SHORT_DIMENSIONS, EMBEDDING_DIMENSIONS, Embedder, get_embedder, shorten_embedding
+)
+from backend.ingestion.embedding.cached_embedder import with_embedding_cache
 from backend.db.models import (
     EmbeddingDocument,
     EmbeddingChunk,
-    Base
+    EmployeeCentroid,
+    EmployeeAssessment,
+    HoganScore,
+    IDIScore,
+    Base,
+    EMBEDDING_QUANTIZATION
+)
+from backend.db.employee_centroids import ALL_DOCUMENT_TYPES
+from backend.services.rag.employee_similarity import (
+    DEFAULT_TRAIT_WEIGHT, build_trait_vectors, trait_similarity, blend_scores
 )
 
 logger = logging.getLogger(__name__)
 
+# Search result row; same attributes as the projected pgvector rows, never carries vectors
+ChunkHit = namedtuple('ChunkHit', ['id', 'content', 'employee_id', 'document_type', 'source_filename', 'distance'])
+
+
+def cached_search(keep_query_text: bool = False):
+    """
+    Serve a VectorStore search method from its result cache.
+    
+    The query text ('query' or 'queries' argument) is keyed by its embedding,
+    the other arguments as given; entries are only served while the data
+    generation they were computed at is current. Empty results are not cached
+    since the search methods also return them on errors, and queries whose
+    embedding failed (zero vector fallback) bypass the cache entirely: they
+    would all share one key. Several queries are embedded with one request,
+    and the vectors are passed on as the method's query_embeddings argument.
+    
+    Args:
+        keep_query_text: Also key on the raw text, for searches that use it
+                         beyond the embedding (full-text matching)
+    """
+    def decorator(method):
+        signature = inspect.signature(method)
+        
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            cache = self.result_cache
+            if not cache.enabled:
+                return method(self, *args, **kwargs)
+            
+            bound = signature.bind(self, *args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            params.pop('self')
+            params.pop('query_embeddings', None)
+            if 'queries' in params:
+                # One batched embeddings request, handed on so the search does not embed again
+                texts = list(params['queries'])
+                vectors = bound.arguments.get('query_embeddings') or (
+                    self._generate_embeddings(texts) if texts else []
+                )
+                if 'query_embeddings' in signature.parameters:
+                    bound.arguments['query_embeddings'] = vectors
+            else:
+                texts = [params.get('query')]
+                vectors = [self._generate_embedding(t) if t else None for t in texts]
+            if not keep_query_text:
+                params.pop('queries', None)
+                params.pop('query', None)
+            if any(vector is not None and not any(vector) for vector in vectors):
+                return method(*bound.args, **bound.kwargs)
+            generation = self._data_generation()
+            if generation is None:
+                return method(*bound.args, **bound.kwargs)
+            key = cache.make_key(method.__name__, vectors, params, self.active_run_id)
+            
+            results = cache.get(key, generation)
+            if results is not None:
+                logger.debug(f"{method.__name__}: served from result cache")
+                return results
+            results = method(*bound.args, **bound.kwargs)
+            if results and any(results):
+                cache.set(key, generation, results)
+            return results
+        return wrapper
+    return decorator
+
 class VectorStore:
     """
     PostgreSQL + pgvector based vector store
@@ -35,27 +122,153 @@ class VectorStore:
     # Default tenant for single-tenant setup
     DEFAULT_TENANT_ID = "default_tenant"
     
-    def __init__(self):
-        """Initialize PostgreSQL + pgvector vector store"""
+    # pgvector default for hnsw.ef_search; results are capped at this many rows per scan
+    DEFAULT_HNSW_EF_SEARCH = 40
+    
+    # Supported distance metrics and their pgvector operators. inner_product
+    # assumes pre-normalised vectors (OpenAI embeddings are unit length), where
+    # it ranks like cosine but is cheaper to compute.
+    DISTANCE_OPERATORS = {
+        'l2': '<->',
+        'cosine': '<=>',
+        'inner_product': '<#>',
+    }
+    DEFAULT_METRIC = 'cosine'
+    
+    # First-stage scan over a compressed copy of the embeddings; candidates are
+    # re-ranked against the float32 column (see migration 382ce2eaf094)
+    QUANTIZATION_MODES = ('none', 'halfvec', 'binary')
+    DEFAULT_RERANK_FACTOR = 4
+    
+    # Filters that compile to indexed predicates on denormalised embedding_chunks columns
+    STRUCTURED_FILTERS = ('document_type', 'employee_id', 'department', 'assessment_type')
+    
+    # hnsw.iterative_scan modes (pgvector >= 0.8): keep scanning the graph until
+    # enough rows pass the filters instead of returning fewer than LIMIT
+    ITERATIVE_SCAN_MODES = ('off', 'strict_order', 'relaxed_order')
+    
+    # Seconds an active run lookup is reused before checking for a newly activated run
+    ACTIVE_RUN_TTL = 30.0
+    
+    # Seconds a data generation read is reused by the result cache (see _data_generation)
+    GENERATION_CHECK_SECONDS = float(os.getenv('SEARCH_GENERATION_CHECK_MS', '250')) / 1000
+    
+    # Search backends: pgvector queries Postgres, numpy scans a memory-mapped mirror in-process
+    BACKENDS = ('pgvector', 'numpy')
+    
+    # Two-stage employee search: employees shortlisted by centroid per requested employee (and at least)
+    CENTROID_SHORTLIST_FACTOR = 5
+    MIN_CENTROID_SHORTLIST = 50
+    
+    def __init__(self, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                 metric: Optional[str] = None, backend: Optional[str] = None,
+                 quantization: Optional[str] = None, rerank_factor: Optional[int] = None,
+                 short_dimensions: Optional[int] = None,
+                 embedder: Optional[Embedder] = None):
+        """Initialize PostgreSQL + pgvector vector store
+        
+        Args:
+            ef_search: Default hnsw.ef_search for searches (higher = better recall, slower)
+            probes: Default ivfflat.probes for searches (higher = better recall, slower)
+            metric: Distance metric ('cosine', 'inner_product' or 'l2'); must match
+                    the opclass of the vector index to use it
+            backend: 'pgvector' (default) or 'numpy' for exact search over a
+                     memory-mapped mirror of the active run (see vector_mirror.py)
+            quantization: 'none' (default), 'halfvec' or 'binary' first-stage scan
+            rerank_factor: Candidates fetched per requested result before the
+                           float32 re-rank when quantization is enabled
+            short_dimensions: Scan the shortened (Matryoshka) vectors of this length
+                              first; defaults to VECTOR_SHORT_DIMENSIONS or the
+                              active run's EmbeddingRun.short_dimensions. Only used
+                              when the active run stores vectors of this length
+            embedder: Query embedder to use instead of the one matching the
+                      active run's model; its model becomes the embedding model
+        """
         try:
             print("🔧 Initializing PostgreSQL + pgvector VectorStore...")
             
-            # Initialize OpenAI client for embeddings
-            openai_api_key = os.getenv('OPENAI_API_KEY')
-            if not openai_api_key:
-                logger.warning(f"❌ OPENAI_API_KEY not set in {__file__}")
-                print("Stack trace:")
-                traceback.print_stack()
-                print(f"Current working directory: {os.getcwd()}")
-                print(f"Environment variables containing 'OPENAI': {[k for k in os.environ.keys() if 'OPENAI' in k.upper()]}")
-                self.openai_client = None
-            else:
-                self.openai_client = openai.OpenAI(api_key=openai_api_key)
-                print(f"✅ OpenAI client initialized successfully from {__file__}")
+            self.metric = metric or os.getenv('VECTOR_DISTANCE_METRIC', self.DEFAULT_METRIC)
+            if self.metric not in self.DISTANCE_OPERATORS:
+                raise ValueError(
+                    f"Unsupported distance metric '{self.metric}'. "
+                    f"Available metrics: {', '.join(sorted(self.DISTANCE_OPERATORS))}"
+                )
+            
+            # Index recall knobs, applied per query via SET LOCAL
+            self.ef_search = ef_search or self._env_int('VECTOR_HNSW_EF_SEARCH')
+            self.probes = probes or self._env_int('VECTOR_IVFFLAT_PROBES')
+            
+            self.quantization = quantization or os.getenv('VECTOR_QUANTIZATION', 'none')
+            if self.quantization not in self.QUANTIZATION_MODES:
+                raise ValueError(
+                    f"Unsupported quantization '{self.quantization}'. "
+                    f"Available modes: {', '.join(self.QUANTIZATION_MODES)}"
+                )
+            if self.quantization != 'none' and self.quantization != EMBEDDING_QUANTIZATION:
+                # The compressed copy and its graph only exist in the storage mode migrated to
+                raise ValueError(
+                    f"quantization '{self.quantization}' needs quantized storage: set "
+                    f"VECTOR_QUANTIZATION={self.quantization} and run alembic -x quantization={self.quantization}"
+                )
+            self.rerank_factor = (
+                rerank_factor or self._env_int('VECTOR_RERANK_FACTOR') or self.DEFAULT_RERANK_FACTOR
+            )
+            
+            self.backend = backend or os.getenv('VECTOR_SEARCH_BACKEND', 'pgvector')
+            if self.backend not in self.BACKENDS:
+                raise ValueError(
+                    f"Unsupported search backend '{self.backend}'. "
+                    f"Available backends: {', '.join(self.BACKENDS)}"
+                )
+            self.mirror = None
+            if self.backend == 'numpy':
+                from backend.services.rag.vector_mirror import NumpyVectorMirror
+                self.mirror = NumpyVectorMirror(
+                    refresh_interval=float(os.getenv('VECTOR_MIRROR_REFRESH_SECONDS', '60'))
+                )
+            
+            # Searches only read the active embedding run; see _active_run
+            self._active_run_cache: Optional[Dict[str, Any]] = None
+            self._active_run_checked = 0.0
+            
+            # Query embeddings: model is part of the cache key, so switching models never mixes vectors.
+            # Defaults to the active run's model so queries and chunks share a vector space.
+            self._embedding_model_override = (
+                embedder.model if embedder else os.getenv('VECTOR_STORE_EMBEDDING_MODEL')
+            )
+            self.embedding_cache = QueryEmbeddingCache(
+                max_size=self._env_int('QUERY_EMBEDDING_CACHE_SIZE') or 2048
+            )
+            # Search results, invalidated by the data generation counter (0 disables)
+            self.result_cache = SearchResultCache(
+                max_size=int(os.getenv('SEARCH_RESULT_CACHE_SIZE', '1024'))
+            )
+            # Last data generation read and when (see _data_generation)
+            self._generation_checked: Tuple[Optional[int], float] = (None, 0.0)
+            
+            # Query embedders by model identifier, built on first use (see _get_embedder)
+            self._embedders: Dict[str, Optional[Embedder]] = {}
+            if embedder:
+                self._embedders[embedder.model] = embedder
             
             # Test database connection and pgvector
             self._test_connection()
             
+            self._short_dimensions_override = short_dimensions or self._env_int('VECTOR_SHORT_DIMENSIONS')
+            if self._short_dimensions_override and self._short_dimensions_override not in SHORT_DIMENSIONS:
+                raise ValueError(f"short_dimensions must be one of {SHORT_DIMENSIONS}")
+            # Runs already warned about lacking the overridden short vectors
+            self._short_dimensions_warned = set()
+            
+            self.iterative_scan = os.getenv('VECTOR_ITERATIVE_SCAN', 'strict_order')
+            if self.iterative_scan not in self.ITERATIVE_SCAN_MODES:
+                raise ValueError(
+                    f"Unsupported iterative scan mode '{self.iterative_scan}'. "
+                    f"Available modes: {', '.join(self.ITERATIVE_SCAN_MODES)}"
+                )
+            if self.pgvector_version < (0, 8, 0):
+                self.iterative_scan = 'off'
+            
             # Create tables if they don't exist
             self._ensure_tables_exist()
             
@@ -73,11 +286,17 @@ class VectorStore:
                 session.execute(text("SELECT 1"))
                 
                 # Test pgvector extension
-                result = session.execute(text("SELECT * FROM pg_extension WHERE extname = 'vector'"))
-                if not result.fetchone():
+                result = session.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'"))
+                row = result.fetchone()
+                if not row:
                     logger.error("pgvector extension not installed!")
                     raise Exception("pgvector extension required but not found")
                 
+                # Feature checks (e.g. iterative index scans) depend on the installed version
+                self.pgvector_version = tuple(
+                    int(part) for part in re.findall(r'\d+', row.extversion)[:3]
+                )
+                
                 logger.info("✅ PostgreSQL and pgvector extension available")
                 
         except Exception as e:
@@ -94,21 +313,364 @@ class VectorStore:
             logger.error(f"Failed to create tables: {e}")
             raise
     
-    def _generate_embedding(self, text: str) -> List[float]:
-        """Generate embedding using OpenAI API"""
-        if not self.openai_client:
-            logger.warning("OpenAI client not available - returning zero vector")
-            return [0.0] * 1536
+    def _active_run(self) -> Optional[Dict[str, Any]]:
+        """
+        The embedding run searches read from, cached for ACTIVE_RUN_TTL seconds.
         
+        Activating another run (backend/db/embedding_runs.py) is picked up by
+        every worker within the TTL without a restart.
+        """
+        now = time.monotonic()
+        if self._active_run_cache is None or now - self._active_run_checked > self.ACTIVE_RUN_TTL:
+            try:
+                with SessionLocal() as session:
+                    run = get_active_run(session)
+                    self._active_run_cache = {
+                        'id': run.id,
+                        'embedding_model': run.embedding_model,
+                        'short_dimensions': run.short_dimensions
+                    } if run else {}
+                self._active_run_checked = now
+            except Exception as e:
+                logger.warning(f"Could not read active embedding run: {e}")
+                return self._active_run_cache or None
+        return self._active_run_cache or None
+    
+    def warm_up(self):
+        """Resolve the active run and its query embedder, and load the mirror if enabled,
+        so the first search does not pay for it (called by the service container)."""
+        self._active_run()
+        self._get_embedder()
+        if self.mirror:
+            self.mirror.warm_up()
+    
+    def close(self):
+        """Stop the mirror's background refresher (called by the service container)."""
+        if self.mirror:
+            self.mirror.close()
+    
+    @property
+    def active_run_id(self):
+        """Id of the active embedding run, None before the first run"""
+        run = self._active_run()
+        return run['id'] if run else None
+    
+    @property
+    def embedding_model(self) -> str:
+        """Model used for query embeddings"""
+        run = self._active_run()
+        return self._embedding_model_override or (run and run['embedding_model']) or 'text-embedding-3-small'
+    
+    @property
+    def short_dimensions(self) -> Optional[int]:
+        """Length of the first-stage short vectors, None when the active run has none"""
+        run = self._active_run()
+        run_dimensions = (run and run['short_dimensions']) or None
+        override = self._short_dimensions_override
+        if override and override != run_dimensions:
+            # Filtering on embedding_short of another length would match no chunk at all
+            run_id = run['id'] if run else None
+            if run_id not in self._short_dimensions_warned:
+                self._short_dimensions_warned.add(run_id)
+                logger.warning(f"Active run {run_id} has no {override}-dimension short vectors "
+                               f"(short_dimensions={run_dimensions}), searching full vectors")
+            return None
+        return run_dimensions
+    
+    def _run_condition(self):
+        """Restrict EmbeddingChunk to the active run's partition"""
+        run_id = self.active_run_id
+        return EmbeddingChunk.embedding_run_id == run_id if run_id else true()
+    
+    @staticmethod
+    def _document_join():
+        """Join condition between a chunk and its document within the same run"""
+        return and_(
+            EmbeddingChunk.external_document_id == EmbeddingDocument.external_document_id,
+            EmbeddingChunk.embedding_run_id == EmbeddingDocument.embedding_run_id
+        )
+    
+    @staticmethod
+    def _hit_columns():
+        """Columns search results are built from; the vector columns are never selected"""
+        return (
+            EmbeddingChunk.id,
+            EmbeddingChunk.content,
+            EmbeddingDocument.employee_id,
+            EmbeddingDocument.document_type,
+            EmbeddingDocument.source_filename
+        )
+    
+    def _hit_query(self, session, *extra_columns):
+        """Projected chunk/document query restricted to the active run"""
+        return session.query(*self._hit_columns(), *extra_columns).join(
+            EmbeddingDocument,
+            self._document_join()
+        ).filter(self._run_condition())
+    
+    @property
+    def _two_stage(self) -> bool:
+        """Whether searches scan a compressed or shortened copy before re-ranking"""
+        return bool(self.short_dimensions) or self.quantization != 'none'
+    
+    @staticmethod
+    def _env_int(name: str) -> Optional[int]:
+        """Read an optional positive integer setting from the environment"""
+        value = os.getenv(name)
+        if not value:
+            return None
         try:
-            response = self.openai_client.embeddings.create(
-                model="text-embedding-ada-002",
-                input=text
+            return int(value) if int(value) > 0 else None
+        except ValueError:
+            logger.warning(f"Ignoring non-integer {name}={value!r}")
+            return None
+    
+    def _apply_search_params(self, session, ef_search: Optional[int] = None,
+                             probes: Optional[int] = None, limit: Optional[int] = None,
+                             filtered: bool = False):
+        """
+        Set ANN index recall knobs for the current transaction only.
+        
+        SET LOCAL is scoped to the session's transaction, so pooled connections
+        never leak these settings into other queries.
+        
+        Args:
+            session: Active SQLAlchemy session (a transaction is started if needed)
+            ef_search: hnsw.ef_search override, falls back to the store default
+            probes: ivfflat.probes override, falls back to the store default
+            limit: Number of rows the query will ask for; HNSW never returns more
+                   than ef_search rows, so ef_search is raised to at least this
+            filtered: The query has WHERE filters; enables hnsw.iterative_scan so
+                      filtered-out rows do not shrink the result below limit
+        """
+        ef_search = ef_search or self.ef_search
+        probes = probes or self.probes
+        
+        # In two-stage mode the index scan returns the candidate pool, not the final rows
+        if limit and self._two_stage:
+            limit *= self.rerank_factor
+        
+        if limit and limit > (ef_search or self.DEFAULT_HNSW_EF_SEARCH):
+            ef_search = limit
+        
+        # SET does not accept bind parameters; int() guards the interpolation
+        if ef_search:
+            session.execute(text(f"SET LOCAL hnsw.ef_search = {int(ef_search)}"))
+        if probes:
+            session.execute(text(f"SET LOCAL ivfflat.probes = {int(probes)}"))
+        if filtered and self.iterative_scan != 'off':
+            # Validated against ITERATIVE_SCAN_MODES in __init__
+            session.execute(text(f"SET LOCAL hnsw.iterative_scan = {self.iterative_scan}"))
+    
+    def _distance(self, query_embedding: List[float]):
+        """Distance between EmbeddingChunk.embedding and the query under the configured metric"""
+        return EmbeddingChunk.embedding.op(self.DISTANCE_OPERATORS[self.metric])(query_embedding)
+    
+    def _candidate_distance(self, query_embedding: List[float]):
+        """First-stage distance over the shortened or quantized copy; must match the index expression to use it"""
+        if self.short_dimensions:
+            # Short vectors are unit length and only indexed with vector_cosine_ops
+            return cast(EmbeddingChunk.embedding_short, Vector(self.short_dimensions)).op('<=>')(
+                cast(shorten_embedding(query_embedding, self.short_dimensions), Vector(self.short_dimensions))
+            )
+        if self.quantization == 'binary':
+            return cast(
+                func.binary_quantize(EmbeddingChunk.embedding), BIT(1536)
+            ).op('<~>')(func.binary_quantize(cast(query_embedding, Vector(1536))))
+        # Only halfvec_cosine_ops (and, for inner_product, halfvec_ip_ops) graphs exist;
+        # on unit-length embeddings cosine ranks candidates like l2 does
+        operator = '<#>' if self.metric == 'inner_product' else '<=>'
+        return EmbeddingChunk.embedding_half.op(operator)(cast(query_embedding, HALFVEC(1536)))
+    
+    def _restrict_to_candidates(self, base_query, query_embedding: List[float], limit: int):
+        """
+        Two-stage search: limit base_query to the nearest limit * rerank_factor
+        chunks under the shortened or quantized distance, then let the caller
+        order by the float32 distance. Filters already on base_query apply to
+        both stages. No-op unless short vectors or quantization are enabled.
+        """
+        if not self._two_stage:
+            return base_query
+        
+        candidates = base_query.with_entities(EmbeddingChunk.id)
+        if self.short_dimensions:
+            # Matches the partial index predicate; chunks without short vectors are skipped
+            candidates = candidates.filter(
+                func.vector_dims(EmbeddingChunk.embedding_short) == self.short_dimensions
             )
-            return response.data[0].embedding
+        candidates = candidates.order_by(None).order_by(
+            self._candidate_distance(query_embedding)
+        ).limit(limit * self.rerank_factor).subquery()
+        return base_query.filter(EmbeddingChunk.id.in_(select(candidates.c.id)))
+    
+    def _score_from_distance(self, distance: Optional[float]) -> Optional[float]:
+        """
+        Convert a pgvector distance into a similarity score (higher is better).
+        
+        cosine: 1 - cosine distance, i.e. cosine similarity in [-1, 1]
+        inner_product: <#> returns the negative inner product, so negate it
+        l2: 1 / (1 + distance), in (0, 1]
+        """
+        if distance is None:
+            return None
+        if self.metric == 'cosine':
+            return 1.0 - distance
+        if self.metric == 'inner_product':
+            return -distance
+        return 1.0 / (1.0 + distance)
+    
+    def _max_distance_for_score(self, min_score: float) -> float:
+        """Inverse of _score_from_distance, used to push min_score into the WHERE clause"""
+        if self.metric == 'cosine':
+            return 1.0 - min_score
+        if self.metric == 'inner_product':
+            return -min_score
+        return (1.0 / min_score) - 1.0 if min_score > 0 else float('inf')
+    
+    def _search_mirror(self, session, query_embedding: List[float], n_results: int,
+                       employee_id: Optional[str] = None,
+                       min_score: Optional[float] = None) -> List[Any]:
+        """
+        Exact top-k from the NumPy mirror, hydrated from Postgres.
+        
+        Returns ChunkHit rows with the same attributes as the projected
+        pgvector queries; the mirror ranks by cosine similarity, which is
+        reported back as a distance under the configured metric.
+        """
+        hits = self.mirror.search(query_embedding, n_results, employee_id=employee_id)
+        if min_score is not None:
+            hits = [hit for hit in hits if hit[2] >= min_score]
+        if not hits:
+            return []
+        
+        rows = self._hit_query(session).filter(
+            EmbeddingChunk.id.in_([chunk_id for chunk_id, _, _ in hits])
+        ).all()
+        by_id = {str(row.id): row for row in rows}
+        
+        # Chunks deleted since the last mirror sync are simply skipped
+        return [
+            ChunkHit(*by_id[chunk_id], distance=self._max_distance_for_score(score))
+            for chunk_id, _, score in hits if chunk_id in by_id
+        ]
+    
+    def _get_embedder(self) -> Optional[Embedder]:
+        """
+        Embedder for the current embedding model, so queries are embedded by
+        the same provider as the active run's chunks.
+        
+        Returns None (and searches fall back to zero vectors) when it cannot be
+        built, e.g. an OpenAI model without OPENAI_API_KEY.
+        """
+        model = self.embedding_model
+        if model not in self._embedders:
+            try:
+                self._embedders[model] = get_embedder(model)
+                print(f"✅ Query embedder initialized for {model}")
+            except Exception as e:
+                logger.warning(f"❌ Embedder for {model} not available: {e}")
+                self._embedders[model] = None
+        return self._embedders[model]
+    
+    def _generate_embedding(self, text: str) -> List[float]:
+        """Generate a query embedding, served from the query embedding cache when possible"""
+        cached = self.embedding_cache.get(self.embedding_model, text)
+        if cached is not None:
+            return cached
+        
+        embedder = self._get_embedder()
+        if not embedder:
+            logger.warning("Embedder not available - returning zero vector")
+            return [0.0] * EMBEDDING_DIMENSIONS
+        
+        try:
+            embedding = embedder.embed(text)
+            # Only real embeddings are cached; the zero-vector fallbacks below are not
+            self.embedding_cache.set(self.embedding_model, text, embedding)
+            return embedding
         except Exception as e:
             logger.error(f"Failed to generate embedding: {e}")
-            return [0.0] * 1536
+            return [0.0] * EMBEDDING_DIMENSIONS
+    
+    def _generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed several texts with a single embedder call.
+        
+        Cached texts are served from the query embedding cache and duplicates
+        are only sent once; the response is mapped back to input order.
+        """
+        embeddings: List[Optional[List[float]]] = [
+            self.embedding_cache.get(self.embedding_model, t) for t in texts
+        ]
+        
+        # Unique uncached texts, keyed by cache key so normalised duplicates share a slot
+        pending: Dict[str, str] = {}
+        for t, embedding in zip(texts, embeddings):
+            if embedding is None:
+                pending.setdefault(QueryEmbeddingCache.make_key(self.embedding_model, t), t)
+        
+        embedder = self._get_embedder() if pending else None
+        if pending and embedder:
+            try:
+                vectors = embedder.embed(list(pending.values()))
+                fetched = {}
+                for key, t, embedding in zip(pending.keys(), pending.values(), vectors):
+                    fetched[key] = embedding
+                    self.embedding_cache.set(self.embedding_model, t, embedding)
+                embeddings = [
+                    embedding if embedding is not None
+                    else fetched.get(QueryEmbeddingCache.make_key(self.embedding_model, t))
+                    for t, embedding in zip(texts, embeddings)
+                ]
+            except Exception as e:
+                logger.error(f"Failed to generate batch embeddings: {e}")
+        elif pending:
+            logger.warning("Embedder not available - returning zero vectors")
+        
+        return [embedding if embedding is not None else [0.0] * EMBEDDING_DIMENSIONS for embedding in embeddings]
+    
+    def _embed_content(self, texts: List[str]) -> List[List[float]]:
+        """
+        Embed document content to store, in one call.
+        
+        Goes through the content-addressed embedding_cache table rather than
+        the query embedding cache, so stored text never crowds out queries
+        and text embedded before is not paid for again.
+        """
+        if not texts:
+            return []
+        embedder = self._get_embedder()
+        if not embedder:
+            logger.warning("Embedder not available - returning zero vectors")
+            return [[0.0] * EMBEDDING_DIMENSIONS for _ in texts]
+        try:
+            return with_embedding_cache(embedder).embed(list(texts))
+        except Exception as e:
+            logger.error(f"Failed to generate content embeddings: {e}")
+            return [[0.0] * EMBEDDING_DIMENSIONS for _ in texts]
+    
+    def get_embedding_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the query embedding cache"""
+        return self.embedding_cache.stats()
+    
+    def get_result_cache_stats(self) -> Dict[str, Any]:
+        """Hit/miss counters of the search result cache"""
+        return self.result_cache.stats()
+    
+    def _data_generation(self) -> Optional[int]:
+        """Current search data generation, None when it cannot be read.
+        
+        Read from Postgres at most every GENERATION_CHECK_SECONDS, so cache hits
+        do not each cost a round trip; results may outlive a write by that long.
+        """
+        now = time.time()
+        generation, checked = self._generation_checked
+        if generation is not None and now - checked < self.GENERATION_CHECK_SECONDS:
+            return generation
+        with SessionLocal() as session:
+            generation = get_data_generation(session)
+        self._generation_checked = (generation, now)
+        return generation
     
     # =============================================================================
     # LEADERSHIP DOCUMENTS METHODS (single profile collection)
@@ -122,8 +684,9 @@ class VectorStore:
                 session.query(EmbeddingDocument).delete()
                 
                 # Store new documents
+                embeddings = self._embed_content(documents)
                 for i, document in enumerate(documents):
-                    embedding = self._generate_embedding(document)
+                    embedding = embeddings[i]
                     metadata = metadata_list[i] if metadata_list and i < len(metadata_list) else {}
                     
                     doc = EmbeddingDocument(
@@ -136,6 +699,7 @@ class VectorStore:
                     session.add(doc)
                 
                 session.commit()
+                bump_data_generation(session)
                 logger.info(f"Stored {len(documents)} leadership documents")
                 
         except Exception as e:
@@ -148,6 +712,7 @@ class VectorStore:
             with SessionLocal() as session:
                 session.query(EmbeddingDocument).delete()
                 session.commit()
+                bump_data_generation(session)
                 logger.info("Cleared all leadership documents")
         except Exception as e:
             logger.error(f"Failed to clear documents: {e}")
@@ -155,138 +720,9 @@ class VectorStore:
     
     # =============================================================================
     # EMPLOYEE PROFILE METHODS
+    # Chunks are written per embedding run by EmbeddingPipeline (backend/ingestion/run_embedding.py)
     # =============================================================================
     
-    def store_employee_profile(self, employee_id: str, profile_sections: List[Dict[str, Any]], 
-                              metadata: Dict[str, Any] = None):
-        """
-        Store an employee's profile sections as separate chunks with metadata.
-        
-        Args:
-            employee_id: Unique identifier for the employee
-            profile_sections: List of profile section dictionaries
-            metadata: Additional metadata about the employee
-        """
-        try:
-            with SessionLocal() as session:
-                # Delete existing entries for this employee
-                session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                    EmbeddingDocument.employee_id == employee_id
-                ).delete(synchronize_session=False)
-                
-                # Store each section as a separate chunk
-                for i, section in enumerate(profile_sections):
-                    # Convert section to JSON string if it's not already
-                    if isinstance(section, dict):
-                        section_text = json.dumps(section)
-                    else:
-                        section_text = section
-                    
-                    # Generate embedding
-                    embedding = self._generate_embedding(section_text)
-                    
-                    # Create metadata for this section
-                    section_metadata = {
-                        "employee_id": employee_id,
-                        "section_id": i
-                    }
-                    
-                    # Add employee metadata if provided
-                    if metadata:
-                        for key, value in metadata.items():
-                            # Handle list values by concatenating them
-                            if isinstance(value, list):
-                                section_metadata[key] = ", ".join(str(item) for item in value)
-                            else:
-                                section_metadata[key] = str(value)
-                    
-                    # Create embedding document first
-                    doc = EmbeddingDocument(
-                        employee_id=employee_id,
-                        embedding_run_id=employee_id,  # Use employee_id as run_id for profiles
-                        document_type="profile",
-                        source_filename=f"profile_{employee_id}_{i}",
-                        external_document_id=employee_id,
-                        source_type="profile"
-                    )
-                    session.add(doc)
-                    session.flush()
-                    
-                    # Create chunk
-                    chunk = EmbeddingChunk(
-                        external_document_id=doc.external_document_id,
-                        chunk_index=i,
-                        content=section_text,
-                        embedding=embedding,
-                        token_count=len(section_text.split()),
-                        char_count=len(section_text),
-                        chunk_label=f"profile_section_{i}"
-                    )
-                    session.add(chunk)
-                
-                session.commit()
-                logger.info(f"Stored profile for employee {employee_id} with {len(profile_sections)} sections")
-                
-        except Exception as e:
-            logger.error(f"Failed to store employee profile {employee_id}: {e}")
-            raise
-    
-    def store_employee_documents(self, employee_id: str, documents: List[str], 
-                                metadata: Dict[str, Any] = None):
-        """
-        Store an employee's raw document chunks for detailed citations.
-        
-        Args:
-            employee_id: Unique identifier for the employee
-            documents: List of raw document chunks
-            metadata: Additional metadata about the employee
-        """
-        try:
-            with SessionLocal() as session:
-                # Delete existing document entries for this employee
-                session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                    EmbeddingDocument.employee_id == employee_id
-                ).delete(synchronize_session=False)
-                
-                if not documents:
-                    session.commit()
-                    return
-                
-                # Store each document chunk
-                for i, doc_content in enumerate(documents):
-                    embedding = self._generate_embedding(doc_content)
-                    
-                    # Create embedding document
-                    doc = EmbeddingDocument(
-                        employee_id=employee_id,
-                        embedding_run_id=employee_id,  # Use employee_id as run_id for documents
-                        document_type="document",
-                        source_filename=f"document_{employee_id}_{i}",
-                        external_document_id=employee_id,
-                        source_type="document"
-                    )
-                    session.add(doc)
-                    session.flush()
-                    
-                    # Create chunk
-                    chunk = EmbeddingChunk(
-                        external_document_id=doc.external_document_id,
-                        chunk_index=i,
-                        content=doc_content,
-                        embedding=embedding,
-                        token_count=len(doc_content.split()),
-                        char_count=len(doc_content),
-                        chunk_label=f"document_chunk_{i}"
-                    )
-                    session.add(chunk)
-                
-                session.commit()
-                logger.info(f"Stored {len(documents)} document chunks for employee {employee_id}")
-                
-        except Exception as e:
-            logger.error(f"Failed to store employee documents {employee_id}: {e}")
-            raise
-    
     def delete_employee_profile(self, employee_id: str):
         """Delete all vector entries for an employee."""
         try:
@@ -302,113 +738,81 @@ class VectorStore:
                 ).delete()
                 
                 session.commit()
+                bump_data_generation(session)
                 logger.info(f"Deleted all vector data for employee {employee_id}")
                 
         except Exception as e:
             logger.error(f"Failed to delete employee profile {employee_id}: {e}")
             raise
     
-    def batch_store_employee_profiles(self, employee_data_list: List[Dict[str, Any]]):
+    # =============================================================================
+    # SEARCH METHODS
+    # =============================================================================
+    
+    def iter_chunks(self, employee_id: Optional[str] = None,
+                    document_type: Optional[str] = None,
+                    include_vectors: bool = False,
+                    batch_size: int = 500,
+                    limit: Optional[int] = None) -> Iterator[Dict[str, Any]]:
         """
-        Store multiple employee profiles in batch for better performance.
+        Stream the active run's chunks in bounded memory.
         
-        Args:
-            employee_data_list: List of dictionaries containing employee data
-                Each dict should have: id, profile, metadata
+        Rows come through a server-side cursor (yield_per), so exports and
+        "all chunks" listings hold at most batch_size rows at a time. The
+        embedding column is only selected when include_vectors is set.
+        
+        Yields:
+            Dicts with chunk_id, content, chunk_index, token_count and metadata
+            (plus 'embedding' when include_vectors is set)
         """
-        if not employee_data_list:
-            return
+        columns = [
+            EmbeddingChunk.id,
+            EmbeddingChunk.content,
+            EmbeddingChunk.chunk_index,
+            EmbeddingChunk.token_count,
+            EmbeddingChunk.employee_id,
+            EmbeddingChunk.document_type,
+            EmbeddingDocument.source_filename
+        ]
+        if include_vectors:
+            columns.append(EmbeddingChunk.embedding)
         
         try:
             with SessionLocal() as session:
-                # Get all employee IDs to delete existing data
-                employee_ids = [data.get('id') for data in employee_data_list if data.get('id')]
-                
-                # Delete existing entries for all employees
-                session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                    EmbeddingDocument.employee_id.in_(employee_ids)
-                ).delete(synchronize_session=False)
-                
-                session.query(EmbeddingDocument).filter(
-                    EmbeddingDocument.employee_id.in_(employee_ids)
-                ).delete(synchronize_session=False)
-                
-                # Process all employees
-                docs_to_add = []
-                chunks_to_add = []
-                
-                for employee_data in employee_data_list:
-                    employee_id = employee_data.get('id')
-                    if not employee_id:
-                        continue
-                    
-                    try:
-                        # Parse profile data
-                        profile_data = json.loads(employee_data.get('profile', '[]'))
-                        metadata = employee_data.get('metadata', {})
-                        
-                        # Process each profile section
-                        for section_idx, section in enumerate(profile_data):
-                            # Convert section to JSON string if it's not already
-                            if isinstance(section, dict):
-                                section_text = json.dumps(section)
-                            else:
-                                section_text = section
-                            
-                            # Generate embedding
-                            embedding = self._generate_embedding(section_text)
-                            
-                            # Create embedding document
-                            doc = EmbeddingDocument(
-                                employee_id=employee_id,
-                                embedding_run_id=employee_id,
-                                document_type="profile",
-                                source_filename=f"profile_{employee_id}_{section_idx}",
-                                external_document_id=employee_id,
-                                source_type="profile"
-                            )
-                            docs_to_add.append(doc)
-                            
-                            # Create chunk
-                            chunk = EmbeddingChunk(
-                                external_document_id=employee_id,  # Will be updated after doc is created
-                                chunk_index=section_idx,
-                                content=section_text,
-                                embedding=embedding,
-                                token_count=len(section_text.split()),
-                                char_count=len(section_text),
-                                chunk_label=f"profile_section_{section_idx}"
-                            )
-                            chunks_to_add.append(chunk)
-                            
-                    except Exception as e:
-                        logger.error(f"Error processing employee {employee_id}: {e}")
-                        continue
-                
-                # Batch insert all documents first
-                session.add_all(docs_to_add)
-                session.flush()
-                
-                # Update external_document_id references in chunks
-                for chunk in chunks_to_add:
-                    chunk.external_document_id = chunk.external_document_id
-                
-                # Batch insert all chunks
-                session.add_all(chunks_to_add)
-                session.commit()
-                
-                logger.info(f"Batch stored {len(chunks_to_add)} profile sections for {len(employee_ids)} employees")
+                chunks_query = session.query(*columns).join(
+                    EmbeddingDocument,
+                    self._document_join()
+                ).filter(
+                    self._run_condition(),
+                    *self._filter_conditions({'employee_id': employee_id, 'document_type': document_type})
+                ).order_by(EmbeddingChunk.external_document_id, EmbeddingChunk.chunk_index)
+                if limit is not None:
+                    chunks_query = chunks_query.limit(limit)
                 
+                for row in chunks_query.yield_per(batch_size):
+                    chunk = {
+                        'chunk_id': str(row.id),
+                        'content': row.content,
+                        'chunk_index': row.chunk_index,
+                        'token_count': row.token_count,
+                        'metadata': {
+                            'employee_id': str(row.employee_id),
+                            'document_type': row.document_type,
+                            'source_filename': row.source_filename
+                        }
+                    }
+                    if include_vectors:
+                        chunk['embedding'] = row.embedding
+                    yield chunk
+        
         except Exception as e:
-            logger.error(f"Failed to batch store employee profiles: {e}")
+            logger.error(f"Error streaming chunks: {e}")
             raise
     
-    # =============================================================================
-    # SEARCH METHODS
-    # =============================================================================
-    
+    @cached_search()
     def get_relevant_chunks(self, query: str = None, n_results: int = 5, 
-                          employee_id: str = None) -> List[str]:
+                          employee_id: str = None, ef_search: Optional[int] = None,
+                          probes: Optional[int] = None) -> List[str]:
         """
         Retrieve relevant document chunks based on a query.
         
@@ -416,133 +820,167 @@ class VectorStore:
             query: The search query
             n_results: Maximum number of results to return
             employee_id: Optional employee ID to filter results
+            ef_search: Optional hnsw.ef_search override for this query
+            probes: Optional ivfflat.probes override for this query
             
         Returns:
             List of relevant document chunks
         """
         try:
             with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=n_results)
+                
+                query_embedding = self._generate_embedding(query) if query else None
+                
+                if query and self.mirror and self.mirror.is_ready():
+                    rows = self._search_mirror(session, query_embedding, n_results, employee_id=employee_id)
+                    return [row.content for row in rows]
+                
+                if not query:
+                    # No query: stream content only instead of loading whole ORM rows
+                    return [
+                        chunk['content'] for chunk in self.iter_chunks(
+                            employee_id=employee_id, limit=None if employee_id else n_results
+                        )
+                    ]
+                
+                # Only the content column is fetched; ordering by distance happens in Postgres
+                results_query = session.query(EmbeddingChunk.content).join(
+                    EmbeddingDocument,
+                    self._document_join()
+                ).filter(self._run_condition())
                 if employee_id:
-                    # Search in employee-specific data
-                    
-                    # First try raw documents for detailed citations
-                    if query:
-                        query_embedding = self._generate_embedding(query)
-                        
-                        docs_query = session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                            EmbeddingDocument.employee_id == employee_id
-                        ).order_by(
-                            EmbeddingChunk.embedding.op('<->')(query_embedding)
-                        ).limit(n_results)
-                        
-                        docs_results = docs_query.all()
-                        if docs_results:
-                            return [doc.content for doc in docs_results]
-                    
-                    # Fall back to profile sections
-                    if query:
-                        query_embedding = self._generate_embedding(query)
-                        
-                        profile_query = session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                            EmbeddingDocument.employee_id == employee_id
-                        ).order_by(
-                            EmbeddingChunk.embedding.op('<->')(query_embedding)
-                        ).limit(n_results)
-                        
-                        profile_results = profile_query.all()
-                        return [profile.content for profile in profile_results]
-                    else:
-                        # No query - return all for this employee
-                        all_docs = session.query(EmbeddingChunk).join(EmbeddingDocument).filter(
-                            EmbeddingDocument.employee_id == employee_id
-                        ).all()
-                        
-                        if all_docs:
-                            return [doc.content for doc in all_docs]
-                        
-                        return []
+                    results_query = results_query.filter(EmbeddingDocument.employee_id == employee_id)
+                results_query = results_query.order_by(self._distance(query_embedding))
+                results = self._restrict_to_candidates(
+                    results_query, query_embedding, n_results
+                ).limit(n_results).all()
                 
-                else:
-                    # Search across all employees
-                    if query:
-                        query_embedding = self._generate_embedding(query)
-                        
-                        results = session.query(EmbeddingChunk).join(EmbeddingDocument).order_by(
-                            EmbeddingChunk.embedding.op('<->')(query_embedding)
-                        ).limit(n_results).all()
-                        
-                        return [doc.content for doc in results]
-                    else:
-                        # Return all chunks
-                        all_docs = session.query(EmbeddingChunk).join(EmbeddingDocument).limit(n_results).all()
-                        return [doc.content for doc in all_docs]
+                return [row.content for row in results]
                 
         except Exception as e:
             logger.error(f"Error retrieving chunks: {e}")
             return []
     
+    def _filter_conditions(self, filters: Optional[Dict[str, Any]]) -> List[Any]:
+        """
+        Translate search filters into SQLAlchemy conditions on EmbeddingChunk.
+        
+        STRUCTURED_FILTERS keys compile to indexed equality / IN predicates on
+        the denormalised columns (a list value means any of). Other keys keep
+        the legacy behaviour of matching chunk_label.
+        """
+        filter_conditions = []
+        for key, value in (filters or {}).items():
+            if value is None:
+                continue
+            if key in self.STRUCTURED_FILTERS:
+                column = getattr(EmbeddingChunk, key)
+                if isinstance(value, (list, tuple, set)):
+                    values = [str(v) for v in value]
+                    filter_conditions.append(column == values[0] if len(values) == 1 else column.in_(values))
+                else:
+                    filter_conditions.append(column == str(value))
+            elif isinstance(value, dict) and '$regex' in value:
+                pattern = value['$regex'].replace('.*', '')
+                filter_conditions.append(
+                    func.lower(EmbeddingChunk.chunk_label).like(f'%{pattern.lower()}%')
+                )
+            else:
+                filter_conditions.append(
+                    EmbeddingChunk.chunk_label == str(value)
+                )
+        return filter_conditions
+    
+    @cached_search()
     def search_employees(self, query: str, filters: Dict[str, Any] = None, 
-                         n_results: int = 10) -> List[Dict[str, Any]]:
-        """Search for employees based on a natural language query and optional filters."""
+                         n_results: int = 10, ef_search: Optional[int] = None,
+                         probes: Optional[int] = None,
+                         min_score: Optional[float] = None,
+                         mode: str = 'chunks',
+                         chunks_per_employee: int = 3,
+                         shortlist_size: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Search for employees based on a natural language query and optional filters.
+        
+        Employees are ranked by the similarity of their best matching chunk;
+        min_score drops chunks below that similarity in the database.
+        
+        Args:
+            mode: 'chunks' takes the nearest n_results * 2 chunks and groups them
+                  in Python (cheap, index-assisted, may return fewer employees);
+                  'aggregate' ranks per employee in Postgres and always returns
+                  up to n_results distinct employees (see _search_employees_aggregated);
+                  'two_stage' shortlists employees by centroid embedding first and
+                  runs 'aggregate' over the shortlist only (see _search_employees_two_stage)
+            chunks_per_employee: Best chunks kept per employee in 'aggregate' and 'two_stage' mode
+            shortlist_size: Employees shortlisted in 'two_stage' mode
+        """
+        if mode == 'aggregate':
+            return self._search_employees_aggregated(
+                query, filters, n_results, chunks_per_employee, min_score=min_score
+            )
+        if mode == 'two_stage':
+            return self._search_employees_two_stage(
+                query, filters, n_results, chunks_per_employee, shortlist_size=shortlist_size,
+                ef_search=ef_search, min_score=min_score
+            )
+        
         try:
             with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=n_results * 2,
+                                          filtered=bool(filters))
                 query_embedding = self._generate_embedding(query)
                 
                 # VALIDATION: Log the query being executed
                 logger.info(f"Executing search_employees query: '{query}' with {n_results} max results")
                 
-                # Build base query with proper joins
-                base_query = session.query(EmbeddingChunk, EmbeddingDocument).join(
-                    EmbeddingDocument, 
-                    EmbeddingChunk.external_document_id == EmbeddingDocument.external_document_id
-                ).order_by(
-                    EmbeddingChunk.embedding.op('<->')(query_embedding)
-                )
+                distance = self._distance(query_embedding).label('distance')
+                
+                # Build base query with proper joins; only text and metadata columns are fetched
+                base_query = self._hit_query(session, distance).order_by(distance)
+                
+                if min_score is not None:
+                    base_query = base_query.filter(
+                        self._distance(query_embedding) <= self._max_distance_for_score(min_score)
+                    )
                 
                 # Apply filters if provided
-                if filters:
-                    filter_conditions = []
-                    for key, value in filters.items():
-                        if isinstance(value, dict) and '$regex' in value:
-                            pattern = value['$regex'].replace('.*', '')
-                            filter_conditions.append(
-                                func.lower(func.cast(EmbeddingChunk.chunk_label, text())).like(f'%{pattern.lower()}%')
-                            )
-                        else:
-                            filter_conditions.append(
-                                EmbeddingChunk.chunk_label == str(value)
-                            )
-                    
-                    if filter_conditions:
-                        base_query = base_query.filter(and_(*filter_conditions))
+                filter_conditions = self._filter_conditions(filters)
+                if filter_conditions:
+                    base_query = base_query.filter(and_(*filter_conditions))
                 
                 # Execute query
+                base_query = self._restrict_to_candidates(base_query, query_embedding, n_results * 2)
                 results = base_query.limit(n_results * 2).all()
                 
                 # VALIDATION: Log how many chunks were returned
                 logger.info(f"search_employees: Retrieved {len(results)} chunks from database")
                 
-                # Group results by employee
+                # Group results by employee; rows arrive nearest first, so the
+                # first chunk seen for an employee is their best match
                 employee_results = {}
-                for chunk, doc in results:
-                    employee_id = doc.employee_id
+                for row in results:
+                    employee_id = row.employee_id
                     if employee_id not in employee_results:
                         employee_results[employee_id] = {
                             'employee_id': str(employee_id),
+                            'score': self._score_from_distance(row.distance),
+                            'distance': row.distance,
                             'match_count': 0,
                             'matches': [],
                             'doc_metadata': {
-                                'document_type': doc.document_type,
-                                'source_filename': doc.source_filename
+                                'document_type': row.document_type,
+                                'source_filename': row.source_filename
                             }
                         }
                     
-                    employee_results[employee_id]['matches'].append(chunk.content)
+                    employee_results[employee_id]['matches'].append(row.content)
                     employee_results[employee_id]['match_count'] += 1
                 
-                # Convert to list and sort by match count
+                # Convert to list and sort by best-match similarity
                 result_list = list(employee_results.values())
-                result_list.sort(key=lambda x: x['match_count'], reverse=True)
+                result_list.sort(key=lambda x: x['score'], reverse=True)
                 
                 # VALIDATION: Log final results
                 logger.info(f"search_employees: Found {len(result_list)} employees with {sum(len(r['matches']) for r in result_list)} total chunks")
@@ -553,6 +991,508 @@ class VectorStore:
             logger.error(f"Error in search_employees: {e}")
             return []
     
+    def _search_employees_aggregated(self, query: str, filters: Optional[Dict[str, Any]],
+                                     n_results: int, chunks_per_employee: int,
+                                     min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Rank employees in one SQL statement.
+        
+        Chunks are ranked per employee with row_number() OVER (PARTITION BY
+        employee_id ORDER BY distance), the best chunks_per_employee are kept
+        and grouped, and the employees with the nearest best chunk are returned.
+        This is an exact scan over the filtered chunks, so it returns exactly
+        n_results employees whenever that many have matching chunks.
+        
+        Returns:
+            Same shape as search_employees, plus 'aggregate_score' (mean
+            similarity of the kept chunks) and 'match_scores'
+        """
+        try:
+            with SessionLocal() as session:
+                query_embedding = self._generate_embedding(query)
+                logger.info(f"Executing aggregated search_employees query: '{query}' "
+                            f"with {n_results} employees x {chunks_per_employee} chunks")
+                
+                distance = self._distance(query_embedding)
+                ranked_query = select(
+                    EmbeddingChunk.employee_id,
+                    EmbeddingChunk.content,
+                    EmbeddingDocument.document_type,
+                    EmbeddingDocument.source_filename,
+                    distance.label('distance'),
+                    func.row_number().over(
+                        partition_by=EmbeddingChunk.employee_id,
+                        order_by=distance
+                    ).label('chunk_rank')
+                ).join(
+                    EmbeddingDocument,
+                    self._document_join()
+                )
+                
+                filter_conditions = [self._run_condition()] + self._filter_conditions(filters)
+                if min_score is not None:
+                    filter_conditions.append(distance <= self._max_distance_for_score(min_score))
+                if filter_conditions:
+                    ranked_query = ranked_query.where(and_(*filter_conditions))
+                
+                ranked = ranked_query.subquery('ranked')
+                best_distance = func.min(ranked.c.distance).label('best_distance')
+                employee_query = select(
+                    ranked.c.employee_id,
+                    best_distance,
+                    func.array_agg(aggregate_order_by(ranked.c.distance, ranked.c.chunk_rank)).label('distances'),
+                    func.array_agg(aggregate_order_by(ranked.c.content, ranked.c.chunk_rank)).label('matches'),
+                    func.array_agg(aggregate_order_by(ranked.c.document_type, ranked.c.chunk_rank)).label('document_types'),
+                    func.array_agg(aggregate_order_by(ranked.c.source_filename, ranked.c.chunk_rank)).label('source_filenames')
+                ).where(
+                    ranked.c.chunk_rank <= chunks_per_employee
+                ).group_by(
+                    ranked.c.employee_id
+                ).order_by(best_distance).limit(n_results)
+                
+                rows = session.execute(employee_query).all()
+                
+                result_list = []
+                for row in rows:
+                    match_scores = [self._score_from_distance(d) for d in row.distances]
+                    result_list.append({
+                        'employee_id': str(row.employee_id),
+                        'score': self._score_from_distance(row.best_distance),
+                        'distance': row.best_distance,
+                        'aggregate_score': sum(match_scores) / len(match_scores),
+                        'match_count': len(row.matches),
+                        'matches': list(row.matches),
+                        'match_scores': match_scores,
+                        'doc_metadata': {
+                            'document_type': row.document_types[0],
+                            'source_filename': row.source_filenames[0]
+                        }
+                    })
+                
+                logger.info(f"search_employees (aggregate): Found {len(result_list)} employees")
+                return result_list
+                
+        except Exception as e:
+            logger.error(f"Error in aggregated search_employees: {e}")
+            return []
+    
+    def _shortlist_employees(self, session, query_embedding: List[float], limit: int,
+                             document_type: str = ALL_DOCUMENT_TYPES) -> List[Any]:
+        """Nearest employee centroids of the active run: (employee_id, distance) rows, nearest first"""
+        centroid_distance = EmployeeCentroid.embedding.cosine_distance(query_embedding).label('distance')
+        return session.query(EmployeeCentroid.employee_id, centroid_distance).filter(
+            EmployeeCentroid.embedding_run_id == self.active_run_id,
+            EmployeeCentroid.document_type == document_type
+        ).order_by(centroid_distance).limit(limit).all()
+    
+    def _search_employees_two_stage(self, query: str, filters: Optional[Dict[str, Any]],
+                                    n_results: int, chunks_per_employee: int,
+                                    shortlist_size: Optional[int] = None,
+                                    ef_search: Optional[int] = None,
+                                    min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Shortlist employees by centroid, then rank their chunks.
+        
+        Stage one is an HNSW search over employee_centroids (one row per
+        employee and document type); stage two is the aggregated chunk search
+        restricted to the shortlisted employees, which the employee_id index
+        serves without touching anyone else's chunks. Falls back to the
+        aggregated search when the active run has no centroids.
+        
+        Returns:
+            Same shape as _search_employees_aggregated, plus 'centroid_score'
+        """
+        shortlist_size = shortlist_size or max(n_results * self.CENTROID_SHORTLIST_FACTOR,
+                                               self.MIN_CENTROID_SHORTLIST)
+        # Scalar document_type filters have their own centroids
+        document_type = (filters or {}).get('document_type')
+        if not isinstance(document_type, str):
+            document_type = ALL_DOCUMENT_TYPES
+        
+        shortlist = []
+        if self.active_run_id:
+            try:
+                with SessionLocal() as session:
+                    self._apply_search_params(session, ef_search, limit=shortlist_size, filtered=True)
+                    shortlist = self._shortlist_employees(
+                        session, self._generate_embedding(query), shortlist_size, document_type
+                    )
+            except Exception as e:
+                logger.error(f"Error shortlisting employees by centroid: {e}")
+        
+        if not shortlist:
+            logger.info("search_employees (two_stage): no centroids for the active run, using aggregate mode")
+            return self._search_employees_aggregated(
+                query, filters, n_results, chunks_per_employee, min_score=min_score
+            )
+        
+        centroid_distances = {str(row.employee_id): row.distance for row in shortlist}
+        requested = (filters or {}).get('employee_id')
+        if requested is not None:
+            requested = {str(e) for e in requested} if isinstance(requested, (list, tuple, set)) else {str(requested)}
+            candidate_ids = [e for e in centroid_distances if e in requested]
+            if not candidate_ids:
+                return []
+        else:
+            candidate_ids = list(centroid_distances)
+        
+        results = self._search_employees_aggregated(
+            query, {**(filters or {}), 'employee_id': candidate_ids}, n_results, chunks_per_employee,
+            min_score=min_score
+        )
+        for result in results:
+            result['centroid_score'] = 1.0 - centroid_distances[result['employee_id']]
+        
+        logger.info(f"search_employees (two_stage): {len(candidate_ids)} shortlisted, {len(results)} returned")
+        return results
+    
+    @cached_search()
+    def search_many(self, queries: List[str],
+                    filters: Union[Dict[str, Any], List[Optional[Dict[str, Any]]], None] = None,
+                    k: int = 5, ef_search: Optional[int] = None, probes: Optional[int] = None,
+                    min_score: Optional[float] = None,
+                    include_vectors: bool = False,
+                    query_embeddings: Optional[List[List[float]]] = None) -> List[List[Dict[str, Any]]]:
+        """
+        Run several semantic searches with one embeddings request and one SQL statement.
+        
+        All query vectors are passed as a VALUES list and each top-k lookup is a
+        LATERAL subquery, so every query can still use the vector index.
+        
+        Args:
+            queries: Search queries
+            filters: One filter dict for all queries, or one per query (None = no filter).
+                     Supported keys: employee_id, employee_name, document_type
+            k: Number of results per query
+            ef_search: Optional hnsw.ef_search override
+            probes: Optional ivfflat.probes override
+            min_score: Optional similarity floor
+            include_vectors: Also return each chunk's 'embedding' and 'token_count'
+                             (for diversification, see diversification.py)
+            query_embeddings: Embeddings of queries if already computed (the result
+                              cache passes the ones it keyed on)
+            
+        Returns:
+            One result list per query, in input order, each shaped like search_all_content
+        """
+        if not queries:
+            return []
+        
+        if filters is None or isinstance(filters, dict):
+            per_query_filters = [filters or {}] * len(queries)
+        else:
+            if len(filters) != len(queries):
+                raise ValueError("filters must be a dict or have one entry per query")
+            per_query_filters = [f or {} for f in filters]
+        
+        try:
+            query_embeddings = query_embeddings or self._generate_embeddings(queries)
+            operator = self.DISTANCE_OPERATORS[self.metric]
+            
+            values_rows = []
+            bind_params = []
+            params: Dict[str, Any] = {'k': k}
+            for i, (embedding, query_filter) in enumerate(zip(query_embeddings, per_query_filters)):
+                values_rows.append(
+                    f"({i}, CAST(:vec_{i} AS vector), CAST(:employee_id_{i} AS uuid), "
+                    f"CAST(:employee_name_{i} AS text), CAST(:document_type_{i} AS text))"
+                )
+                bind_params.append(bindparam(f'vec_{i}', type_=Vector(len(embedding))))
+                params[f'vec_{i}'] = embedding
+                params[f'employee_id_{i}'] = str(query_filter['employee_id']) if query_filter.get('employee_id') else None
+                params[f'employee_name_{i}'] = query_filter.get('employee_name')
+                params[f'document_type_{i}'] = query_filter.get('document_type')
+            
+            distance_filter = ""
+            if min_score is not None:
+                distance_filter = f"AND c.embedding {operator} q.embedding <= :max_distance"
+                params['max_distance'] = self._max_distance_for_score(min_score)
+            
+            run_filter = ""
+            if self.active_run_id:
+                # Literal run id (not a VALUES column) so the planner prunes to one partition
+                run_filter = "AND c.embedding_run_id = CAST(:run_id AS uuid)"
+                params['run_id'] = str(self.active_run_id)
+            
+            vector_columns = ", c.embedding AS chunk_embedding, c.token_count" if include_vectors else ""
+            
+            sql = text(f"""
+                SELECT q.query_index, r.*
+                FROM (VALUES {', '.join(values_rows)})
+                     AS q(query_index, embedding, employee_id, employee_name, document_type)
+                CROSS JOIN LATERAL (
+                    SELECT c.content,
+                           c.embedding {operator} q.embedding AS distance,
+                           d.employee_id, d.document_type, d.source_filename
+                           {vector_columns}
+                    FROM embedding_chunks c
+                    JOIN embedding_documents d
+                      ON d.external_document_id = c.external_document_id
+                     AND d.embedding_run_id = c.embedding_run_id
+                    WHERE (q.employee_id IS NULL OR c.employee_id = q.employee_id)
+                      AND (q.employee_name IS NULL OR c.employee_id IN (
+                            SELECT e.id FROM employees e
+                            WHERE lower(e.full_name) = lower(q.employee_name)))
+                      AND (q.document_type IS NULL OR c.document_type = q.document_type)
+                      {run_filter}
+                      {distance_filter}
+                    ORDER BY c.embedding {operator} q.embedding
+                    LIMIT :k
+                ) r
+                ORDER BY q.query_index, r.distance
+            """).bindparams(*bind_params)
+            if include_vectors:
+                sql = sql.columns(chunk_embedding=Vector())
+            
+            results: List[List[Dict[str, Any]]] = [[] for _ in queries]
+            with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=k,
+                                          filtered=any(per_query_filters))
+                for row in session.execute(sql, params):
+                    result = {
+                        'content': row.content,
+                        'score': self._score_from_distance(row.distance),
+                        'distance': row.distance,
+                        'metadata': {
+                            'employee_id': str(row.employee_id),
+                            'document_type': row.document_type,
+                            'source_filename': row.source_filename
+                        }
+                    }
+                    if include_vectors:
+                        result['embedding'] = row.chunk_embedding
+                        result['token_count'] = row.token_count
+                    results[row.query_index].append(result)
+            
+            logger.info(f"search_many: {len(queries)} queries, {sum(len(r) for r in results)} results")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in search_many: {e}")
+            return [[] for _ in queries]
+    
+    def search_diverse(self, query: str, n_results: int = 10, fetch_k: int = 40,
+                       filters: Optional[Dict[str, Any]] = None,
+                       lambda_mult: float = DEFAULT_LAMBDA,
+                       token_budget: Optional[int] = None,
+                       max_per_employee: Optional[int] = None,
+                       ef_search: Optional[int] = None,
+                       probes: Optional[int] = None,
+                       min_score: Optional[float] = None,
+                       extra_queries: Optional[List[str]] = None,
+                       count_tokens: Optional[Callable[[str], int]] = None) -> List[Dict[str, Any]]:
+        """
+        Semantic search followed by MMR diversification.
+        
+        Fetches fetch_k candidates together with their vectors and keeps the
+        n_results that best trade relevance against redundancy, optionally
+        capped per employee and by total tokens.
+        
+        Args:
+            extra_queries: More retrieval angles (e.g. key entities) whose candidates
+                           join the pool; all queries share one search_many call
+            count_tokens: Token counter for the budget; stored token counts otherwise
+        
+        Returns:
+            Results shaped like search_all_content, plus 'token_count'
+        """
+        queries = [query] + [q for q in (extra_queries or []) if q and q != query]
+        query_embeddings = self._generate_embeddings(queries)
+        batches = self.search_many(queries, filters=filters, k=max(fetch_k, n_results),
+                                   ef_search=ef_search, probes=probes, min_score=min_score,
+                                   include_vectors=True, query_embeddings=query_embeddings)
+        
+        # Each chunk once, with its best score over all angles, best first
+        candidates: Dict[str, Dict[str, Any]] = {}
+        for results in batches:
+            for result in results:
+                known = candidates.get(result['content'])
+                if known is None or (result['score'] or 0.0) > (known['score'] or 0.0):
+                    candidates[result['content']] = result
+        ranked = sorted(candidates.values(), key=lambda result: result['score'] or 0.0, reverse=True)
+        
+        # Diversity is measured against the main query
+        return diversify_results(query_embeddings[0], ranked, n_results, lambda_mult=lambda_mult,
+                                 token_budget=token_budget, max_per_employee=max_per_employee,
+                                 count_tokens=count_tokens)
+    
+    @staticmethod
+    def _or_tsquery(query: str) -> str:
+        """
+        Turn free text into an OR tsquery string ('kubernetes | deloitte | ...').
+        
+        Natural language questions rarely contain every term of a document, so
+        terms are OR-ed and ts_rank_cd rewards chunks that match more of them.
+        Only word characters are kept, which keeps to_tsquery syntax-safe.
+        """
+        terms = dict.fromkeys(t.lower() for t in re.findall(r'\w+', query))
+        return ' | '.join(terms)
+    
+    def _structured_filter_sql(self, filters: Optional[Dict[str, Any]], alias: str,
+                               params: Dict[str, Any]) -> List[str]:
+        """Raw-SQL counterpart of _filter_conditions for STRUCTURED_FILTERS keys (others are ignored)"""
+        clauses = []
+        for key in self.STRUCTURED_FILTERS:
+            value = (filters or {}).get(key)
+            if value is None:
+                continue
+            values = [str(v) for v in value] if isinstance(value, (list, tuple, set)) else [str(value)]
+            cast_to = 'uuid' if key == 'employee_id' else 'text'
+            if len(values) == 1:
+                # Scalar equality so partial indexes (e.g. document_type = 'cv') can match
+                clauses.append(f"{alias}.{key} = CAST(:filter_{key} AS {cast_to})")
+                params[f'filter_{key}'] = values[0]
+            else:
+                clauses.append(f"{alias}.{key} = ANY(CAST(:filter_{key} AS {cast_to}[]))")
+                params[f'filter_{key}'] = values
+        return clauses
+    
+    @cached_search(keep_query_text=True)
+    def search_employees_hybrid(self, query: str, n_results: int = 10,
+                                filters: Optional[Dict[str, Any]] = None,
+                                k_vector: int = 50, k_text: int = 50,
+                                rrf_k: int = 60,
+                                ef_search: Optional[int] = None,
+                                probes: Optional[int] = None,
+                                min_score: Optional[float] = None) -> List[Dict[str, Any]]:
+        """
+        Rank employees by reciprocal-rank fusion of vector and full-text search.
+        
+        One statement runs two independent branches: the k_vector nearest
+        chunks (HNSW), and the k_text best ts_rank_cd matches over chunk
+        content, experience text and skills (GIN). Each branch ranks employees
+        by their best hit and the ranks are fused as sum(1 / (rrf_k + rank)),
+        so exact names like "Kubernetes" or "Deloitte" surface without raising k.
+        
+        Args:
+            query: Natural language query
+            n_results: Number of employees to return
+            filters: Structured filters (see STRUCTURED_FILTERS) applied to both
+                     branches; experience/skill hits need a matching chunk
+            k_vector: Chunks taken from the vector branch
+            k_text: Rows taken from each full-text branch
+            rrf_k: RRF damping constant (60 is the usual default)
+            min_score: Minimum similarity for vector hits; text hits are unaffected
+            
+        Returns:
+            List of employees with fused score, vector/text ranks and scores
+        """
+        tsquery = self._or_tsquery(query)
+        if not tsquery:
+            return self.search_employees(query, filters=filters, n_results=n_results, ef_search=ef_search,
+                                         probes=probes, min_score=min_score, mode='aggregate')
+        
+        try:
+            query_embedding = self._generate_embedding(query)
+            operator = self.DISTANCE_OPERATORS[self.metric]
+            params: Dict[str, Any] = {
+                'embedding': query_embedding, 'tsquery': tsquery,
+                'k_vector': k_vector, 'k_text': k_text, 'rrf_k': rrf_k, 'n': n_results
+            }
+            
+            chunk_filters = self._structured_filter_sql(filters, 'c', params)
+            run_filters = []
+            if self.active_run_id:
+                run_filters = ["c.embedding_run_id = CAST(:run_id AS uuid)"]
+                params['run_id'] = str(self.active_run_id)
+            vector_conditions = run_filters + chunk_filters
+            if min_score is not None:
+                vector_conditions.append(f"c.embedding {operator} :embedding <= :max_distance")
+                params['max_distance'] = self._max_distance_for_score(min_score)
+            vector_where = f"WHERE {' AND '.join(vector_conditions)}" if vector_conditions else ""
+            text_chunk_filter = ''.join(f" AND {clause}" for clause in run_filters + chunk_filters)
+            
+            # Profile rows carry no filter columns; require a matching chunk for the same employee
+            profile_filter = ""
+            if chunk_filters or run_filters:
+                fc_filters = self._structured_filter_sql(filters, 'fc', params)
+                if run_filters:
+                    fc_filters.append("fc.embedding_run_id = CAST(:run_id AS uuid)")
+                profile_filter = (
+                    "AND EXISTS (SELECT 1 FROM embedding_chunks fc WHERE fc.employee_id = {alias}.employee_id AND "
+                    + ' AND '.join(fc_filters) + ")"
+                )
+            
+            sql = text(f"""
+                WITH q AS (
+                    SELECT to_tsquery('english', :tsquery) AS tsq_english,
+                           to_tsquery('simple', :tsquery) AS tsq_simple
+                ),
+                vector_hits AS (
+                    SELECT c.employee_id, c.embedding {operator} :embedding AS distance
+                    FROM embedding_chunks c
+                    {vector_where}
+                    ORDER BY c.embedding {operator} :embedding
+                    LIMIT :k_vector
+                ),
+                vector_ranked AS (
+                    SELECT employee_id, min(distance) AS distance,
+                           row_number() OVER (ORDER BY min(distance)) AS rank
+                    FROM vector_hits
+                    GROUP BY employee_id
+                ),
+                text_hits AS (
+                    (SELECT c.employee_id, ts_rank_cd(c.content_tsv, q.tsq_english) AS text_score
+                     FROM embedding_chunks c, q
+                     WHERE c.content_tsv @@ q.tsq_english{text_chunk_filter}
+                     ORDER BY text_score DESC
+                     LIMIT :k_text)
+                    UNION ALL
+                    (SELECT x.employee_id, ts_rank_cd(x.search_tsv, q.tsq_english) AS text_score
+                     FROM employee_experiences x, q
+                     WHERE x.search_tsv @@ q.tsq_english
+                       {profile_filter.format(alias='x')}
+                     ORDER BY text_score DESC
+                     LIMIT :k_text)
+                    UNION ALL
+                    (SELECT s.employee_id, ts_rank_cd(s.skill_tsv, q.tsq_simple) AS text_score
+                     FROM employee_skills s, q
+                     WHERE s.skill_tsv @@ q.tsq_simple
+                       {profile_filter.format(alias='s')}
+                     ORDER BY text_score DESC
+                     LIMIT :k_text)
+                ),
+                text_ranked AS (
+                    SELECT employee_id, max(text_score) AS text_score,
+                           row_number() OVER (ORDER BY max(text_score) DESC) AS rank
+                    FROM text_hits
+                    GROUP BY employee_id
+                )
+                SELECT coalesce(v.employee_id, t.employee_id) AS employee_id,
+                       coalesce(1.0 / (:rrf_k + v.rank), 0)
+                         + coalesce(1.0 / (:rrf_k + t.rank), 0) AS rrf_score,
+                       v.distance, v.rank AS vector_rank,
+                       t.text_score, t.rank AS text_rank
+                FROM vector_ranked v
+                FULL OUTER JOIN text_ranked t ON t.employee_id = v.employee_id
+                ORDER BY rrf_score DESC
+                LIMIT :n
+            """).bindparams(bindparam('embedding', type_=Vector(len(query_embedding))))
+            
+            with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=k_vector,
+                                          filtered=bool(chunk_filters))
+                rows = session.execute(sql, params).all()
+            
+            results = [
+                {
+                    'employee_id': str(row.employee_id),
+                    'score': float(row.rrf_score),
+                    'distance': row.distance,
+                    'vector_score': self._score_from_distance(row.distance),
+                    'vector_rank': row.vector_rank,
+                    'text_score': row.text_score,
+                    'text_rank': row.text_rank
+                }
+                for row in rows
+            ]
+            logger.info(f"search_employees_hybrid: {len(results)} employees for '{query}'")
+            return results
+            
+        except Exception as e:
+            logger.error(f"Error in search_employees_hybrid: {e}")
+            return []
+    
     # =============================================================================
     # COMPATIBILITY METHODS (maintain same API as ChromaDB version)
     # =============================================================================
@@ -561,7 +1501,10 @@ class VectorStore:
                                 n_results: int = 10, 
                                 hogan_filters: Dict[str, str] = None,
                                 idi_filters: Dict[str, str] = None,
-                                hr_filters: Dict[str, Any] = None) -> List[Dict[str, Any]]:
+                                hr_filters: Dict[str, Any] = None,
+                                ef_search: Optional[int] = None,
+                                probes: Optional[int] = None,
+                                min_score: Optional[float] = None) -> List[Dict[str, Any]]:
         """Advanced search with enhanced filtering capabilities."""
         # Combine all filters
         combined_filters = {}
@@ -574,7 +1517,8 @@ class VectorStore:
         if hr_filters:
             combined_filters.update(hr_filters)
         
-        return self.search_employees(query, combined_filters, n_results)
+        return self.search_employees(query, combined_filters, n_results,
+                                     ef_search=ef_search, probes=probes, min_score=min_score)
     
     def search_by_assessment_profile(self, hogan_profile: Dict[str, str] = None,
                                    idi_profile: Dict[str, str] = None,
@@ -601,24 +1545,21 @@ class VectorStore:
                 if not filter_conditions:
                     return []
                 
-                results = session.query(EmbeddingChunk, EmbeddingDocument).join(
-                    EmbeddingDocument, 
-                    EmbeddingChunk.external_document_id == EmbeddingDocument.external_document_id
-                ).filter(
+                results = self._hit_query(session).filter(
                     and_(*filter_conditions)
                 ).limit(n_results).all()
                 
                 # Group by employee and calculate similarity scores
                 employee_results = {}
-                for chunk, doc in results:
-                    employee_id = doc.employee_id
+                for row in results:
+                    employee_id = row.employee_id
                     if employee_id not in employee_results:
                         employee_results[employee_id] = {
                             'employee_id': str(employee_id),
                             'similarity_score': 1.0,  # Simplified scoring
                             'metadata': {
-                                'document_type': doc.document_type,
-                                'source_filename': doc.source_filename
+                                'document_type': row.document_type,
+                                'source_filename': row.source_filename
                             }
                         }
                 
@@ -628,6 +1569,114 @@ class VectorStore:
             logger.error(f"Error in search_by_assessment_profile: {e}")
             return []
     
+    def _employee_target_vector(self, employee_id: str, document_type: str = ALL_DOCUMENT_TYPES):
+        """
+        Scalar subquery for an employee's stored embedding: their centroid, or
+        the normalised mean of their chunks when no centroid has been written yet.
+        """
+        centroid = select(EmployeeCentroid.embedding).where(
+            EmployeeCentroid.employee_id == employee_id,
+            EmployeeCentroid.embedding_run_id == self.active_run_id,
+            EmployeeCentroid.document_type == document_type
+        ).scalar_subquery()
+        chunk_conditions = [EmbeddingChunk.employee_id == employee_id, self._run_condition()]
+        if document_type != ALL_DOCUMENT_TYPES:
+            chunk_conditions.append(EmbeddingChunk.document_type == document_type)
+        chunk_mean = select(
+            func.l2_normalize(func.avg(EmbeddingChunk.embedding))
+        ).where(*chunk_conditions).scalar_subquery()
+        return func.coalesce(centroid, chunk_mean, type_=Vector(EMBEDDING_DIMENSIONS))
+    
+    def _trait_vectors(self, session, employee_ids: List[str]) -> Dict[str, Dict[str, float]]:
+        """Hogan and IDI trait vectors of the given employees, keyed by employee id"""
+        hogan = session.query(
+            EmployeeAssessment.employee_id, EmployeeAssessment.assessment_type,
+            HoganScore.trait, HoganScore.score
+        ).join(HoganScore, HoganScore.assessment_id == EmployeeAssessment.id).filter(
+            EmployeeAssessment.employee_id.in_(employee_ids)
+        )
+        idi = session.query(
+            EmployeeAssessment.employee_id, EmployeeAssessment.assessment_type,
+            IDIScore.category + ':' + IDIScore.dimension, IDIScore.score
+        ).join(IDIScore, IDIScore.assessment_id == EmployeeAssessment.id).filter(
+            EmployeeAssessment.employee_id.in_(employee_ids)
+        )
+        return build_trait_vectors(hogan.union_all(idi).all())
+    
+    @cached_search()
+    def find_similar_employees(self, employee_id: str, n_results: int = 10,
+                               document_type: str = ALL_DOCUMENT_TYPES,
+                               trait_weight: float = DEFAULT_TRAIT_WEIGHT,
+                               ef_search: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        "More like this employee": rank other employees by how close their stored
+        vectors are to this employee's, without embedding any query text.
+        
+        The employee's centroid (or mean chunk vector) is read inside the same
+        HNSW query over employee_centroids, so no vector leaves Postgres. When
+        trait_weight > 0 a wider shortlist is re-ranked by blending in the
+        similarity of Hogan/IDI trait scores (see employee_similarity).
+        
+        Args:
+            employee_id: The reference employee
+            n_results: Number of similar employees to return
+            document_type: Compare centroids of this chunk type ('all' for every chunk)
+            trait_weight: Share of the score from assessment traits, 0 for embeddings only
+            ef_search: Override hnsw.ef_search for this query
+            
+        Returns:
+            List of {'employee_id', 'score', 'embedding_score', 'trait_score'}, best first
+        """
+        if not self.active_run_id:
+            logger.info("find_similar_employees: no active embedding run")
+            return []
+        
+        shortlist_size = n_results * self.CENTROID_SHORTLIST_FACTOR if trait_weight > 0 else n_results
+        try:
+            with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, limit=shortlist_size, filtered=True)
+                distance = EmployeeCentroid.embedding.cosine_distance(
+                    self._employee_target_vector(employee_id, document_type)
+                ).label('distance')
+                shortlist = session.query(EmployeeCentroid.employee_id, distance).filter(
+                    EmployeeCentroid.embedding_run_id == self.active_run_id,
+                    EmployeeCentroid.document_type == document_type,
+                    EmployeeCentroid.employee_id != employee_id
+                ).order_by(distance).limit(shortlist_size).all()
+                # NULL distances mean the reference employee has no vectors at all
+                shortlist = [row for row in shortlist if row.distance is not None]
+                if not shortlist:
+                    logger.info(f"find_similar_employees: no vectors to compare for employee {employee_id}")
+                    return []
+                
+                traits = {}
+                if trait_weight > 0:
+                    traits = self._trait_vectors(
+                        session, [employee_id] + [row.employee_id for row in shortlist]
+                    )
+            
+            reference_traits = traits.get(str(employee_id), {})
+            results = []
+            for row in shortlist:
+                embedding_score = 1.0 - row.distance
+                trait_score = trait_similarity(reference_traits, traits.get(str(row.employee_id), {})) \
+                    if reference_traits else None
+                results.append({
+                    'employee_id': str(row.employee_id),
+                    'score': blend_scores(embedding_score, trait_score, trait_weight),
+                    'embedding_score': embedding_score,
+                    'trait_score': trait_score
+                })
+            results.sort(key=lambda r: r['score'], reverse=True)
+            
+            logger.info(f"find_similar_employees: {len(shortlist)} shortlisted for {employee_id}, "
+                        f"{min(len(results), n_results)} returned")
+            return results[:n_results]
+            
+        except Exception as e:
+            logger.error(f"Error in find_similar_employees: {e}")
+            return []
+    
     def get_assessment_analytics(self) -> Dict[str, Any]:
         """Get analytics about assessment data in the vector store."""
         try:
@@ -636,10 +1685,10 @@ class VectorStore:
                 total_employees = session.query(EmbeddingDocument.employee_id).distinct().count()
                 
                 # Count total profile sections
-                total_sections = session.query(EmbeddingChunk).count()
+                total_sections = session.query(func.count(EmbeddingChunk.id)).scalar()
                 
                 # Count total document chunks
-                total_docs = session.query(EmbeddingChunk).count()
+                total_docs = total_sections
                 
                 return {
                     'total_employees': total_employees,
@@ -654,52 +1703,73 @@ class VectorStore:
     
     # LEGACY COMPATIBILITY METHODS (for backward compatibility) 
     
+    @cached_search()
     def search_all_content(self, query: str, n_results: int = 15, 
                           employee_filter: str = None,
-                          document_type_filter: str = None) -> List[Dict[str, Any]]:
+                          document_type_filter: str = None,
+                          ef_search: Optional[int] = None,
+                          probes: Optional[int] = None,
+                          min_score: Optional[float] = None) -> List[Dict[str, Any]]:
         """Search across all content with optional filters."""
         try:
             with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=n_results,
+                                          filtered=bool(employee_filter or document_type_filter))
                 query_embedding = self._generate_embedding(query)
                 
-                base_query = session.query(EmbeddingChunk, EmbeddingDocument).join(
-                    EmbeddingDocument, 
-                    EmbeddingChunk.external_document_id == EmbeddingDocument.external_document_id
-                ).order_by(
-                    EmbeddingChunk.embedding.op('<->')(query_embedding)
-                )
-                
-                # Apply filters
-                if employee_filter:
-                    base_query = base_query.filter(EmbeddingDocument.employee_id == employee_filter)
-                
-                if document_type_filter:
-                    base_query = base_query.filter(EmbeddingDocument.document_type == document_type_filter)
-                
-                results = base_query.limit(n_results).all()
+                # The mirror only carries employee ids; document type filters go to pgvector
+                if self.mirror and not document_type_filter and self.mirror.is_ready():
+                    results = self._search_mirror(
+                        session, query_embedding, n_results,
+                        employee_id=employee_filter, min_score=min_score
+                    )
+                else:
+                    distance = self._distance(query_embedding).label('distance')
+                    
+                    base_query = self._hit_query(session, distance).order_by(distance)
+                    
+                    if min_score is not None:
+                        base_query = base_query.filter(
+                            self._distance(query_embedding) <= self._max_distance_for_score(min_score)
+                        )
+                    
+                    # Apply filters on the denormalised chunk columns so they hit the chunk indexes
+                    base_query = base_query.filter(*self._filter_conditions({
+                        'employee_id': employee_filter,
+                        'document_type': document_type_filter
+                    }))
+                    
+                    base_query = self._restrict_to_candidates(base_query, query_embedding, n_results)
+                    results = base_query.limit(n_results).all()
                 
                 return [
                     {
-                        'content': chunk.content,
-                        'score': 0.0,  # Simplified scoring
+                        'content': row.content,
+                        'score': self._score_from_distance(row.distance),
+                        'distance': row.distance,
                         'metadata': {
-                            'employee_id': str(doc.employee_id),
-                            'document_type': doc.document_type,
-                            'source_filename': doc.source_filename
+                            'employee_id': str(row.employee_id),
+                            'document_type': row.document_type,
+                            'source_filename': row.source_filename
                         }
                     }
-                    for chunk, doc in results
+                    for row in results
                 ]
                 
         except Exception as e:
             logger.error(f"Error in search_all_content: {e}")
             return []
     
+    @cached_search()
     def search_employee_documents(self, employee_name: str, query: str = None,
-                                document_type: str = None, n_results: int = 5) -> List[Dict[str, Any]]:
+                                document_type: str = None, n_results: int = 5,
+                                ef_search: Optional[int] = None,
+                                probes: Optional[int] = None) -> List[Dict[str, Any]]:
         """Search within a specific employee's documents."""
         try:
             with SessionLocal() as session:
+                self._apply_search_params(session, ef_search, probes, limit=n_results)
+                
                 # First find the employee by name
                 from backend.db.models import Employee
                 employee = session.query(Employee).filter(
@@ -709,19 +1779,19 @@ class VectorStore:
                 if not employee:
                     return []
                 
-                # Search their documents
-                base_query = session.query(EmbeddingChunk, EmbeddingDocument).join(
-                    EmbeddingDocument, 
-                    EmbeddingChunk.external_document_id == EmbeddingDocument.external_document_id
-                ).filter(
+                # Search their documents; without a query there is nothing to score against
+                if query:
+                    query_embedding = self._generate_embedding(query)
+                    distance = self._distance(query_embedding).label('distance')
+                else:
+                    distance = null().label('distance')
+                
+                base_query = self._hit_query(session, distance).filter(
                     EmbeddingDocument.employee_id == employee.id
                 )
                 
                 if query:
-                    query_embedding = self._generate_embedding(query)
-                    base_query = base_query.order_by(
-                        EmbeddingChunk.embedding.op('<->')(query_embedding)
-                    )
+                    base_query = base_query.order_by(distance)
                 
                 if document_type:
                     base_query = base_query.filter(EmbeddingDocument.document_type == document_type)
@@ -730,15 +1800,16 @@ class VectorStore:
                 
                 return [
                     {
-                        'content': chunk.content,
-                        'score': 0.0,  # Simplified scoring
+                        'content': row.content,
+                        'score': self._score_from_distance(row.distance),
+                        'distance': row.distance,
                         'metadata': {
-                            'employee_id': str(doc.employee_id),
-                            'document_type': doc.document_type,
-                            'source_filename': doc.source_filename
+                            'employee_id': str(row.employee_id),
+                            'document_type': row.document_type,
+                            'source_filename': row.source_filename
                         }
                     }
-                    for chunk, doc in results
+                    for row in results
                 ]
                 
         except Exception as e:
@@ -1,12 +1,12 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Query
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 from backend.db.session import get_db_dep, SessionLocal
 from backend.db.models import Employee
 from sqlalchemy.orm import Session
 from sqlalchemy import text
-from backend.services.rag.query_service import RAGQuerySystem
-from backend.services.data_access.employee_database import EmployeeDatabase
+from backend.services.container import services
+import uuid
 import logging
 import traceback
 from functools import wraps
@@ -19,9 +19,6 @@ router = APIRouter()
 # In-memory session context (for demonstration; use Redis/DB for production)
 session_memory: Dict[str, dict] = {}
 
-# Lazy initialization of RAG system
-_rag_system = None
-
 def error_handler(func):
     """Decorator for comprehensive error handling."""
     @wraps(func)
@@ -38,23 +35,18 @@ def error_handler(func):
     return wrapper
 
 def get_rag_system():
-    """Get or create the RAG system instance with error handling."""
-    global _rag_system
+    """Get the shared RAG system instance (built lazily by the service container) with error handling."""
     try:
-        if _rag_system is None:
-            logger.info("Initializing new RAG system instance")
-            _rag_system = RAGQuerySystem(employee_db=EmployeeDatabase())
-        return _rag_system
+        return services.get('rag_system')
     except Exception as e:
         logger.error(f"Failed to initialize RAG system: {e}")
         raise HTTPException(status_code=500, detail="Failed to initialize RAG system")
 
 def clear_rag_system_cache():
     """Clear the cached RAG system instance - useful for testing and debugging."""
-    global _rag_system
-    if _rag_system is not None:
+    if services.is_built('rag_system'):
         logger.info("Clearing cached RAG system instance")
-        _rag_system = None
+        services.reset('rag_system')
 
 class ChatRequest(BaseModel):
     message: str
@@ -79,6 +71,38 @@ async def get_employees(db: Session = Depends(get_db_dep)):
         logger.error(f"Error retrieving employees: {e}")
         raise HTTPException(status_code=500, detail="Failed to retrieve employees")
 
+@router.get("/employees/{employee_id}/similar")
+@error_handler
+async def get_similar_employees(employee_id: str,
+                                limit: int = Query(10, ge=1, le=50),
+                                document_type: str = "all",
+                                trait_weight: float = Query(0.3, ge=0.0, le=1.0),
+                                db: Session = Depends(get_db_dep)):
+    """Employees most similar to the given one, from stored vectors and assessment traits."""
+    try:
+        employee_uuid = uuid.UUID(employee_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid employee id")
+    
+    employee = db.query(Employee).filter(Employee.id == employee_uuid).first()
+    if not employee:
+        raise HTTPException(status_code=404, detail="Employee not found")
+    
+    similar = services.get('vector_store').find_similar_employees(
+        str(employee_uuid), n_results=limit, document_type=document_type, trait_weight=trait_weight
+    )
+    
+    names = {
+        str(emp_id): full_name for emp_id, full_name in db.query(Employee.id, Employee.full_name).filter(
+            Employee.id.in_([uuid.UUID(result['employee_id']) for result in similar])
+        )
+    } if similar else {}
+    for result in similar:
+        result['full_name'] = names.get(result['employee_id'])
+    
+    logger.info(f"Found {len(similar)} employees similar to {employee.full_name}")
+    return {"employee_id": str(employee.id), "full_name": employee.full_name, "similar": similar}
+
 @router.post("/chat", response_model=ChatResponse)
 @error_handler
 async def chat_endpoint(request: ChatRequest):
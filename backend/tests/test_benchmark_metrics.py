@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+"""
+Test script for the vector search benchmark metrics
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.benchmarks.metrics import percentile, latency_summary, recall_at_k, mean_recall_at_k
+
+
+def test_percentiles_interpolate_between_ranks():
+    values = [1.0, 2.0, 3.0, 4.0, 5.0, 6.0, 7.0, 8.0, 9.0, 10.0]
+    assert percentile(values, 50) == 5.5
+    assert percentile(values, 0) == 1.0
+    assert percentile(values, 100) == 10.0
+    assert abs(percentile(values, 95) - 9.55) < 1e-9
+
+    summary = latency_summary(values)
+    assert summary['p50'] == 5.5
+    assert summary['max'] == 10.0
+    assert latency_summary([]) == {}
+
+
+def test_recall_ignores_order_within_top_k():
+    assert recall_at_k([1, 2, 3], [3, 2, 1], k=3) == 1.0
+    assert recall_at_k([1, 2, 3, 4], [1, 9, 3, 8], k=4) == 0.5
+    # Hits past k do not count
+    assert recall_at_k([1, 2], [9, 1, 2], k=2) == 0.5
+    assert mean_recall_at_k([[1, 2], [3, 4]], [[1, 2], [3, 9]], k=2) == 0.75
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+Test script for the content-addressed embedding cache
+"""
+import sys
+import os
+from collections import namedtuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.ingestion.embedding.cached_embedder import CachedEmbedder, content_hash, with_embedding_cache
+from backend.ingestion.embedding.embedder import HashingEmbedder
+
+CacheRow = namedtuple('CacheRow', ['content_hash', 'embedding'])
+
+
+class RecordingEmbedder:
+    """Provider that returns [len(text)] and records every batch it is sent"""
+
+    model = 'fake-model'
+    dimensions = 1
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts, batch_size=None):
+        self.calls.append(list(texts))
+        return [[float(len(text))] for text in texts]
+
+
+class StubSession:
+    """Session whose cache lookups return the factory's rows and whose inserts are counted"""
+
+    def __init__(self, factory):
+        self.factory = factory
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def query(self, *columns):
+        if self.factory.fail_lookup:
+            raise RuntimeError('lookup failed')
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def all(self):
+        return [CacheRow(key, vector) for key, vector in self.factory.rows.items()]
+
+    def execute(self, statement):
+        if self.factory.fail_store:
+            raise RuntimeError('insert failed')
+        self.factory.inserts += 1
+
+    def commit(self):
+        self.factory.commits += 1
+
+
+class StubSessionFactory:
+    def __init__(self, rows=None, fail_lookup=False, fail_store=False):
+        self.rows = rows or {}
+        self.fail_lookup = fail_lookup
+        self.fail_store = fail_store
+        self.inserts = 0
+        self.commits = 0
+
+    def __call__(self):
+        return StubSession(self)
+
+
+def test_identical_new_texts_are_embedded_once():
+    provider = RecordingEmbedder()
+    factory = StubSessionFactory()
+    embedder = CachedEmbedder(provider, factory)
+
+    vectors = embedder.embed(['Python', 'Go', 'Python'])
+
+    assert vectors == [[6.0], [2.0], [6.0]]
+    assert provider.calls == [['Python', 'Go']]
+    assert factory.inserts == 1 and factory.commits == 1
+
+
+def test_hits_and_misses_are_counted_per_text():
+    provider = RecordingEmbedder()
+    embedder = CachedEmbedder(provider, StubSessionFactory(rows={content_hash('cached'): [42.0]}))
+
+    vectors = embedder.embed(['cached', 'new', 'cached'])
+
+    assert vectors == [[42.0], [3.0], [42.0]]
+    assert provider.calls == [['new']]
+    assert (embedder.hits, embedder.misses) == (2, 1)
+
+    assert embedder.embed('cached') == [42.0]
+    assert (embedder.hits, embedder.misses) == (3, 1)
+    assert provider.calls == [['new']]
+
+
+def test_lookup_failure_falls_through_to_provider():
+    provider = RecordingEmbedder()
+    embedder = CachedEmbedder(provider, StubSessionFactory(rows={content_hash('cached'): [42.0]}, fail_lookup=True))
+
+    assert embedder.embed(['cached', 'new']) == [[6.0], [3.0]]
+    assert provider.calls == [['cached', 'new']]
+    assert (embedder.hits, embedder.misses) == (0, 2)
+
+
+def test_store_failure_still_returns_vectors():
+    provider = RecordingEmbedder()
+    factory = StubSessionFactory(fail_store=True)
+    embedder = CachedEmbedder(provider, factory)
+
+    assert embedder.embed(['a', 'bb']) == [[1.0], [2.0]]
+    assert factory.commits == 0
+
+
+def test_with_embedding_cache_wraps_only_paid_providers():
+    hashing = HashingEmbedder()
+    assert with_embedding_cache(hashing) is hashing
+
+    cached = CachedEmbedder(RecordingEmbedder(), StubSessionFactory())
+    assert with_embedding_cache(cached) is cached
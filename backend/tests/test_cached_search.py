@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Test script for the result cache in front of VectorStore searches
+"""
+import sys
+import os
+from collections import namedtuple
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.rag import vector_store
+from backend.services.rag.vector_store import VectorStore
+
+SearchRow = namedtuple('SearchRow', ['query_index', 'content', 'distance', 'employee_id',
+                                     'document_type', 'source_filename', 'chunk_embedding', 'token_count'])
+
+
+class RecordingEmbedder:
+    """Query embedder that records every request it is sent"""
+
+    model = 'fake-model'
+    dimensions = 3
+
+    def __init__(self):
+        self.calls = []
+
+    def embed(self, texts, batch_size=None):
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return [1.0, 0.0, 0.0]
+        return [[1.0, float(i), 0.0] for i in range(len(texts))]
+
+
+class OfflineVectorStore(VectorStore):
+    """VectorStore with the database lookups around searches answered locally"""
+
+    def _test_connection(self):
+        self.pgvector_version = (0, 8, 0)
+
+    def _ensure_tables_exist(self):
+        pass
+
+    def _active_run(self):
+        return {'id': 'run-1', 'embedding_model': 'fake-model', 'short_dimensions': None}
+
+    def _data_generation(self):
+        return 1
+
+
+class StubSession:
+    """Answers search_many's statement with one chunk per query"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, statement, params=None):
+        if params is None:
+            return []  # SET LOCAL
+        queries = sum(1 for name in params if name.startswith('vec_'))
+        return [SearchRow(i, f'chunk {i}', 0.1 * (i + 1), f'e{i}', 'cv', 'cv.txt', [1.0, float(i), 0.0], 5)
+                for i in range(queries)]
+
+
+def _store(embedder):
+    previous = os.environ.get('QUERY_EMBEDDING_CACHE_PATH')
+    os.environ['QUERY_EMBEDDING_CACHE_PATH'] = ''
+    try:
+        return OfflineVectorStore(metric='cosine', backend='pgvector', quantization='none', embedder=embedder)
+    finally:
+        if previous is None:
+            os.environ.pop('QUERY_EMBEDDING_CACHE_PATH')
+        else:
+            os.environ['QUERY_EMBEDDING_CACHE_PATH'] = previous
+
+
+def test_search_many_embeds_queries_in_one_request_with_result_cache():
+    embedder = RecordingEmbedder()
+    store = _store(embedder)
+    assert store.result_cache.enabled
+
+    queries = ['python developers', 'kubernetes', 'leadership']
+    original_session = vector_store.SessionLocal
+    vector_store.SessionLocal = StubSession
+    try:
+        first = store.search_many(queries, k=1)
+        second = store.search_many(queries, k=1)
+    finally:
+        vector_store.SessionLocal = original_session
+
+    assert embedder.calls == [queries]
+    assert [len(results) for results in first] == [1, 1, 1]
+    assert second == first
+    assert store.get_result_cache_stats()['hits'] == 1
+
+
+def test_search_diverse_embeds_all_angles_in_one_request():
+    embedder = RecordingEmbedder()
+    store = _store(embedder)
+
+    original_session = vector_store.SessionLocal
+    vector_store.SessionLocal = StubSession
+    try:
+        results = store.search_diverse('cloud migration', n_results=3, extra_queries=['Kubernetes', 'AWS'])
+    finally:
+        vector_store.SessionLocal = original_session
+
+    assert embedder.calls == [['cloud migration', 'Kubernetes', 'AWS']]
+    assert results[0]['content'] == 'chunk 0'
+    assert sorted(result['content'] for result in results) == ['chunk 0', 'chunk 1', 'chunk 2']
+    assert all('embedding' not in result for result in results)
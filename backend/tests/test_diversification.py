@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Test script for MMR diversification of retrieved chunks
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.rag.diversification import mmr_select, diversify_results, fit_token_budget
+
+QUERY = [1.0, 0.0, 0.0]
+
+
+def _result(content, embedding, employee_id, token_count=10):
+    return {
+        'content': content,
+        'embedding': embedding,
+        'token_count': token_count,
+        'metadata': {'employee_id': employee_id}
+    }
+
+
+def test_near_duplicates_are_skipped():
+    """A second copy of the best chunk should lose to a different, slightly less relevant one"""
+    candidates = [
+        [0.95, 0.31, 0.0],
+        [0.95, 0.31, 0.0],   # duplicate of the first
+        [0.9, 0.0, 0.44],
+    ]
+    assert mmr_select(QUERY, candidates, k=2, lambda_mult=0.5) == [0, 2]
+    # Pure relevance keeps rank order
+    assert mmr_select(QUERY, candidates, k=2, lambda_mult=1.0)[0] in (0, 1)
+
+
+def test_token_budget_and_employee_cap():
+    """Selections never exceed the token budget or the per-employee cap"""
+    results = [
+        _result("Lisa CV paragraph 1", [1.0, 0.1, 0.0], "lisa", token_count=40),
+        _result("Lisa CV paragraph 2", [1.0, 0.0, 0.1], "lisa", token_count=40),
+        _result("Carlos assessment", [0.8, 0.6, 0.0], "carlos", token_count=70),
+        _result("Aisha CV", [0.7, 0.0, 0.7], "aisha", token_count=30),
+    ]
+    selected = diversify_results(QUERY, results, k=4, token_budget=100, max_per_employee=1)
+
+    assert sum(r['token_count'] for r in selected) <= 100
+    employee_ids = [r['metadata']['employee_id'] for r in selected]
+    assert len(employee_ids) == len(set(employee_ids))
+    assert all('embedding' not in r for r in selected)
+
+
+def test_results_without_vectors_keep_rank_order():
+    results = [
+        {'content': "a b c", 'metadata': {'employee_id': "1"}},
+        {'content': "d e f", 'metadata': {'employee_id': "1"}},
+        {'content': "g h", 'metadata': {'employee_id': "2"}},
+    ]
+    selected = diversify_results(QUERY, results, k=3, max_per_employee=1)
+    assert [r['content'] for r in selected] == ["a b c", "g h"]
+
+
+def test_fit_token_budget_skips_oversized_sections_and_keeps_filling():
+    texts = ["Employee: Lisa Wu", "Education:", "MSc Computer Science", "Education:"]
+    assert fit_token_budget(texts, 5) == ["Employee: Lisa Wu", "Education:", "Education:"]
+    assert fit_token_budget(texts, 100, drop_duplicates=True) == texts[:3]
+    # One long early section does not push out the short ones after it
+    long_section = "Work Experience: " + "word " * 50
+    assert fit_token_budget(["Employee: Lisa Wu", long_section, "Skills:", "- Python"], 10) == [
+        "Employee: Lisa Wu", "Skills:", "- Python"
+    ]
+
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Test script for the concurrent embedding request dispatcher
+"""
+import sys
+import os
+import asyncio
+import random
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.ingestion.embedding.dispatcher import BackgroundLoop, EmbeddingDispatcher, TokenBucket, is_retryable
+
+
+class StatusError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+
+
+def test_results_keep_batch_order_and_concurrency_is_bounded():
+    dispatcher = EmbeddingDispatcher(max_concurrency=3)
+    in_flight = []
+    peak = []
+
+    async def send(payload):
+        in_flight.append(payload)
+        peak.append(len(in_flight))
+        await asyncio.sleep(random.uniform(0, 0.01))
+        in_flight.remove(payload)
+        return [payload * 10]
+
+    batches = [(i, 1) for i in range(20)]
+    results = EmbeddingDispatcher.run(dispatcher.dispatch(batches, send))
+    assert results == [[i * 10] for i in range(20)]
+    assert max(peak) <= 3
+
+
+def test_retries_rate_limits_but_not_client_errors():
+    dispatcher = EmbeddingDispatcher(max_retries=3, base_delay=0.001, max_delay=0.01)
+    attempts = {'flaky': 0, 'bad': 0}
+
+    async def send(payload):
+        attempts[payload] += 1
+        if payload == 'flaky' and attempts['flaky'] < 3:
+            raise StatusError(429)
+        if payload == 'bad':
+            raise StatusError(400)
+        return payload
+
+    assert EmbeddingDispatcher.run(dispatcher.dispatch([('flaky', 1)], send)) == ['flaky']
+    assert attempts['flaky'] == 3
+
+    try:
+        EmbeddingDispatcher.run(dispatcher.dispatch([('bad', 1)], send))
+        assert False, "expected the 400 to be raised"
+    except StatusError:
+        pass
+    assert attempts['bad'] == 1
+
+
+def test_is_retryable():
+    assert is_retryable(StatusError(429))
+    assert is_retryable(StatusError(503))
+    assert not is_retryable(StatusError(401))
+    assert is_retryable(ConnectionError())
+    assert not is_retryable(ValueError())
+
+
+def test_token_bucket_reservations():
+    bucket = TokenBucket(rate_per_minute=600)  # 10 per second, burst of 600
+    assert bucket.reserve(600) == 0.0
+    wait = bucket.reserve(10)
+    assert 0.9 < wait <= 1.0
+
+
+def test_send_sync_retries_like_dispatch():
+    dispatcher = EmbeddingDispatcher(max_retries=3, base_delay=0.001, max_delay=0.001)
+    attempts = []
+
+    def send(payload):
+        attempts.append(payload)
+        if len(attempts) < 3:
+            raise StatusError(500)
+        return payload.upper()
+
+    assert dispatcher.send_sync(send, 'query', 1) == 'QUERY'
+    assert len(attempts) == 3
+
+
+def test_background_loop_is_reused_across_calls():
+    background = BackgroundLoop()
+
+    async def current_loop():
+        return asyncio.get_running_loop()
+
+    first = background.run(current_loop())
+    assert background.run(current_loop()) is first
+
+    # Also usable from code that already runs inside an event loop
+    async def nested():
+        return background.run(current_loop())
+    assert asyncio.run(nested()) is first
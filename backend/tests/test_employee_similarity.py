@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""
+Test script for "more like this employee" trait scoring
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.rag.employee_similarity import (
+    build_trait_vectors, trait_similarity, blend_scores
+)
+
+
+def test_build_trait_vectors_keeps_assessments_apart_and_averages():
+    rows = [
+        ('e1', 'HPI', 'Ambition', 80.0),
+        ('e1', 'HPI', 'Ambition', 60.0),
+        ('e1', 'MVPI', 'Ambition', 20.0),
+        ('e1', 'IDI', 'Drive:Pace', None),
+        ('e2', 'IDI', 'Drive:Pace', 55.0),
+    ]
+    vectors = build_trait_vectors(rows)
+    assert vectors['e1'] == {'hpi:ambition': 70.0, 'mvpi:ambition': 20.0}
+    assert vectors['e2'] == {'idi:drive:pace': 55.0}
+
+
+def test_trait_similarity():
+    a = {'hpi:adjustment': 50.0, 'hpi:ambition': 90.0, 'hds:bold': 10.0, 'mvpi:power': 40.0}
+    assert trait_similarity(a, dict(a)) == 1.0
+    b = {'hpi:adjustment': 60.0, 'hpi:ambition': 70.0, 'hds:bold': 40.0}
+    # shared: 10, 20, 30 -> mean 20
+    assert abs(trait_similarity(a, b) - 0.8) < 1e-9
+    assert trait_similarity(a, {'hpi:adjustment': 50.0}) is None
+
+
+def test_blend_scores():
+    assert blend_scores(0.9, None, 0.3) == 0.9
+    assert abs(blend_scores(0.9, 0.5, 0.25) - 0.8) < 1e-9
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+"""
+Test script for the offline hashing embedder and the embedder factory
+"""
+import sys
+import os
+import math
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.ingestion.embedding.embedder import (
+    Embedder, HashingEmbedder, get_embedder, HASHING_MODEL, EMBEDDING_DIMENSIONS
+)
+
+
+def _cosine(a, b):
+    return sum(x * y for x, y in zip(a, b))
+
+
+def test_hashing_embeddings_are_deterministic_unit_vectors():
+    embedder = HashingEmbedder()
+    first = embedder.embed("Led a Kubernetes migration at Deloitte")
+    second = HashingEmbedder().embed("Led a Kubernetes migration at Deloitte")
+
+    assert first == second
+    assert len(first) == EMBEDDING_DIMENSIONS
+    assert abs(math.sqrt(sum(x * x for x in first)) - 1.0) < 1e-9
+
+
+def test_shared_words_mean_higher_similarity():
+    embedder = HashingEmbedder()
+    query, related, unrelated = embedder.embed([
+        "kubernetes platform engineering",
+        "platform engineering lead, kubernetes and terraform",
+        "quarterly sales targets for retail accounts",
+    ])
+    assert _cosine(query, related) > _cosine(query, unrelated)
+
+
+def test_factory_picks_provider_from_run_model():
+    embedder = get_embedder(HASHING_MODEL)
+    assert isinstance(embedder, HashingEmbedder)
+    assert isinstance(embedder, Embedder)
+    assert embedder.model == HASHING_MODEL
+
+    try:
+        get_embedder("word2vec")
+        assert False, "unknown models should be rejected"
+    except ValueError:
+        pass
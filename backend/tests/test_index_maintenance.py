@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for vector index maintenance planning
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.db.index_maintenance import (
+    bloat_ratio, notify_bulk_change, plan_maintenance, recommend_ef_search, recommended_ivfflat_lists,
+    _take_pending_runs, MAX_EF_SEARCH
+)
+
+
+def _stats(live, dead=0, mod_since_analyze=0, changes=0):
+    return {'live': live, 'dead': dead, 'mod_since_analyze': mod_since_analyze, 'changes': changes}
+
+
+def _index(name, method='hnsw', size_bytes=1000, partial=False, table='chunks'):
+    return {'name': name, 'table': table, 'method': method, 'size_bytes': size_bytes,
+            'partial': partial, 'column': 'embedding'}
+
+
+def test_fresh_bulk_load_analyzes_and_trains_ivfflat():
+    actions = plan_maintenance(
+        {'chunks': _stats(10000, mod_since_analyze=10000, changes=10000)},
+        [_index('hnsw_idx'), _index('ivf_idx', method='ivfflat')],
+        baselines={}
+    )
+    assert [(a['action'], a['target']) for a in actions] == [('reindex', 'ivf_idx'), ('analyze', 'chunks')]
+
+
+def test_quiet_table_needs_nothing():
+    baselines = {'ivf_idx': {'rows_at_build': 10000, 'changes_at_build': 10000, 'size_at_build': 1000}}
+    actions = plan_maintenance(
+        {'chunks': _stats(10100, mod_since_analyze=100, changes=10100)},
+        [_index('ivf_idx', method='ivfflat', size_bytes=1010)],
+        baselines
+    )
+    assert actions == []
+
+
+def test_bloat_and_dead_tuples():
+    baselines = {
+        'hnsw_idx': {'rows_at_build': 1000, 'changes_at_build': 0, 'size_at_build': 1000},
+        'partial_idx': {'rows_at_build': 1000, 'changes_at_build': 0, 'size_at_build': 1000},
+    }
+    actions = plan_maintenance(
+        {'chunks': _stats(1000, dead=500), 'centroids': _stats(100)},
+        [_index('hnsw_idx', size_bytes=2000), _index('partial_idx', partial=True),
+         _index('centroid_idx', table='centroids')],
+        baselines
+    )
+    # centroid_idx has no baseline yet, so nothing says it bloated
+    assert [(a['action'], a['target']) for a in actions] == [('vacuum', 'chunks'), ('reindex', 'hnsw_idx')]
+    assert 'bloat' in actions[1]['reason']
+
+
+def test_low_recall_recommends_ef_search_instead_of_reindex():
+    assert recommend_ef_search(None, 40) is None
+    assert recommend_ef_search(0.95, 40) is None
+    assert recommend_ef_search(0.8, 40) == 80
+    assert recommend_ef_search(0.8, 5) == 10
+    assert recommend_ef_search(0.8, 600) == MAX_EF_SEARCH
+    assert recommend_ef_search(0.8, MAX_EF_SEARCH) is None
+
+
+def test_recommended_ivfflat_lists():
+    assert recommended_ivfflat_lists(0) == 10
+    assert recommended_ivfflat_lists(50000) == 50
+    assert recommended_ivfflat_lists(4_000_000) == 2000
+
+
+def test_bloat_ratio_needs_a_baseline():
+    index = _index('hnsw_a', size_bytes=3000)
+    assert bloat_ratio(index, None, 100) is None
+    assert bloat_ratio(index, {'rows_at_build': 0, 'changes_at_build': 0, 'size_at_build': 1000}, 100) is None
+    # 1000 bytes for 100 rows at build, 3000 bytes for 150 rows now: 2x per row
+    baseline = {'rows_at_build': 100, 'changes_at_build': 0, 'size_at_build': 1000}
+    assert bloat_ratio(index, baseline, 150) == 2.0
+
+
+def test_pending_runs_are_taken_once():
+    notify_bulk_change('run-a')
+    notify_bulk_change('run-b')
+    assert _take_pending_runs() == {'run-a', 'run-b'}
+    # Nothing pending: the scheduler checks the active run
+    assert _take_pending_runs() == {None}
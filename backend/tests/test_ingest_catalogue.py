@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Test script for ingest catalogue scanning and diffing
+"""
+import sys
+import os
+import tempfile
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.db.ingest_catalogue import diff_catalogue, file_hash, scan_files
+
+
+def _state(content_hash, size=10, mtime=1.0):
+    return {'size': size, 'mtime': mtime, 'content_hash': content_hash}
+
+
+def test_diff_classifies_files():
+    known = {'CV_A.txt': _state('a'), 'CV_B.txt': _state('b'), 'IDI_C.txt': _state('c'), 'Hogan_D.txt': _state('d')}
+    current = {'CV_A.txt': _state('a'), 'CV_B.txt': _state('b2'), 'CV_C.txt': _state('c'), 'CV_E.txt': _state('e')}
+
+    diff = diff_catalogue(current, known)
+
+    assert diff['unchanged'] == ['CV_A.txt']
+    assert diff['changed'] == ['CV_B.txt']
+    assert diff['moved'] == [('IDI_C.txt', 'CV_C.txt')]
+    assert diff['new'] == ['CV_E.txt']
+    assert diff['removed'] == ['Hogan_D.txt']
+
+
+def test_diff_copy_of_present_file_is_new():
+    # The original is still there, so the copy is not a move
+    diff = diff_catalogue({'a.txt': _state('x'), 'b.txt': _state('x')}, {'a.txt': _state('x')})
+    assert diff['unchanged'] == ['a.txt']
+    assert diff['new'] == ['b.txt']
+    assert diff['moved'] == [] and diff['removed'] == []
+
+
+def test_diff_each_vanished_file_moves_once():
+    known = {'a.txt': _state('x')}
+    diff = diff_catalogue({'b.txt': _state('x'), 'c.txt': _state('x')}, known)
+    assert diff['moved'] == [('a.txt', 'b.txt')]
+    assert diff['new'] == ['c.txt']
+    assert diff['removed'] == []
+
+
+def test_scan_reuses_hash_only_when_size_and_mtime_match():
+    with tempfile.TemporaryDirectory() as root:
+        path = os.path.join(root, 'CV_A.txt')
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write('Jane Doe')
+        stat = os.stat(path)
+
+        fresh = scan_files([path], root)
+        assert fresh == {'CV_A.txt': _state(file_hash(path), stat.st_size, stat.st_mtime)}
+
+        reused = scan_files([path], root, {'CV_A.txt': _state('cached', stat.st_size, stat.st_mtime)})
+        assert reused['CV_A.txt']['content_hash'] == 'cached'
+
+        rehashed = scan_files([path], root, {'CV_A.txt': _state('cached', stat.st_size, stat.st_mtime - 5)})
+        assert rehashed['CV_A.txt']['content_hash'] == file_hash(path)
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for the parallel parse stage of IngestService
+"""
+import sys
+import os
+import time
+import tempfile
+import threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.ingestion import run_ingest
+from backend.ingestion.run_ingest import IngestService, writer_index
+
+
+class RecordingIngestService(IngestService):
+    """Parses in threads and records stores instead of writing to the database"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.stored = []
+        self._stored_lock = threading.Lock()
+
+    def _parse_executor(self):
+        return ThreadPoolExecutor(max_workers=self.parse_workers)
+
+    def _store_parsed(self, file_path, parsed_data, state=None, replace=False):
+        time.sleep(0.01)
+        with self._stored_lock:
+            self.stored.append((file_path.name, parsed_data['name'], threading.current_thread().name))
+
+
+def _fake_parse(file_path):
+    # Earlier files take longest, so parses complete in reverse order
+    delay = {'CV_Ann_Lee.txt': 0.08, 'CV_Ann_Lee_2.txt': 0.01, 'Hogan_Ann_Lee.txt': 0.06, 'IDI_Ann_Lee.txt': 0.0}
+    time.sleep(delay.get(file_path.name, 0.02))
+    name = file_path.stem.split('_', 1)[1].replace('_2', '')
+    return {'name': name.replace('_', ' ')}
+
+
+def test_cvs_stored_first_and_each_employee_by_one_writer_in_order():
+    names = ['CV_Ann_Lee.txt', 'CV_Ann_Lee_2.txt', 'CV_Bob_Ray.txt', 'CV_Cem_Oz.txt',
+             'Hogan_Ann_Lee.txt', 'Hogan_Bob_Ray.txt', 'IDI_Ann_Lee.txt', 'IDI_Cem_Oz.txt']
+    original_parse = run_ingest.parse_file
+    run_ingest.parse_file = _fake_parse
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            source = Path(root) / 'imports'
+            source.mkdir()
+            for name in names:
+                (source / name).write_text('content', encoding='utf-8')
+            service = RecordingIngestService(source, Path(root) / 'processed', parse_workers=4, db_workers=2)
+            cvs = [(source / n, {}, False) for n in names if n.startswith('CV_')]
+            assessments = [(source / n, {}, False) for n in names if not n.startswith('CV_')]
+            service._process_parallel([cvs, assessments])
+    finally:
+        run_ingest.parse_file = original_parse
+
+    stored = [file_name for file_name, _, _ in service.stored]
+    assert sorted(stored) == sorted(names)
+    last_cv = max(i for i, name in enumerate(stored) if name.startswith('CV_'))
+    first_assessment = min(i for i, name in enumerate(stored) if not name.startswith('CV_'))
+    assert last_cv < first_assessment
+
+    threads = {}
+    for file_name, employee, thread in service.stored:
+        threads.setdefault(employee, set()).add(thread)
+    assert all(len(employee_threads) == 1 for employee_threads in threads.values())
+
+    # Same per-employee order as the sequential mode despite reversed parse completion
+    ann = [file_name for file_name, employee, _ in service.stored if employee == 'Ann Lee']
+    assert ann == ['CV_Ann_Lee.txt', 'CV_Ann_Lee_2.txt', 'Hogan_Ann_Lee.txt', 'IDI_Ann_Lee.txt']
+
+
+def test_writer_index_is_stable_per_employee():
+    path = Path('CV_Ann_Lee.txt')
+    assert writer_index({'name': 'Ann Lee'}, path, 4) == writer_index({'name': ' ann_lee '}, path, 4)
+    assert 0 <= writer_index(None, path, 3) < 3
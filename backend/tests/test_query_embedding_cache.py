@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Test script for the two-tier query embedding cache used by VectorStore
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.rag.embedding_cache import QueryEmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def test_normalised_queries_share_an_entry(tmp_path):
+    """Case, whitespace and trailing punctuation should not cause a miss"""
+    cache = QueryEmbeddingCache(disk_path=str(tmp_path / "cache.sqlite3"))
+    cache.set(MODEL, "Who is Lisa Wu?", [0.25, 0.5, 0.75])
+
+    assert cache.get(MODEL, "  who is   lisa wu ") == [0.25, 0.5, 0.75]
+    assert cache.get("text-embedding-ada-002", "Who is Lisa Wu?") is None
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_survives_new_instance(tmp_path):
+    """A fresh cache (e.g. another worker) should hit the SQLite tier"""
+    path = str(tmp_path / "cache.sqlite3")
+    QueryEmbeddingCache(disk_path=path).set(MODEL, "leadership style", [1.0, -1.0])
+
+    cache = QueryEmbeddingCache(disk_path=path)
+    assert cache.get(MODEL, "leadership style") == [1.0, -1.0]
+    assert cache.get(MODEL, "leadership style") == [1.0, -1.0]
+
+    stats = cache.stats()
+    assert stats["disk_hits"] == 1
+    assert stats["memory_hits"] == 1
+
+
+def test_lru_eviction_without_disk():
+    """Memory tier should stay bounded and evict the least recently used entry"""
+    cache = QueryEmbeddingCache(max_size=2, disk_path="")
+    cache.set(MODEL, "a", [1.0])
+    cache.set(MODEL, "b", [2.0])
+    cache.get(MODEL, "a")
+    cache.set(MODEL, "c", [3.0])
+
+    assert cache.get(MODEL, "b") is None
+    assert cache.get(MODEL, "a") == [1.0]
+    assert cache.stats()["memory_size"] == 2
+
+
+def test_disk_tier_prunes_oldest_rows(tmp_path):
+    """The SQLite tier should stay bounded, dropping the oldest embeddings"""
+    path = str(tmp_path / "cache.sqlite3")
+    cache = QueryEmbeddingCache(max_size=10, disk_path=path, disk_max_rows=2)
+    cache.PRUNE_EVERY = 1
+    for text in ("first", "second", "third"):
+        cache.set(MODEL, text, [0.5])
+
+    fresh = QueryEmbeddingCache(disk_path=path, disk_max_rows=2)
+    assert fresh.get(MODEL, "first") is None
+    assert fresh.get(MODEL, "third") == [0.5]
+
+
+def test_served_embeddings_are_copies():
+    """Callers get a list they can modify without changing the cached float32 vector"""
+    cache = QueryEmbeddingCache(disk_path="")
+    cache.set(MODEL, "q", [0.25, 0.5])
+    served = cache.get(MODEL, "q")
+    served.append(1.0)
+    assert cache.get(MODEL, "q") == [0.25, 0.5]
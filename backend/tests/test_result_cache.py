@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+"""
+Test script for the versioned search result cache
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.rag.result_cache import SearchResultCache
+
+
+def test_key_depends_on_vector_params_and_run():
+    key = SearchResultCache.make_key('search_employees', [[0.1, 0.2]], {'n_results': 5, 'filters': {'a': 1, 'b': 2}}, 'run-1')
+    assert key == SearchResultCache.make_key('search_employees', [[0.1, 0.2]], {'filters': {'b': 2, 'a': 1}, 'n_results': 5}, 'run-1')
+    assert key != SearchResultCache.make_key('search_employees', [[0.1, 0.3]], {'n_results': 5, 'filters': {'a': 1, 'b': 2}}, 'run-1')
+    assert key != SearchResultCache.make_key('search_employees', [[0.1, 0.2]], {'n_results': 6, 'filters': {'a': 1, 'b': 2}}, 'run-1')
+    assert key != SearchResultCache.make_key('search_employees', [[0.1, 0.2]], {'n_results': 5, 'filters': {'a': 1, 'b': 2}}, 'run-2')
+
+
+def test_entries_expire_with_the_generation():
+    cache = SearchResultCache(max_size=10)
+    cache.set('k', 3, [{'employee_id': 'e1', 'score': 0.9}])
+    assert cache.get('k', 3) == [{'employee_id': 'e1', 'score': 0.9}]
+    assert cache.get('k', 4) is None
+    assert cache.get('k', 3) is None  # stale entry was dropped
+    assert cache.stats()['stale'] == 1
+
+
+def test_results_are_copied_and_lru_bounded():
+    cache = SearchResultCache(max_size=2)
+    results = [{'employee_id': 'e1'}]
+    cache.set('a', 1, results)
+    results[0]['mutated'] = True
+    served = cache.get('a', 1)
+    assert 'mutated' not in served[0]
+    served[0]['annotated'] = True
+    assert 'annotated' not in cache.get('a', 1)[0]
+
+    cache.set('b', 1, [1])
+    cache.set('c', 1, [2])
+    assert cache.get('a', 1) is None
+    assert cache.get('c', 1) == [2]
+
+    disabled = SearchResultCache(max_size=0)
+    disabled.set('a', 1, [1])
+    assert disabled.get('a', 1) is None
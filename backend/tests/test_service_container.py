@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Test script for the process-wide service container
+"""
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.services.container import ServiceContainer
+
+
+class FakeService:
+    def __init__(self):
+        self.warmed = False
+        self.closed = False
+
+    def warm_up(self):
+        self.warmed = True
+
+    def close(self):
+        self.closed = True
+
+
+def test_concurrent_gets_build_one_instance():
+    builds = []
+
+    def factory(container):
+        builds.append(1)
+        time.sleep(0.05)  # widen the race window
+        return FakeService()
+
+    container = ServiceContainer()
+    container.register('store', factory)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(container.get('store'))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert all(result is results[0] for result in results)
+
+
+def test_dependencies_warm_up_and_shutdown():
+    container = ServiceContainer()
+    container.register('db', lambda c: FakeService())
+    container.register('search', lambda c: {'db': c.get('db')})
+    container.register('broken', lambda c: 1 / 0)
+
+    status = container.warm_up()
+    assert status == {'db': True, 'search': True, 'broken': False}
+    db = container.get('db')
+    assert db.warmed
+    assert container.get('search')['db'] is db
+
+    container.shutdown()
+    assert db.closed
+    assert not container.is_built('db')
+    assert container.get('db') is not db
@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+"""
+Test script for token-aware embedding request batching
+"""
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+from backend.ingestion.embedding.embedder import token_batches
+
+
+def test_batches_respect_input_and_token_limits():
+    assert token_batches([10] * 5, max_inputs=2, max_tokens=1000) == [(0, 2), (2, 4), (4, 5)]
+    assert token_batches([40, 40, 40, 10], max_inputs=100, max_tokens=90) == [(0, 2), (2, 4)]
+
+
+def test_oversized_input_gets_its_own_batch_and_order_is_kept():
+    batches = token_batches([5, 500, 5, 5], max_inputs=100, max_tokens=100)
+    assert batches == [(0, 1), (1, 2), (2, 4)]
+    covered = [i for start, end in batches for i in range(start, end)]
+    assert covered == [0, 1, 2, 3]
+
+
+def test_empty_input():
+    assert token_batches([], max_inputs=10, max_tokens=10) == []
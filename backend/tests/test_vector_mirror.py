@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Test script for vector mirror sync planning and export
+"""
+import sys
+import os
+import uuid
+import tempfile
+from pathlib import Path
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..'))
+
+import numpy as np
+
+from backend.services.rag.vector_mirror import NumpyVectorMirror, plan_sync
+
+
+class StubQuery:
+    """Chunk query that streams the given (id, employee_id, embedding) rows"""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def filter(self, *criteria):
+        return self
+
+    def order_by(self, *columns):
+        return self
+
+    def limit(self, n):
+        return self
+
+    def execution_options(self, **options):
+        return self
+
+    def scalar(self):
+        return self.rows[0][2]
+
+    def __iter__(self):
+        return iter(self.rows)
+
+
+class StubSession:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def query(self, *columns):
+        return StubQuery(self.rows)
+
+
+class CountedBeforeDeleteMirror(NumpyVectorMirror):
+    """Counts one chunk more than the stream then yields, as when a chunk is deleted in between"""
+
+    def _chunk_count(self, session, run_id, document_ids):
+        return len(session.rows) + 1
+
+
+def test_no_mirror_is_rebuilt():
+    assert plan_sync(None, {'b': 't2', 'a': 't1'}) == ('rebuild', ['a', 'b'])
+
+
+def test_unchanged_run_is_up_to_date():
+    assert plan_sync({'a': 't1'}, {'a': 't1'}) == ('up_to_date', [])
+
+
+def test_new_documents_are_appended():
+    assert plan_sync({'a': 't1'}, {'a': 't1', 'c': 't3', 'b': 't2'}) == ('append', ['b', 'c'])
+
+
+def test_removed_document_rebuilds():
+    assert plan_sync({'a': 't1', 'b': 't2'}, {'a': 't1'}) == ('rebuild', ['a'])
+
+
+def test_document_re_embedded_under_same_id_rebuilds():
+    # Incremental embedding deletes and re-creates the document with the same external id
+    exported = {'a': '2025-06-01T10:00:00+00:00', 'b': '2025-06-01T10:00:00+00:00'}
+    current = {'a': '2025-06-02T09:30:00+00:00', 'b': '2025-06-01T10:00:00+00:00'}
+    assert plan_sync(exported, current) == ('rebuild', ['a', 'b'])
+
+
+def test_export_keeps_only_rows_written():
+    rows = [(uuid.uuid4(), uuid.uuid4(), [3.0, 4.0]), (uuid.uuid4(), uuid.uuid4(), [0.0, 2.0])]
+    with tempfile.TemporaryDirectory() as mirror_dir:
+        generation_dir = Path(mirror_dir)
+        mirror = CountedBeforeDeleteMirror(mirror_dir=mirror_dir, refresh_interval=0)
+
+        written, dims = mirror._export(StubSession(rows), 'run-1', generation_dir, ['doc-1'])
+
+        assert (written, dims) == (2, 2)
+        embeddings = np.load(generation_dir / 'embeddings.npy')
+        assert embeddings.shape == (2, 2)
+        assert np.allclose(embeddings, [[0.6, 0.8], [0.0, 1.0]])
+        assert np.load(generation_dir / 'chunk_ids.npy').tobytes() == b''.join(row[0].bytes for row in rows)
+        assert np.load(generation_dir / 'employee_ids.npy').shape == (2,)
+        assert sorted(path.name for path in generation_dir.iterdir()) == ['chunk_ids.npy', 'embeddings.npy', 'employee_ids.npy']